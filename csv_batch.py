@@ -0,0 +1,120 @@
+#
+# csv_batch.py
+# 한 스테이션의 여러 CSV 파일(예: Jig PC별/일자별 파일)을 프로세스 풀로 병렬 로드하여 하나의 DataFrame으로 합치는 모듈입니다.
+# 파일 읽기는 기존 read_csv_with_dynamic_header_* 리더를 그대로 사용하고, '="..."' 정리까지 작업 프로세스에서 수행합니다.
+#
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from csv_clean import clean_escaped_columns
+from csv_engine import STATION_SPECS
+
+# 동시에 실행할 최대 작업 프로세스 수. 환경 변수 BATCH_MAX_WORKERS 로 변경할 수 있습니다 (기본값: CPU 코어 수).
+MAX_WORKERS_ENV = 'BATCH_MAX_WORKERS'
+
+# 전체 파일 크기가 이보다 작으면 프로세스 시작 비용이 더 크므로 현재 프로세스에서 순서대로 읽습니다.
+PARALLEL_MIN_BYTES = 32 * 1024 ** 2
+
+
+class BytesUpload:
+    """업로드 파일처럼 name / getvalue() 를 제공하는 래퍼 (작업 프로세스로 넘길 수 있도록 바이트만 보관)"""
+
+    def __init__(self, name, content):
+        self.name = name
+        self._content = content
+
+    def getvalue(self):
+        return self._content
+
+
+def get_station_reader(station):
+    """스테이션의 read_csv_with_dynamic_header_* 리더를 반환하는 함수"""
+    # 작업 프로세스에서도 가져올 수 있도록 리더는 호출 시점에 불러옵니다.
+    if station == 'Pcb':
+        from csv2 import read_csv_with_dynamic_header
+        return read_csv_with_dynamic_header
+    if station == 'Fw':
+        from csv_Fw import read_csv_with_dynamic_header_for_Fw
+        return read_csv_with_dynamic_header_for_Fw
+    if station == 'RfTx':
+        from csv_RfTx import read_csv_with_dynamic_header_for_RfTx
+        return read_csv_with_dynamic_header_for_RfTx
+    if station == 'Semi':
+        from csv_Semi import read_csv_with_dynamic_header_for_Semi
+        return read_csv_with_dynamic_header_for_Semi
+    if station == 'Batadc':
+        from csv_Batadc import read_csv_with_dynamic_header_for_Batadc
+        return read_csv_with_dynamic_header_for_Batadc
+    raise ValueError(f"알 수 없는 스테이션입니다: {station}")
+
+
+def read_station_file(station, name, content):
+    """
+    파일 하나를 읽고 정리하는 작업 함수 (작업 프로세스에서 실행).
+
+    반환값: (파일 이름, DataFrame 또는 None, 소요 시간(초), 오류 메시지 또는 None)
+    """
+    start = time.perf_counter()
+    diagnostics = []
+    try:
+        df = get_station_reader(station)(BytesUpload(name, content), diagnostics)
+        if df is None or df.empty:
+            reasons = [message for level, message in diagnostics if level == 'error']
+            return name, None, time.perf_counter() - start, ' '.join(reasons) or "파일을 읽을 수 없거나 내용이 비어 있습니다."
+        clean_escaped_columns(df, STATION_SPECS[station]['cleaner'])
+        return name, df, time.perf_counter() - start, None
+    except Exception as e:
+        return name, None, time.perf_counter() - start, str(e)
+
+
+def _max_workers(file_count):
+    limit = int(os.environ.get(MAX_WORKERS_ENV, os.cpu_count() or 1))
+    return max(1, min(file_count, limit))
+
+
+def read_station_files(uploaded_files, station, max_workers=None):
+    """
+    여러 업로드 파일을 병렬로 읽어 하나의 DataFrame으로 합치는 함수.
+    파일을 합친 뒤 모든 컬럼 값이 같은 중복 행(같은 파일을 두 번 올린 경우 등)은 하나만 남깁니다.
+
+    반환값: (합친 DataFrame 또는 None, 파일별 처리 결과 DataFrame, 제거된 중복 행 수)
+    """
+    files = [(uploaded.name, uploaded.getvalue()) for uploaded in uploaded_files]
+    workers = max_workers or _max_workers(len(files))
+    if max_workers is None and sum(len(content) for _, content in files) < PARALLEL_MIN_BYTES:
+        workers = 1
+
+    if workers == 1:
+        results = [read_station_file(station, name, content) for name, content in files]
+    else:
+        # Streamlit 서버의 스레드 상태를 복제하지 않도록 작업 프로세스는 spawn 방식으로 시작합니다.
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [executor.submit(read_station_file, station, name, content) for name, content in files]
+            results = [future.result() for future in futures]
+
+    report_rows = []
+    frames = []
+    for name, df, elapsed, error in results:
+        report_rows.append({
+            '파일': name,
+            '행 수': 0 if df is None else len(df),
+            '소요 시간(초)': round(elapsed, 3),
+            '상태': '성공' if error is None else f'실패: {error}',
+        })
+        if df is not None:
+            frames.append(df)
+    report = pd.DataFrame(report_rows)
+
+    if not frames:
+        return None, report, 0
+
+    merged = pd.concat(frames, ignore_index=True)
+    before = len(merged)
+    merged = merged.drop_duplicates(ignore_index=True)
+    return merged, report, before - len(merged)
@@ -0,0 +1,123 @@
+#
+# csv_cache.py
+# 업로드 파일 내용(SHA-256) + 스테이션 + 분석 모드 + 분석기 버전으로 분석 결과를 캐시하는 모듈입니다.
+# 캐시는 st.cache_resource 로 프로세스에 하나만 만들어 모든 세션이 공유하며, 바이트 예산을 넘으면 오래된 항목부터 지웁니다.
+#
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from csv_engine import ANALYZER_VERSION
+
+# 캐시 최대 크기(바이트). 환경 변수 ANALYSIS_CACHE_MAX_BYTES 로 변경할 수 있습니다.
+MAX_BYTES_ENV = 'ANALYSIS_CACHE_MAX_BYTES'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# 크기를 따로 계산하지 않는 작은 값(숫자, 문자열, 날짜 등)의 대략적인 크기
+_SCALAR_NBYTES = 64
+
+
+def make_cache_key(file_content, station, mode='full'):
+    """파일 바이트의 SHA-256, 스테이션, 분석 모드('full'/'stream'), 분석기 버전으로 캐시 키를 만드는 함수"""
+    return (hashlib.sha256(file_content).hexdigest(), station, mode, ANALYZER_VERSION)
+
+
+def make_batch_cache_key(file_contents, station, mode='batch'):
+    """
+    여러 파일을 합쳐 분석하는 일괄 모드의 캐시 키를 만드는 함수.
+    파일별 SHA-256 을 정렬해 다시 해시하므로 업로드 순서가 달라도 같은 키가 됩니다.
+    """
+    digests = sorted(hashlib.sha256(content).hexdigest() for content in file_contents)
+    combined = hashlib.sha256('\n'.join(digests).encode('ascii')).hexdigest()
+    return (combined, station, mode, ANALYZER_VERSION)
+
+
+def estimate_nbytes(value):
+    """분석 결과(DataFrame, numpy 배열, dict/list/tuple 중첩)의 메모리 사용량을 대략 계산하는 함수"""
+    if value is None:
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(k) + estimate_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(estimate_nbytes(item) for item in value)
+    return _SCALAR_NBYTES
+
+
+class AnalysisCache:
+    """
+    분석 결과를 LRU 방식으로 보관하는 스레드 안전 캐시 클래스.
+    저장된 결과(DataFrame 등)는 여러 세션이 그대로 공유하므로 읽기 전용으로 다뤄야 합니다.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """캐시된 결과를 반환하고 최근 사용 항목으로 옮기는 함수. 없으면 None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """결과를 저장하고 예산을 넘으면 가장 오래 사용하지 않은 항목부터 지우는 함수. 예산보다 큰 결과는 저장하지 않습니다."""
+        nbytes = estimate_nbytes(value)
+        if nbytes > self.max_bytes:
+            return False
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+
+            self._entries[key] = (value, nbytes)
+            self._total_bytes += nbytes
+
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        """캐시 상태(항목 수, 사용 바이트, 최대 바이트, 적중/실패 횟수)를 반환하는 함수"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+@st.cache_resource
+def get_analysis_cache():
+    """모든 세션이 공유하는 분석 결과 캐시를 반환하는 함수"""
+    max_bytes = int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES))
+    return AnalysisCache(max_bytes)
@@ -0,0 +1,117 @@
+#
+# csv_clean.py
+# 엑셀 내보내기 형식('="..."')으로 감싸진 문자열 값을 정리하는 모듈입니다.
+# 표본으로 감싸진 값이 있는 컬럼만 골라 벡터화된 문자열 연산으로 한 번에 정리하고, 깨끗한 컬럼은 건드리지 않습니다.
+#
+
+import pandas as pd
+
+# 정리 대상 컬럼을 판단할 때 살펴볼 표본 행 수
+SAMPLE_ROWS = 1000
+
+
+# '="...' 형식의 문자열을 정리하는 함수
+def clean_string_format(value):
+    if isinstance(value, str) and value.startswith('="') and value.endswith('"'):
+        return value[2:-1]
+    return value
+
+
+def clean_quoted_string_format(value):
+    """다양한 형태의 문자열 포맷(="...", ""..."", "...")을 정리하는 함수 (Semi 데이터용)"""
+    if pd.isna(value):
+        return value
+
+    value_str = str(value).strip()
+
+    if value_str.startswith('="') and value_str.endswith('"'):
+        return value_str[2:-1]
+
+    if value_str.startswith('""') and value_str.endswith('""'):
+        return value_str[2:-2]
+
+    if value_str.startswith('"') and value_str.endswith('"') and len(value_str) > 2:
+        return value_str[1:-1]
+
+    return value_str
+
+
+# ==============================
+# 벡터화된 컬럼 정리 함수
+# ==============================
+def _wrapped(texts, prefix, suffix):
+    return texts.str.startswith(prefix, na=False) & texts.str.endswith(suffix, na=False)
+
+
+def clean_excel_escapes(series):
+    """'="..."' 로 감싸진 값만 벗겨 내는 함수 (clean_string_format 의 컬럼 단위 버전)"""
+    escaped = _wrapped(series, '="', '"')
+    if not escaped.any():
+        return series
+    return series.mask(escaped, series.str.slice(2, -1))
+
+
+def clean_quoted_values(series):
+    """
+    앞뒤 공백을 제거하고 '="..."', '""...""', '"..."' 형태를 벗겨 내는 함수 (clean_quoted_string_format 의 컬럼 단위 버전).
+    문자열이 아닌 값은 그대로 둡니다.
+    """
+    stripped = series.str.strip()
+    stripped = stripped.where(stripped.notna(), series)
+
+    excel = _wrapped(stripped, '="', '"')
+    doubled = ~excel & _wrapped(stripped, '""', '""')
+    quoted = ~excel & ~doubled & _wrapped(stripped, '"', '"') & (stripped.str.len() > 2).fillna(False)
+
+    cleaned = stripped.mask(excel, stripped.str.slice(2, -1))
+    cleaned = cleaned.mask(doubled, stripped.str.slice(2, -2))
+    return cleaned.mask(quoted, stripped.str.slice(1, -1))
+
+
+def _needs_excel_cleaning(sample):
+    return bool(_wrapped(sample, '="', '"').any())
+
+
+def _needs_quoted_cleaning(sample):
+    texts = sample.dropna()
+    return bool(texts.str.startswith(('"', '='), na=False).any() or (texts != texts.str.strip()).any())
+
+
+# 스테이션 설정의 'cleaner' 이름 → (표본 검사 함수, 컬럼 정리 함수)
+CLEANERS = {
+    'excel': (_needs_excel_cleaning, clean_excel_escapes),
+    'quoted': (_needs_quoted_cleaning, clean_quoted_values),
+}
+
+
+def _sample(series, sample_rows):
+    """앞쪽 표본 행을 반환하고, 표본이 모두 비어 있으면 값이 있는 행 중 앞쪽 일부를 반환하는 함수"""
+    head = series.iloc[:sample_rows]
+    if head.isna().all():
+        head = series.dropna().iloc[:sample_rows]
+    return head
+
+
+def find_escaped_columns(df, cleaner='excel', sample_rows=SAMPLE_ROWS):
+    """표본 행 기준으로 정리가 필요한 문자열 컬럼 목록을 반환하는 함수 (숫자형 등 문자열이 아닌 컬럼은 검사하지 않습니다)"""
+    needs_cleaning, _ = CLEANERS[cleaner]
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        if not pd.api.types.is_string_dtype(series):
+            continue
+        if needs_cleaning(_sample(series, sample_rows)):
+            columns.append(col)
+    return columns
+
+
+def clean_escaped_columns(df, cleaner='excel', sample_rows=SAMPLE_ROWS):
+    """
+    find_escaped_columns 로 찾은 컬럼만 벡터화된 연산으로 정리하는 함수.
+    df 는 직접 수정되며, 정리한 컬럼 목록을 반환합니다.
+    """
+    _, clean_column = CLEANERS[cleaner]
+    columns = find_escaped_columns(df, cleaner, sample_rows)
+    for col in columns:
+        df[col] = clean_column(df[col])
+    return columns
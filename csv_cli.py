@@ -0,0 +1,197 @@
+#
+# csv_cli.py
+# 스테이션 CSV 가 모인 디렉터리를 Streamlit 없이 일괄 분석하는 명령행 도구입니다 (야간 배치 등).
+#
+# 사용 예:
+#   python csv_cli.py logs/2024-06-01 --output reports/2024-06-01
+#   python csv_cli.py logs --recursive --station Pcb --mode stream --workers 4
+#
+# 파일마다 헤더 키워드로 스테이션을 판별하고(--station 으로 지정 가능), 프로세스 풀로 병렬 분석한 뒤 output 디렉터리에
+#   - summary.csv     : 파일 × Jig × 날짜별 건수(total_test/pass/false_defect/true_defect/fail), 고유 SN 건수, 합격률
+#   - files.csv       : 파일별 스테이션, 집계 건수, 소요 시간, 상태
+#   - diagnostics.csv : 파일별 경고/오류 메시지
+# 를 씁니다. 분석에 실패한 파일이 하나라도 있으면 종료 코드 1 을 반환합니다.
+#
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from csv_batch import BytesUpload, get_station_reader
+from csv_engine import STATION_SPECS, add_diagnostic, analyze_station, summary_frame
+from csv_stream import analyze_station_stream, locate_station_header
+
+# 스테이션을 판별할 때 헤더를 찾는 파일 앞부분 크기(바이트)
+DETECT_BYTES = 1024 ** 2
+
+ANALYSIS_MODES = ('full', 'stream')
+
+
+def detect_station(file_content):
+    """파일 앞부분에서 헤더 키워드가 모두 있는 스테이션을 찾는 함수. 없으면 None."""
+    head = file_content[:DETECT_BYTES]
+    for station in STATION_SPECS:
+        offset, _ = locate_station_header(head, station)
+        if offset is not None:
+            return station
+    return None
+
+
+def analyze_file(path, station=None, mode='full'):
+    """
+    CSV 파일 하나를 읽고 분석하는 작업 함수 (작업 프로세스에서 실행).
+
+    반환값: {'file', 'station', 'summary'(summary_frame 또는 None), 'total_test', 'elapsed', 'diagnostics'}
+    """
+    start = time.perf_counter()
+    diagnostics = []
+    result = {'file': path, 'station': station, 'summary': None, 'total_test': 0, 'diagnostics': diagnostics}
+
+    try:
+        with open(path, 'rb') as f:
+            file_content = f.read()
+
+        station = station or detect_station(file_content)
+        result['station'] = station
+        if station is None:
+            add_diagnostic(diagnostics, 'error', "헤더 키워드로 스테이션을 판별할 수 없습니다. --station 으로 지정해주세요.")
+        else:
+            upload = BytesUpload(os.path.basename(path), file_content)
+            if mode == 'stream':
+                summary_data, _, _ = analyze_station_stream(upload, station)
+                if summary_data is None:
+                    add_diagnostic(diagnostics, 'error', "파일을 읽을 수 없거나 필수 컬럼이 없습니다.")
+            else:
+                df = get_station_reader(station)(upload, diagnostics)
+                summary_data = None
+                if df is not None and not df.empty:
+                    summary_data, _ = analyze_station(df, station, diagnostics=diagnostics)
+
+            if summary_data is not None:
+                summary = summary_frame(summary_data)
+                result['summary'] = summary
+                result['total_test'] = int(summary['total_test'].sum())
+            elif not any(level == 'error' for level, _ in diagnostics):
+                add_diagnostic(diagnostics, 'error', "분석 결과가 없습니다. 파일 내용을 확인해주세요.")
+    except Exception as e:
+        add_diagnostic(diagnostics, 'error', f"분석 중 오류 발생: {e}")
+
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+def find_csv_files(directory, recursive=False):
+    """디렉터리의 CSV 파일 경로 목록 (이름 순)"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith('.csv'))
+        if not recursive:
+            break
+    return paths
+
+
+def run_files(paths, station=None, mode='full', workers=None, log=None):
+    """
+    파일 목록을 병렬(workers 개 프로세스)로 분석하는 함수. workers 가 1 이거나 파일이 하나면 현재 프로세스에서 순서대로 분석합니다.
+    log 를 넘기면 파일 하나가 끝날 때마다 결과를 넘겨 호출합니다.
+
+    반환값: analyze_file 결과 목록 (paths 순서)
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    results = {}
+    if workers == 1:
+        for path in paths:
+            results[path] = analyze_file(path, station, mode)
+            if log is not None:
+                log(results[path])
+    else:
+        # csv_batch 와 같이 작업 프로세스는 spawn 방식으로 시작합니다.
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [executor.submit(analyze_file, path, station, mode) for path in paths]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['file']] = result
+                if log is not None:
+                    log(result)
+    return [results[path] for path in paths]
+
+
+def write_reports(results, output_dir):
+    """분석 결과 목록을 summary.csv / files.csv / diagnostics.csv 로 쓰는 함수"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    summaries = [
+        result['summary'].assign(file=result['file'], station=result['station'])
+        for result in results if result['summary'] is not None
+    ]
+    summary = pd.concat(summaries, ignore_index=True) if summaries else pd.DataFrame()
+    if not summary.empty:
+        leading = ['station', 'file']
+        summary = summary[leading + [col for col in summary.columns if col not in leading]]
+    summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False, encoding='utf-8-sig')
+
+    files = pd.DataFrame([{
+        'file': result['file'],
+        'station': result['station'],
+        'total_test': result['total_test'],
+        'elapsed_sec': round(result['elapsed'], 3),
+        'status': 'ok' if result['summary'] is not None else 'failed',
+    } for result in results])
+    files.to_csv(os.path.join(output_dir, 'files.csv'), index=False, encoding='utf-8-sig')
+
+    diagnostics = pd.DataFrame(
+        [{'file': result['file'], 'level': level, 'message': message}
+         for result in results for level, message in result['diagnostics']],
+        columns=['file', 'level', 'message'],
+    )
+    diagnostics.to_csv(os.path.join(output_dir, 'diagnostics.csv'), index=False, encoding='utf-8-sig')
+
+
+def _print_result(result):
+    status = 'ok' if result['summary'] is not None else 'FAILED'
+    print(f"[{status}] {result['file']} ({result['station'] or '?'}, {result['total_test']}건, {result['elapsed']:.2f}s)")
+    for level, message in result['diagnostics']:
+        print(f"    {level}: {message}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="스테이션 CSV 디렉터리를 일괄 분석해 Jig × 날짜 요약을 씁니다.")
+    parser.add_argument('directory', help="스테이션 CSV 파일이 있는 디렉터리")
+    parser.add_argument('--output', '-o', default='reports', help="결과 파일을 쓸 디렉터리 (기본값: reports)")
+    parser.add_argument('--station', choices=list(STATION_SPECS), help="모든 파일을 이 스테이션으로 분석 (기본값: 헤더로 판별)")
+    parser.add_argument('--mode', choices=ANALYSIS_MODES, default='full',
+                        help="full = 전체 분석(QC 포함), stream = 청크 단위 집계만 (기본값: full)")
+    parser.add_argument('--workers', '-j', type=int, default=None, help="동시에 실행할 작업 프로세스 수 (기본값: CPU 코어 수)")
+    parser.add_argument('--recursive', '-r', action='store_true', help="하위 디렉터리의 CSV 파일도 분석")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.isdir(args.directory):
+        print(f"디렉터리를 찾을 수 없습니다: {args.directory}", file=sys.stderr)
+        return 2
+
+    paths = find_csv_files(args.directory, args.recursive)
+    if not paths:
+        print(f"CSV 파일이 없습니다: {args.directory}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    results = run_files(paths, args.station, args.mode, args.workers, log=_print_result)
+    write_reports(results, args.output)
+
+    failed = sum(result['summary'] is None for result in results)
+    print(f"{len(paths)}개 파일 분석 완료 ({failed}개 실패, {time.perf_counter() - start:.1f}s) → {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#
+# csv_codes.py
+# 분석된 DataFrame 에서 같은 값이 반복되는 컬럼(판정, Jig, SNumber, Min/Max 제한값 등)을
+# category(행마다 작은 정수 코드 + 컬럼별 값 사전)로 바꾸는 모듈입니다.
+# _QC 컬럼은 csv_qc.QC_DTYPE 사전을 모든 스테이션이 공유합니다.
+#
+
+import pandas as pd
+
+# 컬럼을 category 로 바꿀지 판단할 때 사용하는 앞부분 표본 행 수와 고유 값 비율 상한
+SAMPLE_ROWS = 10_000
+MAX_UNIQUE_RATIO = 0.5
+
+
+def is_coded(series):
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def _is_encodable(series):
+    if is_coded(series):
+        return False
+    dtype = series.dtype
+    return not (pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_bool_dtype(dtype))
+
+
+def encode_repeated_columns(df, always=(), sample_rows=SAMPLE_ROWS, max_unique_ratio=MAX_UNIQUE_RATIO):
+    """
+    반복 값 컬럼을 category 로 바꾸는 함수 (df 직접 수정).
+    always 에 있는 컬럼은 항상 바꾸고, 나머지는 앞부분 표본의 고유 값 비율이 max_unique_ratio 이하인 컬럼만 바꿉니다.
+    타임스탬프(datetime)와 bool 컬럼, 이미 category 인 컬럼은 그대로 둡니다.
+
+    반환값: category 로 바꾼 컬럼 목록
+    """
+    always = set(always)
+    encoded = []
+    for col in df.columns:
+        series = df[col]
+        if not _is_encodable(series):
+            continue
+        if col not in always:
+            sample = series.iloc[:sample_rows]
+            if sample.nunique(dropna=True) > len(sample) * max_unique_ratio:
+                continue
+        df[col] = series.astype('category')
+        encoded.append(col)
+    return encoded
+
@@ -0,0 +1,379 @@
+#
+# csv_engine.py
+# 스테이션(Pcb, Fw, RfTx, Semi, Batadc) 공용 분석 엔진입니다.
+# 스테이션별 차이는 STATION_SPECS 설정으로만 표현하고, 집계는 한 번의 groupby 로 수행합니다.
+# Streamlit 에 의존하지 않으며, 화면에 보여 줄 경고/오류는 diagnostics 목록에 (수준, 문장)으로 담아 돌려줍니다.
+#
+
+import pandas as pd
+import numpy as np
+import warnings
+from bisect import bisect_left, bisect_right
+
+from csv_clean import clean_escaped_columns, clean_string_format, clean_quoted_string_format
+from csv_codes import encode_repeated_columns
+from csv_qc import apply_qc_matrix
+from csv_timestamp import parse_timestamps
+
+warnings.filterwarnings('ignore')
+
+# 분석 결과의 구조나 판정 규칙이 바뀌면 올려서 이전 버전으로 캐시된 결과를 무효화합니다 (csv_cache 참고).
+ANALYZER_VERSION = 3
+
+
+# ==============================
+# 스테이션 설정
+# ==============================
+# - keywords / case_sensitive / partial / max_lines: 헤더 탐색 조건
+# - required_columns: 분석 전에 반드시 있어야 하는 컬럼
+# - jig_cols: Jig로 사용할 컬럼 후보 (앞에서부터 값이 있는 첫 컬럼 사용)
+# - timestamp_col / pass_col: 타임스탬프 컬럼, 판정 컬럼
+# - timestamp_formats: 타임스탬프 형식 후보 (csv_timestamp.TIMESTAMP_FORMATS 이름, 앞쪽일수록 우선)
+# - timestamp_as_str: 청크(스트리밍) 읽기 시 전체 컬럼을 문자열로 읽을지 여부
+# - pass_scope: 'jig' = Jig 전체 기간 기준 가성불량 판정, 'jig_day' = Jig+일자 기준 판정 (Semi)
+# - qc_columns / qc_prefix: QC 체크 대상 측정 컬럼과 Min/Max 컬럼 접두어 (예: 'PcbIrPwr' → 'PcbMinIrPwr')
+# - detail: 상세 내역 저장 방식 ('records' = 분석된 df 의 행 위치 배열, 'sns' = 고유 SNumber 목록)
+STATION_SPECS = {
+    'Pcb': {
+        'keywords': ['snumber', 'pcbstarttime', 'pcbmaxirpwr', 'pcbpass', 'pcbsleepcurr'],
+        'case_sensitive': False, 'partial': False, 'max_lines': None,
+        'required_columns': ['SNumber'],
+        'jig_cols': ['PcbMaxIrPwr'], 'default_jig': 'DefaultJig',
+        'timestamp_col': 'PcbStartTime', 'pass_col': 'PcbPass',
+        'timestamp_formats': ['compact', 'epoch_s', 'epoch_ms'], 'timestamp_as_str': True,
+        'cleaner': 'excel', 'pass_scope': 'jig', 'detail': 'records',
+        'qc_columns': [
+            'PcbSleepCurr', 'PcbIrCurr', 'PcbIrPwr',
+            'PcbWirelessVolt', 'PcbBatVolt', 'PcbUsbCurr', 'PcbWirelessUsbVolt', 'PcbLed',
+        ],
+        'qc_prefix': 'Pcb',
+    },
+    'Fw': {
+        'keywords': ['SNumber', 'FwStamp', 'FwPC', 'FwPass'],
+        'case_sensitive': True, 'partial': False, 'max_lines': 100,
+        'required_columns': ['SNumber'],
+        'jig_cols': ['FwPC'], 'default_jig': 'DefaultJig',
+        'timestamp_col': 'FwStamp', 'pass_col': 'FwPass',
+        'timestamp_formats': ['iso', 'slash', 'compact', 'mixed'], 'timestamp_as_str': False,
+        'cleaner': 'excel', 'pass_scope': 'jig', 'detail': 'records',
+        'qc_columns': [], 'qc_prefix': None,
+    },
+    'RfTx': {
+        'keywords': ['SNumber', 'RfTxStamp', 'RfTxPC', 'RfTxPass'],
+        'case_sensitive': True, 'partial': False, 'max_lines': 100,
+        'required_columns': ['SNumber'],
+        'jig_cols': ['RfTxPC'], 'default_jig': 'DefaultJig',
+        'timestamp_col': 'RfTxStamp', 'pass_col': 'RfTxPass',
+        'timestamp_formats': ['epoch_ms', 'epoch_s', 'iso', 'slash'], 'timestamp_as_str': False,
+        'cleaner': 'excel', 'pass_scope': 'jig', 'detail': 'records',
+        'qc_columns': [], 'qc_prefix': None,
+    },
+    'Semi': {
+        'keywords': ['SNumber', 'SemiAssyStartTime', 'SemiAssyPass', 'SemiAssySolarVolt'],
+        'case_sensitive': True, 'partial': True, 'max_lines': 20,
+        'required_columns': ['SNumber', 'SemiAssyStartTime', 'SemiAssyMaxSolarVolt', 'SemiAssyPass'],
+        'jig_cols': ['SemiAssyMaxSolarVolt', 'BatadcPC'], 'default_jig': 'SemiAssy_JIG',
+        'timestamp_col': 'SemiAssyStartTime', 'pass_col': 'SemiAssyPass',
+        'timestamp_formats': ['compact'], 'timestamp_as_str': True,
+        'cleaner': 'quoted', 'pass_scope': 'jig_day', 'detail': 'sns',
+        'qc_columns': [
+            'SemiAssyBatVolt', 'SemiAssySolarVolt', 'SemiAssySolarVoltUsb', 'SemiAssyUsbVolt', 'SemiAssyUsbCurrent',
+        ],
+        'qc_prefix': 'SemiAssy',
+    },
+    'Batadc': {
+        'keywords': ['SNumber', 'BatadcStamp', 'BatadcPC', 'BatadcPass', 'BatadcRssiRx'],
+        'case_sensitive': True, 'partial': False, 'max_lines': 100,
+        'required_columns': ['SNumber'],
+        'jig_cols': ['BatadcPC'], 'default_jig': 'DefaultJig',
+        'timestamp_col': 'BatadcStamp', 'pass_col': 'BatadcPass',
+        'timestamp_formats': ['iso', 'slash', 'compact', 'mixed'], 'timestamp_as_str': False,
+        'cleaner': 'excel', 'pass_scope': 'jig', 'detail': 'records',
+        'qc_columns': [], 'qc_prefix': None,
+    },
+}
+
+CATEGORIES = ['pass', 'false_defect', 'true_defect', 'fail']
+
+# 리포트 화면에서 합산하는 summary_data 건수 항목 (요약 큐브의 마지막 축 순서)
+SUMMARY_FIELDS = ['total_test', 'pass', 'false_defect', 'true_defect', 'fail']
+
+
+def resolve_column(columns, name):
+    """대소문자/공백을 무시하고 실제 컬럼 이름을 찾는 함수"""
+    for col in columns:
+        if str(col).strip().lower() == name.lower():
+            return col
+    return None
+
+
+def normalize_pass_status(series):
+    """
+    판정 컬럼을 공백 제거 + 대문자로 정리한 category 컬럼을 만드는 함수 (결측은 빈 문자열).
+    판정 값은 종류가 몇 개뿐이므로 고유 값만 정리한 뒤, 정리 후 같아진 값(' o' 와 'O' 등)을 합쳐 코드로 펼칩니다.
+    """
+    codes, uniques = pd.factorize(series)
+    normalized = pd.Series(uniques, dtype=object).astype(str).str.strip().str.upper().tolist() + ['']
+    merged_codes, categories = pd.factorize(pd.Series(normalized, dtype=object))
+    return pd.Series(
+        pd.Categorical.from_codes(merged_codes[codes], categories=categories.astype(str)), index=series.index
+    )
+
+
+def pick_jig_column(df, spec, valid_rows):
+    """
+    Jig 후보 컬럼 중 유효 행(valid_rows)에 값이 있는 첫 컬럼 이름을 반환하는 함수 (없으면 None).
+    스트리밍 분석(csv_stream)도 같은 규칙으로 첫 청크에서 Jig 컬럼을 정합니다.
+    """
+    for candidate in spec['jig_cols']:
+        col = resolve_column(df.columns, candidate)
+        if col is not None and not df.loc[valid_rows, col].isna().all():
+            return col
+    return None
+
+
+def _resolve_jig_column(df, spec, valid_rows):
+    """
+    Jig 컬럼을 결정하는 함수.
+    후보 컬럼 중 유효 행에 값이 있는 첫 컬럼을 사용하고, 없으면 기본 Jig 값으로 채운 컬럼을 만듭니다.
+    """
+    col = pick_jig_column(df, spec, valid_rows)
+    if col is not None:
+        return col
+
+    # 첫 번째 후보 컬럼 자체가 없으면 그 이름으로 기본 Jig 컬럼을 만들어 화면의 Jig 선택과 맞춥니다.
+    default_col = spec['jig_cols'][0] if resolve_column(df.columns, spec['jig_cols'][0]) is None else 'DEFAULT_JIG'
+    df[default_col] = spec['default_jig']
+    return default_col
+
+
+def aggregate_station(df, jig_col, timestamp_col, pass_scope='jig', detail='records'):
+    """
+    (Jig, 날짜) 별 total/pass/fail/가성불량/진성불량 건수와 고유 SN 건수를 한 번의 groupby 로 계산하는 함수.
+    df 에는 PassStatusNorm 컬럼과 datetime 으로 변환된 timestamp_col 이 있어야 합니다.
+
+    반환값: (summary_data, all_dates)
+    """
+    status = df['PassStatusNorm']
+    is_pass = status.eq('O').to_numpy()
+    is_fail = status.eq('X').to_numpy()
+    jig = df[jig_col]
+    day = df[timestamp_col].dt.normalize()
+
+    # 한 번이라도 PASS한 (Jig, SNumber) 여부를 행 단위로 계산합니다.
+    # 'jig' 범위는 타임스탬프가 없는 행의 PASS도 이력에 포함하고, 'jig_day' 범위는 같은 날짜의 PASS만 인정합니다.
+    pass_flags = pd.Series(is_pass, index=df.index)
+    if pass_scope == 'jig':
+        ever_passed = pass_flags.groupby([jig, df['SNumber']], dropna=False, observed=True).transform('any')
+    else:
+        ever_passed = pass_flags.groupby([jig, day, df['SNumber']], dropna=False, observed=True).transform('any')
+    ever_passed = ever_passed.fillna(False).to_numpy(dtype=bool)
+
+    frame = pd.DataFrame({
+        'jig': jig,
+        'date': day,
+        'SNumber': df['SNumber'],
+        'pass': is_pass,
+        'false_defect': is_fail & ever_passed,
+        'true_defect': is_fail & ~ever_passed,
+        'fail': is_fail,
+    }, index=df.index)
+
+    valid = frame['jig'].notna() & frame['date'].notna()
+    if pass_scope == 'jig_day':
+        valid &= frame['jig'].astype(str).str.strip() != ''
+    positions = np.flatnonzero(valid.to_numpy())
+    frame = frame.iloc[positions]
+
+    grouped = frame.groupby(['jig', 'date'], sort=True, observed=True)
+    counts = grouped[CATEGORIES].sum()
+    counts['total_test'] = grouped.size()
+    for cat in CATEGORIES:
+        counts[f'{cat}_unique_count'] = (
+            frame[frame[cat]].groupby(['jig', 'date'], observed=True)['SNumber'].nunique(dropna=False)
+        )
+    counts = counts.fillna(0)
+
+    # 상세 내역: 그룹별 행 위치를 한 번에 구해 두고 카테고리 마스크로 나눕니다.
+    # 'records' 모드는 행을 dict 로 복사하지 않고 df 의 행 위치(int32) 배열만 보관합니다.
+    # FAIL 은 가성불량과 진성불량의 합집합이므로 따로 저장하지 않습니다 (get_detail_positions 참고).
+    group_positions = grouped.indices
+    category_masks = {cat: frame[cat].to_numpy() for cat in CATEGORIES}
+    sn_values = frame['SNumber'].to_numpy()
+
+    summary_data = {}
+    for (jig_value, date_value), row in counts.iterrows():
+        total_test = int(row['total_test'])
+        pass_count = int(row['pass'])
+        rate = 100 * pass_count / total_test if total_test > 0 else 0
+
+        data_point = {
+            'total_test': total_test,
+            'pass': pass_count,
+            'false_defect': int(row['false_defect']),
+            'true_defect': int(row['true_defect']),
+            'fail': int(row['fail']),
+            'pass_rate': f"{rate:.1f}%",
+        }
+
+        local = group_positions[(jig_value, date_value)]
+        for cat in CATEGORIES:
+            cat_local = local[category_masks[cat][local]]
+            if detail == 'records':
+                if cat != 'fail':
+                    data_point[f'{cat}_idx'] = positions[cat_local].astype(np.int32)
+            else:
+                data_point[f'{cat}_sns'] = pd.unique(sn_values[cat_local]).tolist()
+
+        for cat in CATEGORIES:
+            data_point[f'{cat}_unique_count'] = int(row[f'{cat}_unique_count'])
+
+        summary_data.setdefault(jig_value, {})[date_value.strftime("%Y-%m-%d")] = data_point
+
+    all_dates = sorted(day.dropna().dt.date.unique())
+    return summary_data, all_dates
+
+
+def summary_frame(summary_data):
+    """
+    summary_data 를 (jig, date) 행마다 건수/고유 SN 건수/합격률을 담은 DataFrame 으로 바꾸는 함수.
+    상세 행 위치(*_idx, *_sns)는 포함하지 않습니다 (CLI 요약 파일 등).
+    """
+    unique_fields = [f'{cat}_unique_count' for cat in CATEGORIES]
+    columns = ['jig', 'date'] + SUMMARY_FIELDS + unique_fields + ['pass_rate']
+    rows = [
+        [jig, date] + [data_point[field] for field in SUMMARY_FIELDS + unique_fields] + [data_point['pass_rate']]
+        for jig, dates in summary_data.items()
+        for date, data_point in dates.items()
+    ]
+    return pd.DataFrame(rows, columns=columns)
+
+
+_EMPTY_POSITIONS = np.empty(0, dtype=np.int32)
+
+
+def get_detail_positions(data_point, cat):
+    """
+    summary_data 항목에서 카테고리별 상세 행 위치(int32 배열)를 꺼내는 함수.
+    'fail' 은 가성불량과 진성불량 위치를 합쳐서 돌려주며, 상세 위치가 없으면 빈 배열을 반환합니다.
+    """
+    if cat == 'fail':
+        parts = [data_point.get(f'{sub}_idx', _EMPTY_POSITIONS) for sub in ('false_defect', 'true_defect')]
+        return np.sort(np.concatenate(parts))
+    return data_point.get(f'{cat}_idx', _EMPTY_POSITIONS)
+
+
+def build_summary_cube(summary_data, all_dates):
+    """
+    summary_data 를 (Jig, 날짜, 항목) 3차원 int64 배열로 펼치는 함수.
+    리포트 화면의 Jig 선택/기간 필터를 배열 슬라이스와 합계로 처리할 수 있도록 분석 직후 한 번만 만듭니다.
+
+    반환값: {'jigs': Jig 목록(정렬), 'jig_index': {Jig: 위치}, 'dates': all_dates, 'fields': SUMMARY_FIELDS,
+             'values': (Jig 수, 날짜 수, 항목 수) 배열}
+    """
+    jigs = sorted(summary_data)
+    dates = list(all_dates)
+    date_index = {d.strftime('%Y-%m-%d'): i for i, d in enumerate(dates)}
+    values = np.zeros((len(jigs), len(dates), len(SUMMARY_FIELDS)), dtype=np.int64)
+
+    for j, jig in enumerate(jigs):
+        for date_str, data_point in summary_data[jig].items():
+            d = date_index.get(date_str)
+            if d is not None:
+                values[j, d] = [data_point.get(field, 0) for field in SUMMARY_FIELDS]
+
+    return {
+        'jigs': jigs,
+        'jig_index': {jig: j for j, jig in enumerate(jigs)},
+        'dates': dates,
+        'fields': SUMMARY_FIELDS,
+        'values': values,
+    }
+
+
+def slice_summary_cube(cube, jigs=None, start_date=None, end_date=None):
+    """
+    요약 큐브를 Jig 목록과 기간(양 끝 포함)으로 잘라 날짜별 합계를 구하는 함수. jigs 가 None 이면 전체 Jig 를 합산합니다.
+
+    반환값: (기간 안의 날짜 목록, (날짜 수, 항목 수) 합계 배열)
+    """
+    dates = cube['dates']
+    lo = bisect_left(dates, start_date) if start_date is not None else 0
+    hi = bisect_right(dates, end_date) if end_date is not None else len(dates)
+    values = cube['values'][:, lo:hi]
+    if jigs is not None:
+        rows = [cube['jig_index'][jig] for jig in jigs if jig in cube['jig_index']]
+        values = values[rows]
+    return dates[lo:hi], values.sum(axis=0)
+
+
+def _no_progress(stage, detail=None):
+    pass
+
+
+def add_diagnostic(diagnostics, level, message):
+    """진단 메시지 목록에 (수준, 문장)을 추가하는 함수. 수준은 'error' / 'warning' / 'info' 이며, diagnostics 가 None 이면 무시합니다."""
+    if diagnostics is not None:
+        diagnostics.append((level, message))
+
+
+def analyze_station(df, station, preprocess=None, progress=None, diagnostics=None):
+    """
+    스테이션 설정(STATION_SPECS)에 따라 DataFrame을 분석하는 공용 함수.
+    df 는 직접 수정되며(문자열 정리, PassStatusNorm, 타임스탬프 변환, 반복 값 컬럼의 category 변환 등), 결과로 (summary_data, all_dates)를 반환합니다.
+    preprocess 는 QC 체크 이후 df 에 적용할 추가 처리가 필요할 때 넘기는 함수입니다.
+    progress 는 단계('clean', 'qc', 'timestamps', 'aggregate')를 시작할 때마다 호출할 함수입니다 (csv_jobs.AnalysisJob.report 등).
+    diagnostics 목록을 넘기면 분석 중 경고/오류 메시지를 (수준, 문장)으로 추가합니다. 실패하면 (None, None)을 반환합니다.
+    """
+    spec = STATION_SPECS[station]
+    progress = progress or _no_progress
+
+    missing_columns = [col for col in spec['required_columns'] if resolve_column(df.columns, col) is None]
+    if missing_columns:
+        add_diagnostic(diagnostics, 'error', f"{station} 데이터 분석 중 오류가 발생했습니다: 필수 컬럼이 없습니다: {missing_columns}")
+        return None, None
+
+    # 데이터 전처리 ('="..."' 값이 있는 컬럼만 벡터화하여 정리)
+    progress('clean')
+    clean_escaped_columns(df, spec['cleaner'])
+
+    # === QC 체크 (측정값/Min/Max 행렬 한 번에 판정) ===
+    if spec['qc_columns']:
+        progress('qc')
+        df, missing_limits = apply_qc_matrix(df, spec['qc_columns'], spec['qc_prefix'])
+        for main_col, min_col_name, max_col_name in missing_limits:
+            add_diagnostic(diagnostics, 'warning', f"QC 체크 건너뜀: '{main_col}'에 대한 필수 제한 컬럼 ('{min_col_name}' 또는 '{max_col_name}')을 찾을 수 없습니다. 컬럼 이름을 확인해주세요.")
+
+    if preprocess is not None:
+        preprocess(df)
+
+    # === PassStatusNorm 컬럼 생성 ===
+    pass_col = resolve_column(df.columns, spec['pass_col'])
+    if pass_col is None:
+        add_diagnostic(diagnostics, 'error', f"'{spec['pass_col']}' 컬럼을 찾을 수 없어 'PassStatusNorm' 생성에 실패했습니다.")
+        return None, None
+    df['PassStatusNorm'] = normalize_pass_status(df[pass_col])
+
+    # === 타임스탬프 변환 ===
+    progress('timestamps')
+    timestamp_col = resolve_column(df.columns, spec['timestamp_col'])
+    if timestamp_col is None:
+        add_diagnostic(diagnostics, 'error', f"'{spec['timestamp_col']}' 컬럼이 데이터에 없습니다.")
+        return None, None
+
+    converted = parse_timestamps(df[timestamp_col], spec['timestamp_formats'])
+    if converted.isnull().all():
+        add_diagnostic(diagnostics, 'warning', f"타임스탬프 변환에 실패했습니다. '{timestamp_col}' 컬럼의 형식을 확인해주세요.")
+        return None, None
+    df[timestamp_col] = converted
+
+    sn_col = resolve_column(df.columns, 'SNumber')
+    if sn_col != 'SNumber':
+        df['SNumber'] = df[sn_col]
+
+    jig_col = _resolve_jig_column(df, spec, converted.notna())
+
+    # 반복 값 컬럼(Jig, SNumber, 제한값 등)을 category 코드로 바꿔 세션에 보관하는 df 의 메모리를 줄입니다.
+    encode_repeated_columns(df, always=[jig_col, 'SNumber'])
+    progress('aggregate')
+    return aggregate_station(df, jig_col, timestamp_col, spec['pass_scope'], spec['detail'])
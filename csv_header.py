@@ -0,0 +1,100 @@
+#
+# csv_header.py
+# 업로드 파일의 원본 바이트를 한 줄씩 스캔하여 헤더 행의 위치와 인코딩을 찾는 공용 모듈입니다.
+# Pcb, Fw, RfTx, Semi, Batadc 리더가 모두 이 모듈을 사용합니다.
+#
+
+import io
+import pandas as pd
+
+# 시도할 인코딩 순서 (기존 리더와 동일)
+ENCODINGS = ['utf-8', 'utf-8-sig', 'cp949', 'euc-kr', 'latin1']
+
+_BOM = b'\xef\xbb\xbf'
+
+
+def _split_header_cells(line_text, case_sensitive):
+    """헤더 후보 행을 셀 단위로 분리하고 공백/탭/따옴표를 정리하는 함수"""
+    cells = []
+    for cell in line_text.split(','):
+        cell = cell.replace('\t', '').strip().strip('"').strip()
+        if cell:
+            cells.append(cell if case_sensitive else cell.lower())
+    return cells
+
+
+def _is_header_line(cells, keywords, partial):
+    """정리된 셀 목록이 모든 키워드를 포함하는지 확인하는 함수"""
+    if partial:
+        # 부분 일치: 키워드가 어떤 셀의 일부로라도 포함되면 인정 (Semi 방식)
+        return all(any(keyword in cell for cell in cells) for keyword in keywords)
+    return all(keyword in cells for keyword in keywords)
+
+
+def detect_encoding(prefix, encodings=None):
+    """헤더까지의 앞부분(prefix)만 디코딩해 보고 처음 성공한 인코딩을 반환하는 함수"""
+    for encoding in (encodings or ENCODINGS):
+        try:
+            prefix.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def locate_header(file_content, keywords, case_sensitive=True, partial=False, max_lines=None, encodings=None):
+    """
+    원본 바이트를 줄 단위로 스캔하여 모든 키워드를 포함하는 첫 번째 행을 찾는 함수.
+    파일 전체를 디코딩하거나 파싱하지 않고, 헤더 행을 찾는 즉시 스캔을 멈춥니다.
+
+    반환값: (헤더 행 시작 바이트 위치, 인코딩). 헤더를 찾지 못하면 (None, None).
+    """
+    targets = list(keywords) if case_sensitive else [keyword.lower() for keyword in keywords]
+    # 키워드는 모두 ASCII 이므로 바이트 수준에서 빠르게 사전 검사할 수 있습니다.
+    target_bytes = [keyword.encode('ascii') for keyword in targets]
+
+    pos = len(_BOM) if file_content.startswith(_BOM) else 0
+    total = len(file_content)
+    line_no = 0
+
+    while pos < total and (max_lines is None or line_no < max_lines):
+        end = file_content.find(b'\n', pos)
+        if end == -1:
+            end = total
+        line = file_content[pos:end]
+        probe = line if case_sensitive else line.lower()
+
+        if all(keyword in probe for keyword in target_bytes):
+            # ASCII 키워드 비교만 하므로 latin1 디코딩은 항상 안전합니다.
+            cells = _split_header_cells(line.decode('latin1'), case_sensitive)
+            if _is_header_line(cells, targets, partial):
+                encoding = detect_encoding(file_content[:end], encodings)
+                return pos, encoding
+
+        pos = end + 1
+        line_no += 1
+
+    return None, None
+
+
+def read_csv_from_header(file_content, keywords, case_sensitive=True, partial=False, max_lines=None, **read_kwargs):
+    """
+    locate_header로 찾은 위치부터 파일을 단 한 번만 파싱하여 DataFrame을 반환하는 함수.
+    헤더 이후 구간에서 인코딩 오류가 나는 경우에만 다음 인코딩으로 다시 시도합니다.
+
+    반환값: (DataFrame, 인코딩). 헤더를 찾지 못하면 (None, None).
+    """
+    offset, encoding = locate_header(file_content, keywords, case_sensitive, partial, max_lines)
+    if offset is None or encoding is None:
+        return None, None
+
+    candidates = ENCODINGS[ENCODINGS.index(encoding):] if encoding in ENCODINGS else [encoding]
+    for candidate in candidates:
+        try:
+            buffer = io.BytesIO(file_content)
+            buffer.seek(offset)
+            df = pd.read_csv(buffer, header=0, encoding=candidate, **read_kwargs)
+            return df, candidate
+        except UnicodeDecodeError:
+            continue
+    return None, None
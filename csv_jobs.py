@@ -0,0 +1,194 @@
+#
+# csv_jobs.py
+# 분석 작업을 Streamlit 스크립트 밖의 작업 스레드에서 실행하는 작업 관리 모듈입니다.
+# 작업 관리자는 st.cache_resource 로 프로세스에 하나만 만들고, 작업마다 ID 를 붙여 보관합니다.
+# 스크립트가 다시 실행되거나 브라우저가 다시 연결되어도 작업은 계속 실행되며, 세션은 작업 ID 로 상태를 다시 조회합니다.
+#
+# 작업 함수는 첫 인자로 AnalysisJob 을 받아 단계(파일 읽기 → 문자열 정리 → QC 체크 → 타임스탬프 변환 → 집계)마다
+# job.report(stage) 를 호출합니다. 취소 요청은 다음 report() 호출에서 JobCancelled 예외로 작업을 멈춥니다.
+# 분석 결과(DataFrame 등)를 복사 없이 세션에 넘겨야 하므로 프로세스가 아닌 스레드에서 실행합니다.
+# (파일 여러 개를 읽는 일괄 분석은 작업 안에서 csv_batch 의 프로세스 풀을 그대로 사용합니다.)
+#
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+# 작업 단계 (진행률은 이 순서로 계산합니다)
+JOB_STAGES = {
+    'read': '파일 읽기',
+    'clean': '문자열 정리',
+    'qc': 'QC 체크',
+    'timestamps': '타임스탬프 변환',
+    'aggregate': '집계',
+}
+
+JOB_STATUS = {
+    'queued': '대기 중',
+    'running': '실행 중',
+    'done': '완료',
+    'failed': '실패',
+    'cancelled': '취소됨',
+}
+
+MAX_WORKERS_ENV = 'ANALYSIS_JOB_WORKERS'
+DEFAULT_MAX_WORKERS = 2
+
+# 결과를 가져가지 않은 끝난 작업을 보관할 최대 개수 (넘으면 오래된 작업부터 지웁니다)
+MAX_FINISHED_JOBS = 16
+
+
+class JobCancelled(Exception):
+    """취소 요청을 받은 작업이 다음 단계에서 멈출 때 발생하는 예외"""
+
+
+class AnalysisJob:
+    """
+    분석 작업 하나의 상태를 보관하는 클래스.
+    status / stage / detail / result / error 는 작업 스레드가 쓰고 스크립트가 읽습니다.
+    결과(result, error)를 먼저 쓰고 마지막에 status 를 바꾸므로, finished 가 True 이면 결과를 바로 읽을 수 있습니다.
+    """
+
+    def __init__(self, job_id, station, kind):
+        self.job_id = job_id
+        self.station = station
+        self.kind = kind
+        self.status = 'queued'
+        self.stage = None
+        self.detail = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._future = None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def progress(self):
+        """0~1 사이 진행률 (현재 단계 이전까지 끝난 단계의 비율)"""
+        if self.status == 'done':
+            return 1.0
+        if self.stage not in JOB_STAGES:
+            return 0.0
+        return list(JOB_STAGES).index(self.stage) / len(JOB_STAGES)
+
+    def elapsed(self):
+        """실행 시간(초). 아직 시작하지 않았으면 0."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def describe(self):
+        """진행 표시용 문장 (예: '실행 중 · QC 체크 (12.3초)')"""
+        text = JOB_STATUS[self.status]
+        if self.status == 'running' and self.stage is not None:
+            text += f" · {JOB_STAGES.get(self.stage, self.stage)}"
+            if self.detail:
+                text += f" ({self.detail})"
+        if self.started_at is not None:
+            text += f" · {self.elapsed():.1f}초"
+        return text
+
+    def report(self, stage, detail=None):
+        """작업 함수가 단계를 시작할 때 호출하는 진행 보고 함수. 취소 요청을 받았으면 JobCancelled 를 발생시킵니다."""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.stage = stage
+        self.detail = detail
+
+    def cancel(self):
+        """취소를 요청하는 함수. 아직 시작하지 않은 작업은 바로 취소되고, 실행 중인 작업은 다음 단계에서 멈춥니다."""
+        self._cancel_event.set()
+        if self._future is not None and self._future.cancel():
+            self._finish('cancelled')
+
+    def _finish(self, status):
+        self.finished_at = time.time()
+        self.status = status
+
+    def _run(self, func, args, kwargs):
+        if self._cancel_event.is_set():
+            self._finish('cancelled')
+            return
+        self.started_at = time.time()
+        self.status = 'running'
+        try:
+            result = func(self, *args, **kwargs)
+        except JobCancelled:
+            self._finish('cancelled')
+            return
+        except Exception as e:
+            self.error = str(e)
+            self._finish('failed')
+            return
+        self.result = result
+        self._finish('done')
+
+
+class JobManager:
+    """작업 스레드 풀과 작업 ID → AnalysisJob 목록을 관리하는 클래스 (여러 세션이 공유하므로 잠금 사용)"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, station, kind, func, *args, **kwargs):
+        """
+        func(job, *args, **kwargs) 를 작업 스레드에서 실행하도록 등록하는 함수.
+
+        반환값: 작업 ID
+        """
+        job = AnalysisJob(uuid.uuid4().hex[:12], station, kind)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        job._future = self._executor.submit(job._run, func, args, kwargs)
+        return job.job_id
+
+    def get(self, job_id):
+        """작업 ID 의 AnalysisJob 을 반환하는 함수. 없으면(지워졌거나 서버가 다시 시작됨) None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def discard(self, job_id):
+        """결과를 가져간 작업을 목록에서 지우는 함수 (결과 DataFrame 참조를 놓아 줍니다)"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+@st.cache_resource
+def get_job_manager():
+    """모든 세션이 공유하는 분석 작업 관리자를 반환하는 함수"""
+    max_workers = int(os.environ.get(MAX_WORKERS_ENV, DEFAULT_MAX_WORKERS))
+    return JobManager(max(1, max_workers))
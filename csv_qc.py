@@ -0,0 +1,190 @@
+#
+# csv_qc.py
+# 측정값/하한(Min)/상한(Max) 컬럼 묶음을 한 번에 숫자 행렬로 변환하여 QC 판정을 수행하는 모듈입니다.
+# Pcb(PcbXxx / PcbMinXxx / PcbMaxXxx)와 SemiAssy(SemiAssyXxx / SemiAssyMinXxx / SemiAssyMaxXxx) 구조를 모두 지원합니다.
+#
+
+import pandas as pd
+import numpy as np
+
+# QC 판정 값과 코드 (코드 = 목록의 위치). 모든 _QC 컬럼이 같은 카테고리 사전을 공유합니다.
+QC_STATUSES = ['Pass', '제외', '미달', '초과', '데이터 부족']
+QC_DTYPE = pd.CategoricalDtype(QC_STATUSES)
+
+QC_PASS, QC_EXCLUDED, QC_BELOW, QC_ABOVE, QC_NO_DATA = range(len(QC_STATUSES))
+
+
+def find_qc_triplets(columns, qc_columns, prefix):
+    """
+    측정 컬럼마다 대응하는 Min/Max 컬럼을 찾는 함수 (대소문자/공백 무시).
+    예: prefix='Pcb' 이면 'PcbIrPwr' → 'PcbMinIrPwr', 'PcbMaxIrPwr'
+
+    반환값: ([(측정 컬럼, Min 컬럼, Max 컬럼), ...], [(측정 컬럼, Min 이름, Max 이름), ...] 찾지 못한 목록)
+    """
+    cols_lower = {str(col).strip().lower(): col for col in columns}
+    triplets = []
+    missing = []
+
+    for main_col in qc_columns:
+        min_col_name = main_col.replace(prefix, prefix + 'Min', 1)
+        max_col_name = main_col.replace(prefix, prefix + 'Max', 1)
+        actual = [cols_lower.get(name.lower()) for name in (main_col, min_col_name, max_col_name)]
+        if any(col is None for col in actual):
+            missing.append((main_col, min_col_name, max_col_name))
+        else:
+            triplets.append(tuple(actual))
+
+    return triplets, missing
+
+
+def _text_to_float(series):
+    """
+    문자열 컬럼을 float64 배열로 변환하는 함수.
+    측정값/제한값은 같은 값이 반복되므로 고유 값만 to_numeric 으로 변환한 뒤 코드로 펼칩니다.
+    (to_numeric 은 앞뒤 공백을 스스로 무시하므로 별도의 strip 이 필요 없습니다.)
+    """
+    codes, uniques = pd.factorize(series)
+    unique_numbers = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    unique_numbers = np.append(unique_numbers, np.nan)  # 코드 -1 (결측) → NaN
+    return unique_numbers[codes]
+
+
+def to_float_matrix(df, columns):
+    """
+    여러 컬럼을 (행 수 x 컬럼 수) float64 행렬로 한 번에 변환하는 함수.
+    이미 숫자형인 컬럼은 그대로 복사하고, 문자열 컬럼은 고유 값 단위로 변환합니다.
+    """
+    matrix = np.empty((len(df), len(columns)), dtype=np.float64)
+
+    for j, col in enumerate(columns):
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            matrix[:, j] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            matrix[:, j] = _text_to_float(series)
+
+    return matrix
+
+
+def _is_reduced_float(series):
+    """float64 보다 낮은 정밀도(float32 등)의 실수 컬럼인지 확인하는 함수"""
+    dtype = series.dtype
+    return pd.api.types.is_float_dtype(dtype) and np.dtype(getattr(dtype, 'numpy_dtype', dtype)).itemsize < 8
+
+
+def unify_triplet_precision(df, triplets, matrix):
+    """
+    측정값/Min/Max 묶음을 같은 정밀도로 맞추는 함수 (matrix 직접 수정).
+    스키마 레지스트리는 측정값을 float32 로 읽지만, Jig 로 쓰는 PcbMaxIrPwr 처럼 category(문자열)로 읽은 제한값은
+    텍스트에서 float64 로 변환됩니다. 12.3 이 float32 로는 12.300000190734863, float64 로는 12.3 이 되어
+    제한값과 같은 측정값이 '초과'/'미달'로 판정되므로, 묶음 안에 float32 컬럼이 하나라도 있으면 세 값을 모두 float32 로 반올림해 비교합니다.
+    """
+    for j, triplet in enumerate(triplets):
+        if any(_is_reduced_float(df[col]) for col in triplet):
+            block = matrix[:, 3 * j:3 * j + 3]
+            matrix[:, 3 * j:3 * j + 3] = block.astype(np.float32).astype(np.float64)
+    return matrix
+
+
+def classify_qc_matrix(values, min_limits, max_limits):
+    """
+    측정값/하한/상한 행렬을 QC 코드 행렬(int8)로 분류하는 함수.
+    우선순위: 측정값 0 → '제외', 값 결측 → '데이터 부족', 상한 초과 → '초과', 하한 미달 → '미달', 그 외 'Pass'
+    """
+    codes = np.full(values.shape, QC_PASS, dtype=np.int8)
+    codes[values < min_limits] = QC_BELOW
+    codes[values > max_limits] = QC_ABOVE
+    codes[np.isnan(values) | np.isnan(min_limits) | np.isnan(max_limits)] = QC_NO_DATA
+    # 측정된 수치가 0인 행은 다른 조건과 관계없이 '제외'로 분류합니다.
+    codes[values == 0] = QC_EXCLUDED
+    return codes
+
+
+def apply_qc_matrix(df, qc_columns, prefix):
+    """
+    qc_columns 전체에 대해 QC 판정을 한 번에 수행하고 '<측정 컬럼>_QC' 카테고리 컬럼을 추가하는 함수.
+    df 는 직접 수정됩니다.
+
+    반환값: (df, 찾지 못한 Min/Max 컬럼 목록)
+    """
+    triplets, missing = find_qc_triplets(df.columns, qc_columns, prefix)
+    if not triplets:
+        return df, missing
+
+    flat_columns = [col for triplet in triplets for col in triplet]
+    matrix = unify_triplet_precision(df, triplets, to_float_matrix(df, flat_columns))
+    codes = classify_qc_matrix(matrix[:, 0::3], matrix[:, 1::3], matrix[:, 2::3])
+
+    for j, (main_col, _, _) in enumerate(triplets):
+        df[main_col + '_QC'] = pd.Categorical.from_codes(codes[:, j], dtype=QC_DTYPE)
+
+    return df, missing
+
+
+def qc_code_column(series):
+    """_QC 컬럼의 int8 코드 배열을 반환하는 함수 (QC_DTYPE 이 아닌 컬럼은 판정 문자열로 코드를 만듭니다, 결측은 -1)"""
+    if series.dtype == QC_DTYPE:
+        return series.cat.codes.to_numpy()
+    return pd.Categorical(series.astype(object), dtype=QC_DTYPE).codes
+
+
+def summarize_detail_groups(df, groups, qc_cols, filter_mode='None'):
+    """
+    상세 내역의 (날짜, Jig, 카테고리) 묶음별 QC 필터 결과와 건수를 한 번에 계산하는 함수.
+    모든 묶음의 행 위치를 이어 붙인 뒤 QC 코드 행렬에서 마스크와 bincount 로 처리하므로 묶음 수만큼 pandas 연산을 반복하지 않습니다.
+
+    - groups: [(묶음 키, 카테고리, 행 위치 배열), ...]
+    - filter_mode: 'FailOnly' = 선택한 QC 컬럼 중 하나라도 미달/초과인 행만, 'PassOnly' = PASS 카테고리에서 미달/초과인 행만,
+      그 외 = 필터 없음 (qc_cols 가 비어 있으면 필터를 적용하지 않습니다)
+
+    반환값: {묶음 키: {'positions': 행 위치, 'count': 건수, 'unique_count': 고유 SNumber 수,
+                      'qc_counts': {QC 컬럼: {판정: 건수}}}} (필터 후 남은 행이 없는 묶음은 제외)
+    """
+    if not groups:
+        return {}
+
+    sizes = [len(positions) for _, _, positions in groups]
+    positions = np.concatenate([np.asarray(p, dtype=np.int64) for _, _, p in groups])
+    group_ids = np.repeat(np.arange(len(groups)), sizes)
+    codes = np.column_stack([qc_code_column(df[col])[positions] for col in qc_cols]) if qc_cols else None
+
+    if filter_mode in ('FailOnly', 'PassOnly') and qc_cols:
+        out_of_range = ((codes == QC_BELOW) | (codes == QC_ABOVE)).any(axis=1)
+        applies = np.array([filter_mode == 'FailOnly' or cat == 'pass' for _, cat, _ in groups])
+        keep = out_of_range & applies[group_ids]
+        positions, group_ids, codes = positions[keep], group_ids[keep], codes[keep]
+
+    counts = np.bincount(group_ids, minlength=len(groups))
+
+    # 고유 SNumber 수: (묶음, SNumber 코드) 쌍의 고유 개수를 묶음별로 셉니다 (결측 SNumber 도 하나의 값으로 셈).
+    if 'SNumber' in df.columns:
+        sn = df['SNumber']
+        sn_codes = sn.cat.codes.to_numpy() if isinstance(sn.dtype, pd.CategoricalDtype) else pd.factorize(sn)[0]
+        width = int(sn_codes.max()) + 2 if len(sn_codes) else 1
+        pairs = np.unique(group_ids * width + (sn_codes[positions].astype(np.int64) + 1))
+        unique_counts = np.bincount(pairs // width, minlength=len(groups))
+    else:
+        unique_counts = np.zeros(len(groups), dtype=np.int64)
+
+    # QC 판정별 건수: 컬럼마다 (묶음, 판정 코드) 를 한 번의 bincount 로 셉니다.
+    n_status = len(QC_STATUSES)
+    status_counts = np.zeros((len(groups), len(qc_cols), n_status), dtype=np.int64)
+    for j in range(len(qc_cols)):
+        valid = codes[:, j] >= 0
+        flat = group_ids[valid] * n_status + codes[valid, j]
+        status_counts[:, j] = np.bincount(flat, minlength=len(groups) * n_status).reshape(len(groups), n_status)
+
+    result = {}
+    for g, part in enumerate(np.split(positions, np.cumsum(counts)[:-1])):
+        if counts[g] == 0:
+            continue
+        result[groups[g][0]] = {
+            'positions': part.astype(np.int32),
+            'count': int(counts[g]),
+            'unique_count': int(unique_counts[g]),
+            'qc_counts': {
+                col: {QC_STATUSES[k]: int(n) for k, n in enumerate(status_counts[g, j]) if n > 0}
+                for j, col in enumerate(qc_cols)
+            },
+        }
+    return result
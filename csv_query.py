@@ -0,0 +1,399 @@
+#
+# csv_query.py
+# DF 조회용 필터 식 모듈입니다.
+# 예: PcbIrPwr_QC in (미달, 초과) and PcbIrCurr > 12.5 and FwPC == 'PC03'
+#
+# 식은 한 번만 해석(토큰 분리 → 재귀 하강 파서)하여 구문 트리로 만들고,
+#   - 분석된 DataFrame 에는 벡터화된 bool 마스크로 (category 컬럼은 값 사전에서만 비교한 뒤 행 코드로 펼침)
+#   - SQLite 테이블에는 매개변수(?)를 사용하는 WHERE 절로
+# 변환합니다.
+#
+# 문법 (키워드는 대소문자 무시):
+#   식     := 또는식
+#   또는식 := 그리고식 ('or' 그리고식)*
+#   그리고식 := 부정식 ('and' 부정식)*
+#   부정식 := 'not' 부정식 | '(' 식 ')' | 비교
+#   비교   := 컬럼 (== | = | != | > | >= | < | <=) 값
+#           | 컬럼 ['not'] 'in' '(' 값 (',' 값)* ')'
+#           | 컬럼 'contains' 값
+#           | 컬럼 'between' 값 'and' 값   (양 끝 포함. 날짜만 적은 위쪽 끝은 그날 전체를 포함)
+#   값     := 따옴표 문자열 | 숫자 | 공백/괄호/쉼표/비교 기호가 없는 단어 (예: 미달)
+#
+# 값이 없는(결측) 행은 어떤 비교에서도 False 이며, 'not' 은 그 결과를 뒤집습니다.
+# 숫자 값과 비교하면(==, != 포함) 문자열 값은 숫자 모양(부호, 소수점, 지수)인 값만 숫자로 바꿔 비교하며, 마스크와 SQL 이 같은 규칙을 씁니다.
+#
+
+import operator
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+class QueryError(ValueError):
+    """필터 식을 해석하거나 적용할 수 없을 때 발생하는 예외"""
+
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<op>==|!=|>=|<=|=|>|<|\(|\)|,)
+      | (?P<word>[^\s'"(),=!<>]+)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {'and', 'or', 'not', 'in', 'contains', 'between'}
+
+_COMPARE_OPS = {
+    '==': operator.eq, '!=': operator.ne,
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+}
+_ORDER_OPS = {'>', '>=', '<', '<='}
+
+# 숫자로 인정하는 문자열 모양 (부호, 소수점, 지수 표기). SQL 쪽(_sql_numeric_shape)도 같은 모양만 숫자로 비교합니다.
+# 날짜만 있는 값 (예: 2024-01-05, 2024/01/05). <= 와 > 에서는 그날 전체를 포함하도록 다음 날 0시로 바꿔 비교합니다.
+_DATE_ONLY_RE = re.compile(r'([0-9]{4})([-/])([0-9]{2})\2([0-9]{2})')
+
+_NUMBER_RE = re.compile(r'[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?')
+
+
+class Literal:
+    """식의 값. 원래 문자열(text)과 숫자로 해석한 값(number, 숫자가 아니면 None)을 함께 보관합니다."""
+
+    def __init__(self, text):
+        self.text = text
+        self.number = float(text) if _NUMBER_RE.fullmatch(text.strip()) else None
+
+    def __repr__(self):
+        return f"Literal({self.text!r})"
+
+
+def tokenize(text):
+    """필터 식을 (종류, 값) 토큰 목록으로 나누는 함수. 종류: 'string', 'op', 'word', 'keyword'"""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None or match.end() == pos:
+            raise QueryError(f"해석할 수 없는 문자가 있습니다: '{text[pos:pos + 10]}'")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'string':
+            value = re.sub(r'\\(.)', r'\1', value[1:-1])
+        elif kind == 'word' and value.lower() in _KEYWORDS:
+            kind, value = 'keyword', value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    """토큰 목록을 구문 트리(튜플)로 바꾸는 재귀 하강 파서"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self, kind=None, value=None):
+        token = self._peek()
+        if token[0] is None or (kind is not None and token[0] != kind) or (value is not None and token[1] != value):
+            expected = value or kind or '값'
+            found = token[1] if token[0] is not None else '식의 끝'
+            raise QueryError(f"'{expected}' 이(가) 필요한 위치에 '{found}' 이(가) 있습니다.")
+        self.pos += 1
+        return token
+
+    def _accept(self, kind, value=None):
+        token = self._peek()
+        if token[0] == kind and (value is None or token[1] == value):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        if not self.tokens:
+            raise QueryError("필터 식이 비어 있습니다.")
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise QueryError(f"식의 끝에 해석할 수 없는 부분이 있습니다: '{self._peek()[1]}'")
+        return node
+
+    def _or(self):
+        nodes = [self._and()]
+        while self._accept('keyword', 'or'):
+            nodes.append(self._and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def _and(self):
+        nodes = [self._not()]
+        while self._accept('keyword', 'and'):
+            nodes.append(self._not())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def _not(self):
+        if self._accept('keyword', 'not'):
+            return ('not', self._not())
+        if self._accept('op', '('):
+            node = self._or()
+            self._take('op', ')')
+            return node
+        return self._comparison()
+
+    def _value(self):
+        kind, value = self._peek()
+        if kind not in ('string', 'word'):
+            raise QueryError(f"값이 필요한 위치에 '{value if kind else '식의 끝'}' 이(가) 있습니다.")
+        self.pos += 1
+        return Literal(value)
+
+    def _comparison(self):
+        column = self._take('word')[1]
+        kind, value = self._peek()
+
+        if kind == 'op' and value in ('==', '=', '!=', '>', '>=', '<', '<='):
+            self.pos += 1
+            return ('cmp', column, '==' if value == '=' else value, self._value())
+
+        negated = self._accept('keyword', 'not')
+        if self._accept('keyword', 'in'):
+            self._take('op', '(')
+            values = [self._value()]
+            while self._accept('op', ','):
+                values.append(self._value())
+            self._take('op', ')')
+            return ('in', column, values, negated)
+        if negated:
+            raise QueryError("'not' 뒤에는 'in' 이 와야 합니다.")
+
+        if self._accept('keyword', 'contains'):
+            return ('contains', column, self._value())
+        if self._accept('keyword', 'between'):
+            low = self._value()
+            self._take('keyword', 'and')
+            return ('between', column, low, self._value())
+
+        raise QueryError(f"'{column}' 뒤에 비교 연산자(==, !=, >, >=, <, <=, in, contains, between)가 필요합니다.")
+
+
+# ==============================
+# DataFrame 마스크
+# ==============================
+def _resolve(columns, name):
+    for col in columns:
+        if str(col).strip().lower() == name.lower():
+            return col
+    raise QueryError(f"'{name}' 컬럼이 없습니다.")
+
+
+def _whole_day_bound(op, literal):
+    """
+    날짜만 있는 값의 <= / > 비교를 다음 날 0시 기준의 < / >= 비교로 바꾸는 함수.
+    'Stamp <= 2024-01-05'(between 의 위쪽 끝 포함)가 그날 0시 이후 행을 빠뜨리지 않게 합니다.
+    날짜 형식의 문자열 컬럼(SQL 포함)에도 같은 구분자로 다음 날을 만들어 문자열 순서로 비교합니다.
+
+    반환값: (연산자, Literal)
+    """
+    match = _DATE_ONLY_RE.fullmatch(literal.text.strip())
+    if op not in ('<=', '>') or match is None:
+        return op, literal
+    year, sep, month, day = match.groups()
+    try:
+        next_day = pd.Timestamp(int(year), int(month), int(day)) + pd.Timedelta(days=1)
+    except ValueError:
+        return op, literal
+    return ('<' if op == '<=' else '>='), Literal(next_day.strftime(f'%Y{sep}%m{sep}%d'))
+
+
+def _numeric_values(values):
+    """문자열 값 중 숫자 모양(_NUMBER_RE)인 값만 숫자로 바꾼 float64 Series (나머지는 NaN)"""
+    texts = values.astype(str).str.strip(' ')
+    shaped = texts.str.fullmatch(_NUMBER_RE.pattern).fillna(False).astype(bool)
+    return pd.to_numeric(texts.where(shaped), errors='coerce').astype('float64')
+
+
+def _compare_values(values, op, literal):
+    """category 가 아닌 Series(또는 category 의 값 사전)를 literal 과 비교한 bool 배열 (결측은 False)"""
+    op, literal = _whole_day_bound(op, literal)
+    if op == 'contains':
+        result = values.astype(str).str.contains(literal.text, case=False, regex=False)
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        try:
+            rhs = pd.Timestamp(literal.text)
+        except ValueError:
+            raise QueryError(f"'{literal.text}' 을(를) 날짜/시간으로 해석할 수 없습니다.") from None
+        result = _COMPARE_OPS[op](values, rhs)
+    elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        if literal.number is None:
+            raise QueryError(f"숫자 컬럼과 숫자가 아닌 값 '{literal.text}' 을(를) 비교할 수 없습니다.")
+        result = _COMPARE_OPS[op](values, literal.number)
+    elif literal.number is not None:
+        # 문자열로 저장된 측정값은 숫자 모양인 값만 숫자로 바꿔 비교합니다 ('12.30' == 12.3).
+        # 숫자가 아닌 값은 크기 비교와 == 에서 False, != 에서 True 입니다.
+        numbers = _numeric_values(values)
+        result = _COMPARE_OPS[op](numbers, literal.number)
+        if op == '!=':
+            result = result | numbers.isna()
+    else:
+        result = _COMPARE_OPS[op](values.astype(str), literal.text)
+
+    result = pd.Series(result, index=values.index).fillna(False).to_numpy(dtype=bool)
+    return result & values.notna().to_numpy()
+
+
+def _column_mask(series, op, literals):
+    """
+    컬럼 하나에 대한 비교(literals 중 하나라도 만족) 마스크.
+    category 컬럼은 값 사전에서만, 문자열 컬럼은 고유 값으로 묶은 뒤 고유 값에서만 비교하고 행 코드로 펼칩니다.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    elif pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+        codes, uniques = pd.factorize(series)
+    else:
+        codes = None
+
+    if codes is not None:
+        uniques = pd.Series(uniques)
+        matched = np.zeros(len(uniques), dtype=bool)
+        for literal in literals:
+            matched |= _compare_values(uniques, op, literal)
+        return np.append(matched, False)[codes]
+
+    mask = np.zeros(len(series), dtype=bool)
+    for literal in literals:
+        mask |= _compare_values(series, op, literal)
+    return mask
+
+
+def _eval_mask(node, df):
+    kind = node[0]
+    if kind == 'and':
+        mask = _eval_mask(node[1][0], df)
+        for child in node[1][1:]:
+            mask &= _eval_mask(child, df)
+        return mask
+    if kind == 'or':
+        mask = _eval_mask(node[1][0], df)
+        for child in node[1][1:]:
+            mask |= _eval_mask(child, df)
+        return mask
+    if kind == 'not':
+        return ~_eval_mask(node[1], df)
+
+    series = df[_resolve(df.columns, node[1])]
+    if kind == 'cmp':
+        return _column_mask(series, node[2], [node[3]])
+    if kind == 'in':
+        mask = _column_mask(series, '==', node[2])
+        return ~mask & series.notna().to_numpy() if node[3] else mask
+    if kind == 'contains':
+        return _column_mask(series, 'contains', [node[2]])
+    # between
+    return _column_mask(series, '>=', [node[2]]) & _column_mask(series, '<=', [node[3]])
+
+
+# ==============================
+# SQL WHERE 절
+# ==============================
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _sql_numeric_shape(value):
+    """
+    value(SQL 식)가 _NUMBER_RE 와 같은 숫자 모양인지 검사하는 SQL 조건.
+    GLOB 으로는 정규식을 쓸 수 없으므로 지수(e) 앞의 가수와 뒤의 지수를 나눠
+    허용 문자, 부호 위치(맨 앞만), 소수점 개수(하나 이하), 숫자 포함 여부를 각각 확인합니다.
+    """
+    exp_at = f"instr(lower({value}), 'e')"
+    mantissa = f"(CASE WHEN {exp_at} > 0 THEN substr({value}, 1, {exp_at} - 1) ELSE {value} END)"
+    exponent = f"(CASE WHEN {exp_at} > 0 THEN substr({value}, {exp_at} + 1) ELSE '0' END)"
+    return (
+        f"({mantissa} GLOB '*[0-9]*' AND {mantissa} NOT GLOB '*[^0-9.+-]*' AND {mantissa} NOT GLOB '?*[+-]*' "
+        f"AND {mantissa} NOT GLOB '*.*.*' "
+        f"AND {exponent} GLOB '*[0-9]*' AND {exponent} NOT GLOB '*[^0-9+-]*' AND {exponent} NOT GLOB '?*[+-]*')"
+    )
+
+
+def _sql_compare(column, op, literal, params):
+    op, literal = _whole_day_bound(op, literal)
+    quoted = _quote(column)
+    sql_op = '=' if op == '==' else '<>' if op == '!=' else op
+    if literal.number is not None:
+        # DB 컬럼은 문자열(CHAR)이므로 숫자 모양인 값만 숫자로 바꿔 비교합니다 (DataFrame 마스크의 _numeric_values 와 같은 규칙).
+        # 숫자가 아닌 값은 크기 비교와 = 에서 거짓, <> 에서 참입니다.
+        value = f"trim({quoted})"
+        params.append(literal.number)
+        compare = f"CAST({value} AS REAL) {sql_op} ?"
+        if op == '!=':
+            return f"({quoted} IS NOT NULL AND (NOT {_sql_numeric_shape(value)} OR {compare}))"
+        return f"({_sql_numeric_shape(value)} AND {compare})"
+    params.append(literal.text)
+    return f"{quoted} {sql_op} ?"
+
+
+def _to_sql(node, columns, params):
+    kind = node[0]
+    if kind in ('and', 'or'):
+        return '(' + f' {kind.upper()} '.join(_to_sql(child, columns, params) for child in node[1]) + ')'
+    if kind == 'not':
+        return f"NOT COALESCE({_to_sql(node[1], columns, params)}, 0)"
+
+    column = _resolve(columns, node[1])
+    if kind == 'cmp':
+        return _sql_compare(column, node[2], node[3], params)
+    if kind == 'in':
+        if all(literal.number is None for literal in node[2]):
+            params.extend(literal.text for literal in node[2])
+            placeholders = ', '.join('?' for _ in node[2])
+            return f"{_quote(column)} {'NOT IN' if node[3] else 'IN'} ({placeholders})"
+        # 숫자 값이 섞이면 값마다 == 와 같은 방법(숫자 모양 비교)으로 확인합니다.
+        matched = ' OR '.join(_sql_compare(column, '==', literal, params) for literal in node[2])
+        if node[3]:
+            return f"({_quote(column)} IS NOT NULL AND NOT COALESCE({matched}, 0))"
+        return f"({matched})"
+    if kind == 'contains':
+        escaped = node[2].text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params.append(f'%{escaped}%')
+        return f"{_quote(column)} LIKE ? ESCAPE '\\'"
+    # between
+    return f"({_sql_compare(column, '>=', node[2], params)} AND {_sql_compare(column, '<=', node[3], params)})"
+
+
+# ==============================
+# 공개 인터페이스
+# ==============================
+class FilterQuery:
+    """한 번 해석한 필터 식. mask(df) 로 DataFrame 에, to_sql(columns) 로 SQLite 테이블에 적용합니다."""
+
+    def __init__(self, text):
+        self.text = text
+        self.tree = _Parser(tokenize(text)).parse()
+
+    def mask(self, df):
+        """df 의 각 행이 식을 만족하는지 나타내는 bool 배열을 반환하는 함수"""
+        return _eval_mask(self.tree, df)
+
+    def positions(self, df):
+        """식을 만족하는 행 위치(int64 배열)를 반환하는 함수"""
+        return np.flatnonzero(self.mask(df))
+
+    def to_sql(self, columns):
+        """
+        테이블 컬럼 목록에 대한 WHERE 절과 매개변수를 반환하는 함수.
+        값은 모두 매개변수(?)로 넘기고, 컬럼 이름은 테이블에 실제로 있는 이름만 따옴표로 감싸 사용합니다.
+
+        반환값: (WHERE 절 문자열, 매개변수 목록)
+        """
+        params = []
+        return _to_sql(self.tree, list(columns), params), params
+
+
+@lru_cache(maxsize=128)
+def compile_query(text):
+    """필터 식을 해석한 FilterQuery 를 반환하는 함수 (같은 식은 다시 해석하지 않습니다)"""
+    return FilterQuery(text.strip())
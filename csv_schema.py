@@ -0,0 +1,215 @@
+#
+# csv_schema.py
+# db/SJ_TM2360E.sqlite3 의 inspection / historyinspection 테이블 정의(DDL)와 db/schema_overrides.json 으로
+# 스테이션 컬럼별 pandas dtype 을 정하는 스키마 레지스트리 모듈입니다.
+# DDL 은 모든 컬럼을 CHAR 로 선언하므로 컬럼 이름 규칙으로 종류를 분류합니다.
+#   - 측정값/Min/Max 묶음 (예: PcbIrPwr, PcbMaxIrPwr, PcbMinIrPwr) → float32
+#   - ...PC, ...Pass → category
+#   - ...Stamp, ...StartTime, ...StopTime → timestamp (문자열로 읽고 csv_timestamp 에서 datetime64 로 변환)
+#   - INTEGER 컬럼 → int64 (결측 허용)
+#   - 그 외 → string
+# Jig 로 쓰는 PcbMaxIrPwr / SemiAssyMaxSolarVolt 처럼 규칙과 다르게 다뤄야 하는 컬럼은 overrides 파일에서 지정합니다.
+#
+
+import io
+import json
+import os
+import sqlite3
+from functools import lru_cache
+
+import pandas as pd
+
+from csv_clean import find_escaped_columns
+from csv_header import ENCODINGS, locate_header
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_DB_FILE = os.path.join(_BASE_DIR, 'db', 'SJ_TM2360E.sqlite3')
+SCHEMA_OVERRIDES_FILE = os.path.join(_BASE_DIR, 'db', 'schema_overrides.json')
+SCHEMA_TABLES = ['inspection', 'historyinspection']
+
+# 종류별 read_csv dtype. timestamp 는 형식이 스테이션마다 달라 문자열로 읽습니다.
+KIND_DTYPES = {
+    'float32': 'float32',
+    'int64': 'Int64',
+    'category': 'category',
+    'timestamp': str,
+    'string': str,
+}
+
+# 숫자 컬럼에서 결측으로 취급할 자리표시 값 (장비 로그/DB 에 'null', '-' 로 기록됨)
+NUMERIC_MISSING_TOKENS = ['null', 'NULL', '-']
+
+# 컬럼 dtype 판단과 '="..."' 검사에 사용할 표본 행 수
+SAMPLE_ROWS = 1000
+
+_TIMESTAMP_SUFFIXES = ('Stamp', 'StartTime', 'StopTime')
+_CATEGORY_SUFFIXES = ('PC', 'Pass')
+
+
+def _classify_columns(columns):
+    """DDL 컬럼 (이름, 선언 타입) 목록을 {이름: 종류} 로 분류하는 함수"""
+    names = {name for name, _ in columns}
+    kinds = {}
+
+    for name, declared in columns:
+        if declared.upper().startswith('INT'):
+            kinds[name] = 'int64'
+        elif name.endswith(_TIMESTAMP_SUFFIXES):
+            kinds[name] = 'timestamp'
+        elif name.endswith(_CATEGORY_SUFFIXES):
+            kinds[name] = 'category'
+        else:
+            kinds[name] = 'string'
+
+    # 측정값/Min/Max 묶음: 'XxxMaxYyy' 가 있으면 'XxxMinYyy', 'XxxYyy' 와 함께 float32 로 지정
+    for name in names:
+        prefix, sep, rest = name.partition('Max')
+        if not sep or not prefix or not rest:
+            continue
+        triplet = [prefix + rest, prefix + 'Max' + rest, prefix + 'Min' + rest]
+        if all(col in names for col in triplet):
+            for col in triplet:
+                kinds[col] = 'float32'
+
+    return kinds
+
+
+@lru_cache(maxsize=None)
+def load_schema_registry(db_path=SCHEMA_DB_FILE, overrides_path=SCHEMA_OVERRIDES_FILE):
+    """
+    DDL 과 overrides 파일로 {소문자 컬럼 이름: (컬럼 이름, 종류)} 레지스트리를 만드는 함수.
+    DB 파일이나 overrides 파일이 없으면 있는 쪽만 사용합니다.
+    """
+    columns = []
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        try:
+            for table in SCHEMA_TABLES:
+                for _, name, declared, *_ in conn.execute(f"PRAGMA table_info({table})"):
+                    columns.append((name, declared or ''))
+        finally:
+            conn.close()
+
+    kinds = _classify_columns(columns)
+
+    if os.path.exists(overrides_path):
+        with open(overrides_path, encoding='utf-8') as f:
+            overrides = json.load(f).get('columns', {})
+        for name, kind in overrides.items():
+            if kind not in KIND_DTYPES:
+                raise ValueError(f"schema_overrides.json 의 '{name}' 종류가 올바르지 않습니다: {kind}")
+            kinds[name] = kind
+
+    return {name.lower(): (name, kind) for name, kind in kinds.items()}
+
+
+def column_kind(column, registry=None):
+    """컬럼 이름(대소문자/공백 무시)의 종류를 반환하는 함수. 레지스트리에 없으면 None."""
+    registry = registry if registry is not None else load_schema_registry()
+    entry = registry.get(str(column).strip().lower())
+    return entry[1] if entry else None
+
+
+def schema_read_dtypes(columns, text_columns=(), default=None):
+    """
+    실제 CSV 컬럼 이름 목록에 대한 read_csv dtype 매핑을 만드는 함수.
+    text_columns('="..."' 로 감싸진 컬럼 등)는 문자열로 읽고, 레지스트리에 없는 컬럼은 default(None 이면 자동 추론)를 따릅니다.
+    """
+    registry = load_schema_registry()
+    text_columns = set(text_columns)
+    dtypes = {}
+    for col in columns:
+        kind = column_kind(col, registry)
+        if col in text_columns:
+            dtypes[col] = str
+        elif kind is not None:
+            dtypes[col] = KIND_DTYPES[kind]
+        elif default is not None:
+            dtypes[col] = default
+    return dtypes
+
+
+def _to_float32_if_numeric(series):
+    """문자열 컬럼의 값이 모두 숫자(또는 빈 값)이면 float32 로 바꾸고, 숫자가 아닌 값이 섞여 있으면 원본을 그대로 반환하는 함수"""
+    series_or_missing = series.mask(series.isin(NUMERIC_MISSING_TOKENS))
+    numbers = pd.to_numeric(series_or_missing, errors='coerce')
+    if (numbers.isna() & series_or_missing.notna()).any():
+        return series
+    return numbers.astype('float32')
+
+
+def read_typed_csv(file_content, offset, encoding, cleaner='excel', **read_kwargs):
+    """
+    헤더 위치(offset)부터 스키마 레지스트리의 dtype 으로 CSV 를 읽는 함수.
+    1. 앞부분 표본을 문자열로 읽어 실제 컬럼 이름과 '="..."' 로 감싸진 컬럼을 확인합니다.
+    2. 감싸진 컬럼은 문자열, 나머지는 레지스트리 dtype 으로 한 번에 읽습니다.
+    3. float32 컬럼에 숫자가 아닌 값이 섞여 파싱에 실패하면, 해당 컬럼들만 문자열로 읽은 뒤 숫자로만 이뤄진 컬럼을 float32 로 바꿉니다.
+
+    read_kwargs 의 dtype 은 레지스트리에 없는 컬럼의 기본 dtype 으로 사용합니다.
+    """
+    default_dtype = read_kwargs.pop('dtype', None)
+
+    def buffer():
+        stream = io.BytesIO(file_content)
+        stream.seek(offset)
+        return stream
+
+    sample_kwargs = dict(read_kwargs)
+    sample_rows = min(SAMPLE_ROWS, sample_kwargs.pop('nrows', None) or SAMPLE_ROWS)
+    sample = pd.read_csv(buffer(), header=0, encoding=encoding, nrows=sample_rows, dtype=str, **sample_kwargs)
+    escaped = find_escaped_columns(sample, cleaner)
+    dtypes = schema_read_dtypes(sample.columns, escaped, default_dtype)
+
+    float_columns = [col for col, dtype in dtypes.items() if dtype == 'float32']
+    na_values = {col: NUMERIC_MISSING_TOKENS for col in float_columns}
+
+    try:
+        return pd.read_csv(buffer(), header=0, encoding=encoding, dtype=dtypes, na_values=na_values, **read_kwargs)
+    except UnicodeDecodeError:
+        raise
+    except (ValueError, TypeError):
+        text_dtypes = {col: (str if col in float_columns else dtype) for col, dtype in dtypes.items()}
+        df = pd.read_csv(buffer(), header=0, encoding=encoding, dtype=text_dtypes, **read_kwargs)
+        for col in float_columns:
+            df[col] = _to_float32_if_numeric(df[col])
+        return df
+
+
+def read_station_csv(file_content, spec, **read_kwargs):
+    """
+    스테이션 설정(STATION_SPECS 항목)의 키워드로 헤더를 찾고, 그 위치부터 read_typed_csv 로 한 번만 파싱하는 함수.
+    헤더 이후 구간에서 인코딩 오류가 나는 경우에만 다음 인코딩으로 다시 시도합니다.
+
+    반환값: (DataFrame, 인코딩). 헤더를 찾지 못하면 (None, None).
+    """
+    offset, encoding = locate_header(
+        file_content, spec['keywords'], spec['case_sensitive'], spec['partial'], spec['max_lines']
+    )
+    if offset is None or encoding is None:
+        return None, None
+
+    candidates = ENCODINGS[ENCODINGS.index(encoding):] if encoding in ENCODINGS else [encoding]
+    for candidate in candidates:
+        try:
+            df = read_typed_csv(file_content, offset, candidate, spec['cleaner'], **read_kwargs)
+            return df, candidate
+        except UnicodeDecodeError:
+            continue
+    return None, None
+
+
+def apply_schema_dtypes(df):
+    """
+    이미 읽어 온 DataFrame(예: SQLite 에서 모두 문자열로 읽은 테이블)의 컬럼을 레지스트리 dtype 으로 바꾸는 함수.
+    변환할 수 없는 컬럼(숫자가 아닌 값이 섞인 float32 컬럼 등)은 그대로 둡니다.
+    """
+    registry = load_schema_registry()
+    for col in df.columns:
+        kind = column_kind(col, registry)
+        if kind == 'float32':
+            df[col] = _to_float32_if_numeric(df[col])
+        elif kind == 'category':
+            df[col] = df[col].astype('category')
+        elif kind == 'int64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    return df
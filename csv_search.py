@@ -0,0 +1,140 @@
+#
+# csv_search.py
+# 분석된 DataFrame 의 SNumber 검색 인덱스 모듈입니다.
+# 분석 직후 한 번 만들어 두고, DF 조회의 SNumber 검색(정확히 일치 / 앞부분 일치 / 포함)을 행 위치 배열로 돌려줍니다.
+#   - 고유 SNumber(소문자)를 정렬한 배열 → 정확히 일치/앞부분 일치는 이진 탐색
+#   - 고유 SNumber 의 3글자 조각(trigram) 색인 → 포함 검색은 후보를 좁힌 뒤 후보만 확인
+#   - 고유 SNumber 별 행 위치(CSR 구조) → 일치한 SNumber 의 행 위치를 복사 없이 모음
+#
+
+import numpy as np
+import pandas as pd
+
+SEARCH_MODES = {
+    'contains': '포함',
+    'prefix': '앞부분 일치',
+    'exact': '정확히 일치',
+}
+
+# trigram 색인에 사용할 최대 글자 수. 색인 폭보다 긴 SNumber 는 포함 검색 때 항상 직접 확인합니다.
+TRIGRAM_MAX_CHARS = 64
+
+# 코드 포인트(최대 0x10FFFF, 21비트) 3개를 int64 하나로 묶어 trigram 키로 사용합니다.
+_CHAR_BITS = 21
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _trigram_keys(chars):
+    """(n, 3) 이상 코드 포인트 행렬의 연속 3글자를 int64 키 행렬로 바꾸는 함수"""
+    chars = chars.astype(np.int64)
+    return (chars[:, :-2] << (2 * _CHAR_BITS)) | (chars[:, 1:-1] << _CHAR_BITS) | chars[:, 2:]
+
+
+class SNumberIndex:
+    """SNumber 컬럼의 정확히 일치 / 앞부분 일치 / 포함 검색 인덱스 (대소문자 무시)"""
+
+    def __init__(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            uniques = series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+        self.row_count = len(series)
+        self._keys = pd.Series(uniques, dtype=object).astype(str).str.lower().to_numpy(dtype=str)
+
+        # 정렬된 고유 값 (정확히 일치/앞부분 일치)
+        self._order = np.argsort(self._keys, kind='stable')
+        self._sorted_keys = self._keys[self._order]
+
+        # 고유 값별 행 위치: 코드 순으로 정렬한 행 위치와 코드별 시작 위치
+        codes = np.asarray(codes, dtype=np.int64)
+        valid = np.flatnonzero(codes >= 0)
+        self._row_positions = valid[np.argsort(codes[valid], kind='stable')]
+        self._row_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(codes[valid], minlength=len(self._keys)))]
+        ).astype(np.int64)
+
+        self._build_trigrams()
+
+    def _build_trigrams(self):
+        lengths = np.char.str_len(self._keys) if len(self._keys) else np.empty(0, dtype=np.int64)
+        # 드물게 섞인 아주 긴 값 때문에 행렬 폭이 커지지 않도록 대부분(99%)의 값이 들어가는 길이로 폭을 정하고,
+        # 그보다 긴 값은 포함 검색 때 항상 직접 확인합니다.
+        width = int(min(np.percentile(lengths, 99), TRIGRAM_MAX_CHARS)) if len(lengths) else 0
+        self._long_ids = np.flatnonzero(lengths > width)
+        if width < 3:
+            self._long_ids = np.arange(len(self._keys))
+            self._trigram_keys, self._trigram_offsets, self._trigram_ids = _EMPTY, np.zeros(1, dtype=np.int64), _EMPTY
+            return
+
+        # 고정 폭 유니코드 배열을 코드 포인트 행렬로 보고 모든 위치의 trigram 을 한 번에 만듭니다 (빈 칸은 0).
+        fixed = self._keys.astype(f'<U{width}')
+        chars = fixed.view(np.uint32).reshape(len(fixed), width)
+        keys = _trigram_keys(chars)
+        present = chars[:, 2:] != 0
+        ids = np.broadcast_to(np.arange(len(fixed))[:, None], keys.shape)[present]
+        keys = keys[present]
+
+        # trigram 키 순으로 안정 정렬하면 같은 키 안에서 고유 값 위치가 오름차순이 되므로, 연속 중복만 지우면 됩니다.
+        order = np.argsort(keys, kind='stable')
+        keys, ids = keys[order], ids[order]
+        distinct = np.ones(len(keys), dtype=bool)
+        distinct[1:] = (keys[1:] != keys[:-1]) | (ids[1:] != ids[:-1])
+        keys, ids = keys[distinct], ids[distinct]
+
+        self._trigram_keys, starts = np.unique(keys, return_index=True)
+        self._trigram_offsets = np.append(starts, len(keys)).astype(np.int64)
+        self._trigram_ids = ids.astype(np.int64)
+
+    def _rows_for(self, ids):
+        """고유 값 위치 목록에 해당하는 행 위치를 원래 행 순서대로 반환하는 함수"""
+        if len(ids) == 0:
+            return _EMPTY
+        parts = [self._row_positions[self._row_offsets[i]:self._row_offsets[i + 1]] for i in ids]
+        return np.sort(np.concatenate(parts))
+
+    def exact(self, query):
+        query = query.lower()
+        lo = np.searchsorted(self._sorted_keys, query, side='left')
+        hi = np.searchsorted(self._sorted_keys, query, side='right')
+        return self._rows_for(self._order[lo:hi])
+
+    def prefix(self, query):
+        query = query.lower()
+        lo = np.searchsorted(self._sorted_keys, query, side='left')
+        hi = np.searchsorted(self._sorted_keys, query + '\U0010ffff', side='left')
+        return self._rows_for(self._order[lo:hi])
+
+    def contains(self, query):
+        query = query.lower()
+        if len(query) < 3:
+            candidates = np.arange(len(self._keys))
+        else:
+            chars = np.array([query]).view(np.uint32).reshape(1, -1)
+            candidates = None
+            for key in np.unique(_trigram_keys(chars)):
+                i = np.searchsorted(self._trigram_keys, key)
+                if i == len(self._trigram_keys) or self._trigram_keys[i] != key:
+                    candidates = _EMPTY
+                    break
+                ids = self._trigram_ids[self._trigram_offsets[i]:self._trigram_offsets[i + 1]]
+                candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            candidates = np.union1d(candidates, self._long_ids)
+
+        matched = candidates[np.char.find(self._keys[candidates], query) >= 0]
+        return self._rows_for(matched)
+
+    def search(self, query, mode='contains'):
+        """mode('contains' / 'prefix' / 'exact')에 따라 query 와 일치하는 행 위치(정렬된 int64 배열)를 반환하는 함수"""
+        if mode == 'exact':
+            return self.exact(query)
+        if mode == 'prefix':
+            return self.prefix(query)
+        return self.contains(query)
+
+
+def build_snumber_index(df):
+    """df 에 SNumber 컬럼이 있으면 검색 인덱스를 만들고, 없으면 None 을 반환하는 함수"""
+    if df is None or 'SNumber' not in df.columns:
+        return None
+    return SNumberIndex(df['SNumber'])
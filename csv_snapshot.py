@@ -0,0 +1,163 @@
+#
+# csv_snapshot.py
+# 분석이 끝난 스테이션 데이터(QC/PassStatusNorm 컬럼이 추가된 df)와 summary_data 를
+# Arrow(Feather v2) 파일로 로컬 디스크에 저장하고, 다시 열 때 메모리 맵으로 읽어 오는 모듈입니다.
+# 스냅샷은 파일 내용 해시(SHA-256)와 분석기 버전(ANALYZER_VERSION)이 같을 때만 사용합니다.
+#
+# 디렉터리 구조: <SNAPSHOT_DIR>/<스테이션>/<파일 해시>-<분석 모드>/
+#   - frame.arrow   : 분석된 df (압축 없음 → 메모리 맵으로 바로 읽기)
+#   - summary.arrow : summary_data 를 (Jig, 날짜) 한 행으로 펼친 표 (상세 위치는 list<int32>)
+#   - meta.json     : 스테이션, 해시, 분석기 버전, all_dates 등
+#
+
+import json
+import os
+import shutil
+from datetime import date, datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from csv_engine import ANALYZER_VERSION, CATEGORIES
+
+# 스냅샷 저장 위치. 환경 변수 ANALYSIS_SNAPSHOT_DIR 로 변경할 수 있습니다.
+SNAPSHOT_DIR_ENV = 'ANALYSIS_SNAPSHOT_DIR'
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+
+_FRAME_FILE = 'frame.arrow'
+_SUMMARY_FILE = 'summary.arrow'
+_META_FILE = 'meta.json'
+
+# summary_data 항목 중 정수 건수 필드
+_COUNT_FIELDS = ['total_test', 'pass', 'false_defect', 'true_defect', 'fail']
+_UNIQUE_FIELDS = [f'{cat}_unique_count' for cat in CATEGORIES]
+
+
+def snapshot_root():
+    return os.environ.get(SNAPSHOT_DIR_ENV, DEFAULT_SNAPSHOT_DIR)
+
+
+def snapshot_path(file_hash, station, mode='full'):
+    return os.path.join(snapshot_root(), station, f'{file_hash}-{mode}')
+
+
+# ==============================
+# summary_data <-> Arrow 표 변환
+# ==============================
+def summary_to_table(summary_data):
+    """summary_data 를 (Jig, 날짜) 당 한 행인 Arrow 표로 펼치는 함수"""
+    rows = [(jig, date_str, data_point) for jig, days in summary_data.items() for date_str, data_point in days.items()]
+    sample = rows[0][2] if rows else {}
+    # 상세 내역 형식: 'idx' = 행 위치 배열, 'sns' = 고유 SNumber 목록 (Semi), None = 상세 없음 (스트리밍 모드)
+    detail_kind = 'idx' if 'pass_idx' in sample else 'sns' if 'pass_sns' in sample else None
+
+    columns = {
+        'jig': pa.array([jig for jig, _, _ in rows]),
+        'date': pa.array([date_str for _, date_str, _ in rows], type=pa.string()),
+    }
+    for field in _COUNT_FIELDS + _UNIQUE_FIELDS:
+        columns[field] = pa.array([dp.get(field, 0) for _, _, dp in rows], type=pa.int64())
+    columns['pass_rate'] = pa.array([dp.get('pass_rate') for _, _, dp in rows], type=pa.string())
+
+    if detail_kind == 'idx':
+        for cat in ('pass', 'false_defect', 'true_defect'):
+            columns[f'{cat}_idx'] = pa.array(
+                [np.asarray(dp.get(f'{cat}_idx', ()), dtype=np.int32) for _, _, dp in rows],
+                type=pa.list_(pa.int32()),
+            )
+    elif detail_kind == 'sns':
+        for cat in CATEGORIES:
+            columns[f'{cat}_sns'] = pa.array([dp.get(f'{cat}_sns', []) for _, _, dp in rows])
+
+    return pa.table(columns)
+
+
+def table_to_summary(table):
+    """summary_to_table 로 펼친 Arrow 표를 summary_data 구조로 되돌리는 함수"""
+    idx_names = [name for name in table.column_names if name.endswith('_idx')]
+    # 상세 위치 컬럼은 파이썬 리스트로 바꾸지 않고 Arrow 배열 그대로 행별로 꺼냅니다.
+    data = table.drop_columns(idx_names).to_pydict()
+    idx_columns = {name: table.column(name).combine_chunks() for name in idx_names}
+
+    summary_data = {}
+    for i, (jig, date_str) in enumerate(zip(data['jig'], data['date'])):
+        data_point = {field: int(data[field][i]) for field in _COUNT_FIELDS}
+        data_point['pass_rate'] = data['pass_rate'][i]
+        for name, column in idx_columns.items():
+            # 리스트 원소는 연속된 int32 버퍼이므로 복사 없이 numpy 배열로 꺼냅니다.
+            data_point[name] = column[i].values.to_numpy(zero_copy_only=False)
+        for cat in CATEGORIES:
+            if f'{cat}_sns' in data:
+                data_point[f'{cat}_sns'] = data[f'{cat}_sns'][i]
+        for field in _UNIQUE_FIELDS:
+            data_point[field] = int(data[field][i])
+        summary_data.setdefault(jig, {})[date_str] = data_point
+
+    return summary_data
+
+
+# ==============================
+# 저장 / 불러오기
+# ==============================
+def save_snapshot(file_hash, station, summary_data, all_dates, df, mode='full', file_name=None):
+    """
+    분석 결과를 스냅샷으로 저장하는 함수.
+    임시 디렉터리에 모두 쓴 뒤 이름을 바꾸므로, 중간에 실패해도 깨진 스냅샷이 남지 않습니다.
+
+    반환값: 저장 성공 여부 (Arrow 로 표현할 수 없는 컬럼이 있는 등 실패하면 False)
+    """
+    target = snapshot_path(file_hash, station, mode)
+    staging = f'{target}.tmp-{os.getpid()}'
+    try:
+        os.makedirs(staging, exist_ok=True)
+        feather.write_feather(df, os.path.join(staging, _FRAME_FILE), compression='uncompressed')
+        feather.write_feather(summary_to_table(summary_data), os.path.join(staging, _SUMMARY_FILE), compression='uncompressed')
+
+        meta = {
+            'station': station,
+            'file_hash': file_hash,
+            'mode': mode,
+            'analyzer_version': ANALYZER_VERSION,
+            'file_name': file_name,
+            'rows': int(len(df)),
+            'all_dates': [d.isoformat() for d in all_dates],
+            'created': datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(os.path.join(staging, _META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+        return True
+    except (OSError, pa.ArrowException, TypeError, ValueError):
+        shutil.rmtree(staging, ignore_errors=True)
+        return False
+
+
+def load_snapshot(file_hash, station, mode='full'):
+    """
+    스냅샷을 메모리 맵으로 읽어 (summary_data, all_dates, df) 를 반환하는 함수.
+    스냅샷이 없거나 분석기 버전이 다르면 None 을 반환하며, 버전이 다른 스냅샷은 삭제합니다.
+    """
+    target = snapshot_path(file_hash, station, mode)
+    meta_path = os.path.join(target, _META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('analyzer_version') != ANALYZER_VERSION or meta.get('file_hash') != file_hash:
+            shutil.rmtree(target, ignore_errors=True)
+            return None
+
+        frame_table = feather.read_table(os.path.join(target, _FRAME_FILE), memory_map=True)
+        summary_table = feather.read_table(os.path.join(target, _SUMMARY_FILE), memory_map=True)
+        df = frame_table.to_pandas(split_blocks=True)
+        summary_data = table_to_summary(summary_table)
+        all_dates = [date.fromisoformat(d) for d in meta['all_dates']]
+        return summary_data, all_dates, df
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        shutil.rmtree(target, ignore_errors=True)
+        return None
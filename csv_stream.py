@@ -0,0 +1,367 @@
+#
+# csv_stream.py
+# 대용량 스테이션 로그를 고정 크기 청크로 읽어 분석하는 스트리밍 모드 모듈입니다.
+# 전체 DataFrame을 메모리에 올리지 않고 summary_data / all_dates 구조를 그대로 만들어 냅니다.
+# 교대 중 계속 늘어나는 로그를 다시 올릴 때는 증분 모드로 마지막 처리 위치 이후에 추가된 행만 읽어 집계를 갱신합니다.
+#
+
+import hashlib
+import io
+import pandas as pd
+import warnings
+
+from csv_header import ENCODINGS, locate_header
+from csv_clean import clean_escaped_columns
+from csv_engine import STATION_SPECS, pick_jig_column, resolve_column
+from csv_timestamp import TimestampParser
+
+warnings.filterwarnings('ignore')
+
+# 청크 하나에 읽어 들일 행 수 기본값
+DEFAULT_CHUNKSIZE = 200_000
+
+# 미리보기(DF 조회)용으로 보관할 최대 행 수
+PREVIEW_ROWS = 1000
+
+# 증분 모드에서 이전에 처리한 부분이 그대로인지 확인할 때 해시하는 마지막 처리 위치 직전 구간 크기(바이트)
+FINGERPRINT_TAIL_BYTES = 64 * 1024
+
+# 값이 있는 Jig 후보 컬럼이 없어 spec['default_jig'] 로 집계할 때의 Jig 컬럼 표시
+_DEFAULT_JIG = object()
+
+
+class StationAccumulator:
+    """
+    청크 단위로 들어오는 (Jig, 날짜, SNumber, 판정) 데이터를 누적 집계하는 클래스.
+    Jig별 '한 번이라도 PASS한 SNumber' 집합을 점진적으로 갱신하고,
+    새로 PASS한 SNumber가 생기면 이전에 진성불량으로 집계된 FAIL을 가성불량으로 옮깁니다.
+    메모리 사용량은 행 수가 아니라 (Jig, 날짜, 고유 SNumber) 조합 수에 비례합니다.
+    """
+
+    def __init__(self, pass_scope='jig'):
+        self.pass_scope = pass_scope
+        self.counts = {}    # (jig, date) -> 항목별 테스트 건수
+        self.sns = {}       # (jig, date) -> 항목별 고유 SNumber 집합
+        self.passed = {}    # 판정 범위 키 -> 한 번이라도 PASS한 SNumber 집합
+        self.pending = {}   # (판정 범위 키, SNumber) -> {date: 진성불량 FAIL 건수}
+        self.dates = set()
+
+    def _scope_key(self, jig, date):
+        return jig if self.pass_scope == 'jig' else (jig, date)
+
+    def _slot(self, jig, date):
+        key = (jig, date)
+        if key not in self.counts:
+            self.counts[key] = {'total_test': 0, 'pass': 0, 'false_defect': 0, 'true_defect': 0, 'fail': 0}
+            self.sns[key] = {'pass': set(), 'false_defect': set(), 'true_defect': set()}
+            self.dates.add(date)
+        return self.counts[key], self.sns[key]
+
+    def _reclassify(self, scope_key, sn):
+        """새로 PASS한 SNumber의 기존 진성불량 FAIL을 가성불량으로 옮기는 함수"""
+        jig = scope_key if self.pass_scope == 'jig' else scope_key[0]
+        for date, count in self.pending.pop((scope_key, sn), {}).items():
+            counts, sns = self._slot(jig, date)
+            counts['true_defect'] -= count
+            counts['false_defect'] += count
+            sns['true_defect'].discard(sn)
+            sns['false_defect'].add(sn)
+
+    def update(self, jigs, dates, snumbers, statuses):
+        """
+        청크 하나를 반영하는 함수.
+        jigs/dates/snumbers/statuses 는 같은 인덱스를 가진 Series 이며, dates 는 datetime.date (없으면 NaN) 입니다.
+        """
+        chunk = pd.DataFrame({'jig': jigs, 'date': dates, 'SNumber': snumbers, 'status': statuses})
+        chunk = chunk[chunk['jig'].notna()]
+
+        # 1. PASS 이력 갱신 (타임스탬프가 없는 행도 Jig 기준 이력에는 포함)
+        pass_rows = chunk[chunk['status'] == 'O']
+        if self.pass_scope == 'jig':
+            scope_groups = pass_rows.groupby('jig', sort=False)['SNumber'].unique()
+        else:
+            scope_groups = pass_rows.dropna(subset=['date']).groupby(['jig', 'date'], sort=False)['SNumber'].unique()
+
+        for scope_key, sns in scope_groups.items():
+            passed = self.passed.setdefault(scope_key, set())
+            new_sns = set(sns) - passed
+            if new_sns:
+                passed |= new_sns
+                for sn in new_sns:
+                    self._reclassify(scope_key, sn)
+
+        # 2. (Jig, 날짜, 판정, SNumber) 조합별 건수 집계
+        dated = chunk.dropna(subset=['date'])
+        grouped = dated.groupby(['jig', 'date', 'status', 'SNumber'], sort=False, dropna=False).size()
+
+        for (jig, date, status, sn), count in grouped.items():
+            count = int(count)
+            counts, sns = self._slot(jig, date)
+            counts['total_test'] += count
+            if status == 'O':
+                counts['pass'] += count
+                sns['pass'].add(sn)
+            elif status == 'X':
+                counts['fail'] += count
+                scope_key = self._scope_key(jig, date)
+                if sn in self.passed.get(scope_key, ()):
+                    counts['false_defect'] += count
+                    sns['false_defect'].add(sn)
+                else:
+                    counts['true_defect'] += count
+                    sns['true_defect'].add(sn)
+                    pending = self.pending.setdefault((scope_key, sn), {})
+                    pending[date] = pending.get(date, 0) + count
+
+    def result(self):
+        """누적된 집계를 analyze_* 함수와 같은 (summary_data, all_dates) 구조로 반환하는 함수"""
+        summary_data = {}
+        for (jig, date), counts in self.counts.items():
+            sns = self.sns[(jig, date)]
+            total_test = counts['total_test']
+            rate = 100 * counts['pass'] / total_test if total_test > 0 else 0
+
+            summary_data.setdefault(jig, {})[date.strftime("%Y-%m-%d")] = {
+                **counts,
+                'pass_rate': f"{rate:.1f}%",
+                'pass_unique_count': len(sns['pass']),
+                'false_defect_unique_count': len(sns['false_defect']),
+                'true_defect_unique_count': len(sns['true_defect']),
+                # 한 SNumber는 같은 Jig/날짜에서 가성/진성 중 한쪽에만 속하므로 합이 곧 FAIL 고유 건수입니다.
+                'fail_unique_count': len(sns['false_defect']) + len(sns['true_defect']),
+            }
+
+        all_dates = sorted(self.dates)
+        return summary_data, all_dates
+
+
+def locate_station_header(file_content, station):
+    """스테이션 설정의 키워드로 헤더 위치와 인코딩을 찾는 함수"""
+    spec = STATION_SPECS[station]
+    return locate_header(
+        file_content, spec['keywords'], spec['case_sensitive'], spec['partial'], spec['max_lines']
+    )
+
+
+def iter_station_chunks(file_content, station, offset, encoding, chunksize=DEFAULT_CHUNKSIZE, usecols=None):
+    """
+    헤더 위치(offset)부터 파일을 청크 단위로 읽어 순서대로 돌려주는 제너레이터.
+    usecols 에는 읽을 컬럼 이름(대소문자 무시)을 지정하며, None 이면 전체 컬럼을 읽습니다.
+    """
+    spec = STATION_SPECS[station]
+
+    wanted = {name.lower() for name in usecols} if usecols else None
+    read_kwargs = {'skipinitialspace': True, 'chunksize': chunksize}
+    if wanted:
+        read_kwargs['usecols'] = lambda col: str(col).strip().lower() in wanted
+    # 청크마다 dtype 추론이 달라지지 않도록 식별 컬럼은 문자열로 고정합니다.
+    read_kwargs['dtype'] = str if spec['timestamp_as_str'] else {
+        col: str for col in ['SNumber', spec['pass_col']] + spec['jig_cols']
+    }
+
+    buffer = io.BytesIO(file_content)
+    buffer.seek(offset)
+    for chunk in pd.read_csv(buffer, header=0, encoding=encoding, **read_kwargs):
+        chunk.columns = [str(col).strip() for col in chunk.columns]
+        yield chunk
+
+
+def _analyze_chunks(chunks, spec, accumulator=None, parse_timestamps=None, preview_limit=PREVIEW_ROWS, progress=None,
+                    jig_col=None):
+    """
+    청크 이터레이터를 소비하며 누적 집계와 미리보기 행을 만드는 함수.
+    accumulator / parse_timestamps 를 넘기면 기존 집계와 타임스탬프 형식 추정 결과에 이어서 반영합니다.
+    progress 를 넘기면 청크를 집계할 때마다 ('aggregate', 처리한 행 수 안내)로 호출합니다.
+    jig_col 이 None 이면 첫 청크에서 전체 분석(csv_engine)과 같은 규칙으로 Jig 컬럼을 정하고, 이후 청크는 모두 그 컬럼을 씁니다.
+    값이 있는 후보가 없으면 모든 행을 spec['default_jig'] 로 집계합니다.
+
+    반환값: (accumulator, 미리보기 DataFrame 또는 None, 읽은 행 수, 사용한 Jig 컬럼). 필수 컬럼이 없으면 accumulator 는 None.
+    """
+    if accumulator is None:
+        accumulator = StationAccumulator(spec['pass_scope'])
+    if parse_timestamps is None:
+        # 형식 추정 결과와 변환 캐시를 모든 청크가 공유합니다.
+        parse_timestamps = TimestampParser(spec['timestamp_formats'])
+    preview = []
+    preview_rows = 0
+    rows = 0
+
+    for chunk in chunks:
+        sn_col = resolve_column(chunk.columns, 'SNumber')
+        ts_col = resolve_column(chunk.columns, spec['timestamp_col'])
+        pass_col = resolve_column(chunk.columns, spec['pass_col'])
+        if sn_col is None or ts_col is None or pass_col is None:
+            return None, None, rows, jig_col
+
+        clean_escaped_columns(chunk, spec['cleaner'])
+        converted = parse_timestamps(chunk[ts_col])
+
+        if jig_col is None:
+            jig_col = pick_jig_column(chunk, spec, converted.notna()) or _DEFAULT_JIG
+        if jig_col is _DEFAULT_JIG:
+            jigs = pd.Series(spec['default_jig'], index=chunk.index)
+        else:
+            jigs = chunk[jig_col]
+        if spec['pass_scope'] == 'jig_day':
+            # Semi 분석과 동일하게 빈 문자열 Jig는 제외합니다.
+            jigs = jigs.where(jigs.astype(str).str.strip() != '')
+
+        chunk[ts_col] = converted
+        chunk['PassStatusNorm'] = chunk[pass_col].fillna('').astype(str).str.strip().str.upper()
+
+        accumulator.update(jigs, converted.dt.date, chunk[sn_col], chunk['PassStatusNorm'])
+        rows += len(chunk)
+        if progress is not None:
+            progress('aggregate', f"{rows:,}행 처리")
+
+        if preview_rows < preview_limit:
+            preview.append(chunk.head(preview_limit - preview_rows))
+            preview_rows += len(preview[-1])
+
+    preview_df = pd.concat(preview, ignore_index=True) if preview else None
+    return accumulator, preview_df, rows, jig_col
+
+
+def _station_usecols(spec):
+    return ['SNumber', spec['timestamp_col'], spec['pass_col']] + spec['jig_cols']
+
+
+def analyze_station_stream(uploaded_file, station, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """
+    스테이션 CSV를 청크 단위로 읽으면서 분석하는 스트리밍 분석 함수.
+    분석에 필요한 컬럼(SNumber, Jig, 타임스탬프, 판정)만 읽고, 청크마다 집계를 누적합니다.
+    progress 는 청크를 집계할 때마다 호출할 함수입니다 (_analyze_chunks 참고).
+
+    반환값: (summary_data, all_dates, preview_df). 헤더나 필수 컬럼을 찾지 못하면 (None, None, None).
+    상세 내역(*_data)은 보관하지 않으며, preview_df 는 앞부분 일부 행만 담습니다.
+    """
+    spec = STATION_SPECS[station]
+    file_content = uploaded_file.getvalue()
+    usecols = _station_usecols(spec)
+
+    offset, encoding = locate_station_header(file_content, station)
+    if offset is None or encoding is None:
+        return None, None, None
+
+    # 헤더 이후 구간에서 디코딩 오류가 나면 다음 인코딩으로 처음부터 다시 집계합니다.
+    for candidate in ENCODINGS[ENCODINGS.index(encoding):] if encoding in ENCODINGS else [encoding]:
+        try:
+            chunks = iter_station_chunks(file_content, station, offset, candidate, chunksize, usecols)
+            accumulator, preview_df, _, _ = _analyze_chunks(chunks, spec, progress=progress)
+        except UnicodeDecodeError:
+            continue
+        if accumulator is None or preview_df is None:
+            return None, None, None
+        summary_data, all_dates = accumulator.result()
+        return summary_data, all_dates, preview_df
+
+    return None, None, None
+
+
+# ==============================
+# 증분(추가분) 분석
+# ==============================
+class IncrementalState:
+    """
+    증분 분석 상태를 보관하는 클래스.
+    누적 집계(StationAccumulator)와 타임스탬프 파서, 마지막으로 처리한 바이트 위치(offset),
+    그리고 다음 업로드에서 offset 이전 부분이 바뀌지 않았는지 확인할 지문(fingerprint)을 함께 보관합니다.
+    """
+
+    def __init__(self, station, encoding, header_start, data_start):
+        spec = STATION_SPECS[station]
+        self.station = station
+        self.encoding = encoding
+        self.header_start = header_start
+        self.data_start = data_start
+        self.offset = data_start
+        self.fingerprint = None
+        self.rows = 0
+        self.preview_df = None
+        self.accumulator = StationAccumulator(spec['pass_scope'])
+        self.parse_timestamps = TimestampParser(spec['timestamp_formats'])
+        self.jig_col = None     # 첫 구간에서 정한 Jig 컬럼 (추가분도 같은 컬럼으로 집계)
+
+    def _fingerprint(self, file_content, offset):
+        # 헤더까지의 앞부분과 offset 직전 구간만 해시하므로 파일이 커져도 확인 비용이 일정합니다.
+        digest = hashlib.sha256()
+        digest.update(str(offset).encode('ascii'))
+        digest.update(file_content[:self.data_start])
+        digest.update(file_content[max(self.data_start, offset - FINGERPRINT_TAIL_BYTES):offset])
+        return digest.hexdigest()
+
+    def matches(self, file_content):
+        """file_content 가 이전에 처리한 파일 뒤에 행이 추가된 파일인지 확인하는 함수"""
+        return len(file_content) >= self.offset and self._fingerprint(file_content, self.offset) == self.fingerprint
+
+    def consume(self, file_content, end, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+        """
+        offset 부터 end 까지 추가된 행만 읽어 누적 집계에 반영하는 함수.
+        헤더 행 뒤에 새 구간만 붙여 읽으므로 비용은 추가된 행 수에 비례합니다.
+        progress 에서 예외(작업 취소 등)가 발생하면 누적 집계가 일부만 반영된 상태로 남으므로 이 상태는 버려야 합니다.
+
+        반환값: 새로 반영한 행 수. 필수 컬럼이 없으면 None.
+        """
+        if end <= self.offset:
+            return 0
+
+        spec = STATION_SPECS[self.station]
+        segment = file_content[self.header_start:self.data_start] + file_content[self.offset:end]
+        chunks = iter_station_chunks(segment, self.station, 0, self.encoding, chunksize, _station_usecols(spec))
+        preview_limit = PREVIEW_ROWS - (0 if self.preview_df is None else len(self.preview_df))
+        accumulator, preview_df, rows, self.jig_col = _analyze_chunks(
+            chunks, spec, self.accumulator, self.parse_timestamps, preview_limit, progress, self.jig_col
+        )
+        if accumulator is None:
+            return None
+
+        if preview_df is not None:
+            self.preview_df = preview_df if self.preview_df is None else pd.concat([self.preview_df, preview_df], ignore_index=True)
+        self.rows += rows
+        self.offset = end
+        self.fingerprint = self._fingerprint(file_content, end)
+        return rows
+
+
+def analyze_station_incremental(uploaded_file, station, state=None, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """
+    같은 로그 파일을 반복해서 올릴 때, 이전 상태(state) 이후에 추가된 행만 읽어 집계를 갱신하는 증분 분석 함수.
+    파일 앞부분이 바뀌었거나(다른 파일, 로그 교체) 상태가 없으면 처음부터 다시 집계합니다.
+    아직 쓰이는 중일 수 있는 마지막 줄(줄바꿈으로 끝나지 않은 행)은 다음 업로드 때 반영합니다.
+    progress 는 청크를 집계할 때마다 호출할 함수이며, progress 의 예외로 중단되면 넘긴 state 는 다시 사용하지 않아야 합니다.
+
+    반환값: (summary_data, all_dates, preview_df, state, 새로 반영한 행 수).
+    헤더나 필수 컬럼을 찾지 못하면 (None, None, None, None, 0).
+    """
+    file_content = uploaded_file.getvalue()
+    end = file_content.rfind(b'\n') + 1
+
+    if state is not None and state.station == station and state.matches(file_content):
+        try:
+            new_rows = state.consume(file_content, end, chunksize, progress)
+        except UnicodeDecodeError:
+            # 추가된 구간의 인코딩이 다르면 일부만 반영된 상태를 버리고 처음부터 다시 집계합니다.
+            new_rows = None
+        if new_rows is not None and state.preview_df is not None:
+            summary_data, all_dates = state.accumulator.result()
+            return summary_data, all_dates, state.preview_df, state, new_rows
+
+    header_start, encoding = locate_station_header(file_content, station)
+    if header_start is None or encoding is None:
+        return None, None, None, None, 0
+    data_start = file_content.find(b'\n', header_start) + 1
+    if data_start == 0:
+        return None, None, None, None, 0
+
+    for candidate in ENCODINGS[ENCODINGS.index(encoding):] if encoding in ENCODINGS else [encoding]:
+        state = IncrementalState(station, candidate, header_start, data_start)
+        try:
+            new_rows = state.consume(file_content, end, chunksize, progress)
+        except UnicodeDecodeError:
+            continue
+        if new_rows is None or state.preview_df is None:
+            return None, None, None, None, 0
+        summary_data, all_dates = state.accumulator.result()
+        return summary_data, all_dates, state.preview_df, state, new_rows
+
+    return None, None, None, None, 0
@@ -0,0 +1,180 @@
+#
+# csv_timestamp.py
+# 스테이션 공용 타임스탬프 변환 모듈입니다.
+# 표본으로 형식을 먼저 추정한 뒤 고유 값 단위로 한 번만 변환하고, 맞지 않는 값만 다른 형식으로 다시 시도합니다.
+#
+
+import pandas as pd
+import numpy as np
+
+# 형식 추정에 사용할 표본 고유 값 수
+SAMPLE_SIZE = 200
+
+# 스트리밍 모드에서 청크 간에 유지할 변환 결과 캐시 최대 항목 수
+CACHE_MAX_ENTRIES = 500_000
+
+# 유닉스 타임스탬프는 1980년 이후 ~ 2100년 이전 값만 유효한 것으로 간주합니다.
+# (1970년 에러 방지, YYYYMMDDHHmmss 숫자가 초/밀리초로 잘못 해석되는 것 방지)
+_EPOCH_MIN_YEAR = 1980
+_EPOCH_MAX_YEAR = 2100
+
+_NAT = np.datetime64('NaT', 'ns')
+
+
+def _parse_strftime(fmt):
+    def parse(texts):
+        return pd.to_datetime(texts, format=fmt, errors='coerce')
+    return parse
+
+
+def _parse_compact(texts):
+    # strptime 은 자릿수가 모자란 값('1704153600' 등 10자리 유닉스 초)도 받아들이므로 정확히 14자리 숫자만 변환합니다.
+    # (db_query 의 SQL 집계도 14자리만 compact 로 인정합니다)
+    texts = np.asarray(texts, dtype=object)
+    shaped = np.fromiter(
+        (isinstance(text, str) and len(text) == 14 and text.isdigit() for text in texts), dtype=bool, count=len(texts)
+    )
+    converted = pd.to_datetime(texts[shaped], format='%Y%m%d%H%M%S', errors='coerce')
+    result = np.full(len(texts), _NAT, dtype='datetime64[ns]')
+    result[shaped] = np.asarray(converted, dtype='datetime64[ns]')
+    return pd.DatetimeIndex(result)
+
+
+def _parse_epoch(unit):
+    def parse(texts):
+        numbers = pd.to_numeric(texts, errors='coerce')
+        converted = pd.to_datetime(numbers, unit=unit, errors='coerce')
+        return converted.where((converted.year > _EPOCH_MIN_YEAR) & (converted.year < _EPOCH_MAX_YEAR))
+    return parse
+
+
+def _parse_mixed(texts):
+    return pd.to_datetime(texts, format='mixed', errors='coerce')
+
+
+# 지원하는 타임스탬프 형식. 스테이션 설정의 'timestamp_formats' 에 이 이름들을 우선순위 순서로 적습니다.
+# - 'mixed' 는 값마다 형식을 따로 추정하는 범용 변환으로, 느리므로 다른 형식에 맞지 않은 값에만 사용합니다.
+TIMESTAMP_FORMATS = {
+    'compact': _parse_compact,
+    'iso': _parse_strftime('%Y-%m-%d %H:%M:%S'),
+    'slash': _parse_strftime('%Y/%m/%d %H:%M:%S'),
+    'epoch_s': _parse_epoch('s'),
+    'epoch_ms': _parse_epoch('ms'),
+    'mixed': _parse_mixed,
+}
+
+
+def _normalize_values(values):
+    """
+    고유 값 배열을 형식 비교용 문자열 배열로 바꾸는 함수.
+    숫자 컬럼(정수/실수)과 '1700000000.0' 처럼 '.0' 이 붙은 문자열은 정수 문자열로 맞춥니다.
+    """
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        numbers = np.asarray(values, dtype=np.float64)
+        texts = np.empty(len(numbers), dtype=object)
+        integral = np.isfinite(numbers) & (numbers == np.floor(numbers))
+        texts[integral] = numbers[integral].astype(np.int64).astype(str)
+        texts[~integral] = numbers[~integral].astype(str)
+        return texts
+
+    texts = pd.Series(values, dtype=object).astype(str).str.strip()
+    if texts.str.endswith('.0').any():
+        texts = texts.str.replace(r'^(\d+)\.0+$', r'\1', regex=True)
+    return texts.to_numpy(dtype=object)
+
+
+def sniff_format(texts, formats):
+    """
+    표본 문자열 중 가장 많이 변환되는 형식 이름을 반환하는 함수.
+    변환 건수가 같으면 formats 에 먼저 적힌 형식을 선택하며, 어떤 형식도 맞지 않으면 None 을 반환합니다.
+    """
+    best_name, best_count = None, 0
+    for name in formats:
+        if name == 'mixed':
+            continue
+        count = int(pd.notna(TIMESTAMP_FORMATS[name](texts)).sum())
+        if count > best_count:
+            best_name, best_count = name, count
+            if count == len(texts):
+                break
+    return best_name
+
+
+class TimestampParser:
+    """
+    스테이션 타임스탬프 컬럼을 datetime64 로 변환하는 클래스.
+    첫 호출 때 표본으로 형식을 추정해 고정하고, 추정 형식에 맞지 않아 느린 대체 변환을 거친 값은
+    고유 문자열 → 변환 결과로 캐시하여 스트리밍 모드의 다음 청크에서 다시 변환하지 않습니다.
+    """
+
+    def __init__(self, formats=None, sample_size=SAMPLE_SIZE, cache_max_entries=CACHE_MAX_ENTRIES):
+        self.formats = list(formats or TIMESTAMP_FORMATS)
+        self.sample_size = sample_size
+        self.cache_max_entries = cache_max_entries
+        self.format = None
+        self._cache = pd.Series(dtype='datetime64[ns]')
+
+    def _order(self, texts):
+        if self.format is None:
+            self.format = sniff_format(texts[:self.sample_size], self.formats)
+        if self.format is None:
+            return self.formats
+        return [self.format] + [name for name in self.formats if name != self.format]
+
+    def _lookup_cache(self, texts, result, remaining):
+        """캐시에 있는 값을 result 에 채우고, 캐시에 없는 위치만 반환하는 함수"""
+        if self._cache.empty or remaining.size == 0:
+            return remaining
+        hit = self._cache.index.get_indexer(texts[remaining])
+        cached = hit >= 0
+        result[remaining[cached]] = self._cache.to_numpy()[hit[cached]]
+        return remaining[~cached]
+
+    def _store_cache(self, texts, values):
+        if texts.size == 0 or texts.size > self.cache_max_entries:
+            return
+        if len(self._cache) + texts.size > self.cache_max_entries:
+            self._cache = self._cache.iloc[:0]
+        fresh = pd.Series(values, index=texts)
+        self._cache = fresh if self._cache.empty else pd.concat([self._cache, fresh])
+
+    def convert_unique(self, texts):
+        """
+        고유 문자열 배열을 변환하는 함수.
+        추정된 형식으로 전체를 한 번 변환하고, 실패한 값만 캐시 → 나머지 형식 순서로 다시 시도합니다.
+        """
+        result = np.full(len(texts), _NAT, dtype='datetime64[ns]')
+        remaining = np.flatnonzero(texts != '')
+        order = self._order(texts[remaining])
+
+        fallback = None
+        for step, name in enumerate(order):
+            if remaining.size == 0:
+                break
+            if step == 1:
+                remaining = self._lookup_cache(texts, result, remaining)
+                fallback = remaining
+                if remaining.size == 0:
+                    break
+            parsed = np.asarray(TIMESTAMP_FORMATS[name](texts[remaining]), dtype='datetime64[ns]')
+            ok = ~np.isnat(parsed)
+            result[remaining[ok]] = parsed[ok]
+            remaining = remaining[~ok]
+
+        if fallback is not None:
+            self._store_cache(texts[fallback], result[fallback])
+        return result
+
+    def __call__(self, series):
+        """Series 를 변환하여 같은 인덱스의 datetime64[ns] Series 를 반환하는 함수"""
+        # 같은 초에 기록된 행이 많으므로 고유 값만 변환한 뒤 코드로 펼칩니다.
+        codes, uniques = pd.factorize(series)
+        values = self.convert_unique(_normalize_values(uniques))
+        # 코드 -1 (결측) → NaT
+        values = np.append(values, _NAT)[codes]
+        return pd.Series(values, index=series.index, name=series.name)
+
+
+def parse_timestamps(series, formats=None):
+    """타임스탬프 Series 를 한 번만 변환하는 함수 (캐시는 이 호출 안에서만 사용)"""
+    return TimestampParser(formats)(series)
@@ -0,0 +1,130 @@
+#
+# db_browse.py
+# SQLite 테이블을 페이지 단위로 읽는 조회 모듈입니다 (streamlit_app-db.py 의 '저장된 데이터베이스 확인').
+# OFFSET 대신 키셋 페이지네이션을 사용합니다. 직전 페이지 마지막 행의 (정렬 컬럼, rowid) 다음부터 LIMIT 행만 읽으므로
+# 몇 번째 페이지든 인덱스를 따라 한 페이지 분량만 읽습니다.
+# 정렬은 rowid(historyinspection 은 Id)와 인덱스의 첫 컬럼에만 허용해 DB 가 정렬용 임시 B-tree 를 만들지 않게 합니다.
+#
+
+import re
+
+import pandas as pd
+
+# 페이지 크기 선택지
+PAGE_SIZES = [50, 100, 500, 1000]
+
+# 정렬 컬럼 이름 (rowid 정렬)
+ROWID_SORT = 'rowid'
+
+# 결과 DataFrame 에서 키셋 위치로 쓰는 보조 컬럼 이름
+_KEY_COL = '__browse_rowid'
+_SORT_COL = '__browse_sort'
+
+_PARTIAL_WHERE = re.compile(r'\)\s*WHERE\s+(.*)$', re.IGNORECASE | re.DOTALL)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def table_column_names(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")]
+
+
+def sortable_columns(conn, table):
+    """
+    정렬에 쓸 수 있는 컬럼 {컬럼: 부분 인덱스 조건 또는 None} 을 반환하는 함수.
+    rowid 와 인덱스 첫 컬럼만 포함합니다. 부분 인덱스의 첫 컬럼으로 정렬할 때는 인덱스 조건을 WHERE 에 함께 걸어야
+    그 인덱스를 사용하므로 조건을 같이 돌려줍니다 (같은 컬럼에 일반 인덱스가 있으면 None).
+    """
+    columns = {ROWID_SORT: None}
+    index_sql = {
+        name: sql for name, sql in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=?", (table,)
+        )
+    }
+    for _, name, _, _, partial in conn.execute(f"PRAGMA index_list({_quote(table)})"):
+        info = conn.execute(f"PRAGMA index_info({_quote(name)})").fetchall()
+        if not info or info[0][2] is None:
+            continue
+        leading = info[0][2]
+        condition = None
+        if partial:
+            match = _PARTIAL_WHERE.search(index_sql.get(name) or '')
+            if match is None:
+                continue
+            condition = match.group(1).strip()
+        if leading not in columns or (columns[leading] is not None and condition is None):
+            columns[leading] = condition
+    return columns
+
+
+def max_rowid(conn, table):
+    """테이블의 가장 큰 rowid (행이 추가되면 바뀌므로 건수 캐시의 무효화 키로 사용)"""
+    return conn.execute(f"SELECT max(rowid) FROM {_quote(table)}").fetchone()[0]
+
+
+def count_rows(conn, table, where=None, params=()):
+    sql = f"SELECT COUNT(*) FROM {_quote(table)}"
+    if where:
+        sql += f" WHERE {where}"
+    return conn.execute(sql, list(params)).fetchone()[0]
+
+
+def page_sql(table, columns, sort_column=ROWID_SORT, descending=False, where=None, sort_condition=None, after=None, limit=100):
+    """
+    키셋 페이지 SQL 과 매개변수를 만드는 함수.
+    after 는 직전 페이지 마지막 행의 (정렬 값, rowid) 이며 None 이면 첫 페이지입니다.
+    컬럼으로 정렬할 때는 NULL 값 행을 제외하고 (정렬 컬럼, rowid) 순서로 읽습니다.
+
+    반환값: (sql, params)
+    """
+    projection = ', '.join(map(_quote, columns)) if columns else '*'
+    select = [f"rowid AS {_KEY_COL}"]
+    conditions = [f"({where})"] if where else []
+    params = []
+
+    if sort_column == ROWID_SORT:
+        order_keys = ['rowid']
+        if after is not None:
+            conditions.append(f"rowid {'<' if descending else '>'} ?")
+            params.append(after[1])
+    else:
+        sort_sql = _quote(sort_column)
+        select.append(f"{sort_sql} AS {_SORT_COL}")
+        order_keys = [sort_sql, 'rowid']
+        conditions.append(f"{sort_sql} IS NOT NULL")
+        if sort_condition:
+            conditions.append(f"({sort_condition})")
+        if after is not None:
+            conditions.append(f"({sort_sql}, rowid) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+
+    direction = ' DESC' if descending else ''
+    sql = f"SELECT {', '.join(select)}, {projection} FROM {_quote(table)}"
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+    sql += f" ORDER BY {', '.join(key + direction for key in order_keys)} LIMIT {int(limit)}"
+    return sql, params
+
+
+def fetch_page(conn, table, columns, sort_column=ROWID_SORT, descending=False, where=None, where_params=(),
+               sort_condition=None, after=None, limit=100):
+    """
+    한 페이지를 읽는 함수.
+
+    반환값: (DataFrame, 다음 페이지의 after 값 또는 None(마지막 페이지))
+    """
+    sql, params = page_sql(table, columns, sort_column, descending, where, sort_condition, after, limit + 1)
+    page = pd.read_sql(sql, conn, params=list(where_params) + params)
+
+    next_after = None
+    if len(page) > limit:
+        page = page.iloc[:limit]
+        last = page.iloc[-1]
+        sort_value = last[_SORT_COL] if _SORT_COL in page.columns else None
+        # sqlite3 는 numpy 정수를 매개변수로 받지 않으므로 파이썬 값으로 바꿉니다.
+        if hasattr(sort_value, 'item'):
+            sort_value = sort_value.item()
+        next_after = (sort_value, int(last[_KEY_COL]))
+    return page.drop(columns=[col for col in (_KEY_COL, _SORT_COL) if col in page.columns]), next_after
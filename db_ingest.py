@@ -0,0 +1,391 @@
+#
+# db_ingest.py
+# 스테이션 CSV 를 SQLite DB 의 inspection / historyinspection 테이블에 적재하는 모듈입니다.
+# 테이블을 통째로 바꾸는 to_sql(if_exists='replace') 대신
+#   - historyinspection 에는 모든 행을 추가(append)하고,
+#   - inspection 에는 SNumber 기준으로 upsert(있으면 CSV 에 있는 컬럼만 갱신, 없으면 추가)합니다.
+# CSV 는 청크 단위로 읽어 청크마다 한 트랜잭션으로 executemany 하고, 적재용 연결은 WAL 저널과 큰 페이지 캐시를 사용합니다.
+# 값은 DB 에 저장된 기존 데이터처럼 CSV 의 원본 문자열 그대로('11.000', '20240304104130' 등) 저장합니다.
+#
+
+import io
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from csv_clean import clean_escaped_columns
+from csv_engine import STATION_SPECS
+from csv_header import detect_encoding, locate_header
+from csv_schema import SCHEMA_DB_FILE, SCHEMA_TABLES, read_typed_csv
+from csv_stream import locate_station_header
+from db_query import ensure_indexes
+
+# 청크(트랜잭션) 하나에 적재할 행 수
+INGEST_CHUNK_ROWS = 50_000
+
+# 적재용 연결에 적용하는 PRAGMA
+# - WAL: 적재 중에도 다른 연결(조회 화면)이 읽을 수 있고, 커밋마다 전체 저널을 다시 쓰지 않습니다.
+# - synchronous NORMAL: WAL 에서는 커밋마다 fsync 하지 않아도 DB 가 깨지지 않습니다 (정전 시 마지막 트랜잭션만 유실).
+# - cache_size 음수는 KiB 단위 (64MiB)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+HISTORY_TABLE = 'historyinspection'
+LATEST_TABLE = 'inspection'
+KEY_COLUMN = 'SNumber'
+
+# 적재 시각을 기록하는 컬럼 (CSV 에 없으면 적재 시각으로 채웁니다)
+STAMP_COLUMN = 'Stamp'
+STAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 업로드 미리보기로 읽는 행 수
+PREVIEW_ROWS = 5
+
+# 스테이션을 판별할 때 헤더를 찾는 파일 앞부분 크기(바이트)
+DETECT_BYTES = 1024 ** 2
+
+# 스테이션 헤더를 찾지 못했을 때 사용하는 일반 헤더 조건 (SNumber 컬럼만 있으면 됨)
+GENERIC_HEADER = {'keywords': ['snumber'], 'case_sensitive': False, 'partial': False, 'max_lines': 100, 'cleaner': 'quoted'}
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+# ==============================
+# 연결 / 테이블 준비
+# ==============================
+def configure_for_ingest(conn):
+    """
+    적재용 PRAGMA 를 연결에 적용하는 함수 (db_pool 에서 빌린 연결에도 사용).
+
+    반환값: 적용 전 PRAGMA 값 dict (빌린 연결을 돌려주기 전에 restore_pragmas 로 되돌릴 때 사용)
+    """
+    previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in SQLITE_PRAGMAS}
+    for name, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return previous
+
+
+def restore_pragmas(conn, previous):
+    """
+    configure_for_ingest 이전 값으로 PRAGMA 를 되돌리는 함수 (같은 값이면 건너뜀).
+    journal_mode 는 연결이 아니라 DB 파일의 설정이고 다른 연결이 열려 있으면 바꿀 수 없으므로 되돌리지 않습니다.
+    """
+    for name, value in previous.items():
+        if name == 'journal_mode':
+            continue
+        if conn.execute(f"PRAGMA {name}").fetchone()[0] != value:
+            conn.execute(f"PRAGMA {name}={value}")
+
+
+def connect_for_ingest(db_path):
+    """
+    적재용 SQLite 연결을 여는 함수. 트랜잭션은 직접 BEGIN / COMMIT 하므로 자동 트랜잭션을 끕니다(isolation_level=None).
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    configure_for_ingest(conn)
+    return conn
+
+
+def ensure_tables(conn, template_path=SCHEMA_DB_FILE):
+    """
+    inspection / historyinspection 테이블이 없으면 템플릿 DB(SJ_TM2360E.sqlite3)의 DDL 로 만드는 함수.
+
+    반환값: 새로 만든 테이블 목록
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    missing = [table for table in SCHEMA_TABLES if table not in existing]
+    if not missing:
+        return []
+
+    template = sqlite3.connect(f'file:{template_path}?mode=ro', uri=True)
+    try:
+        ddl = {
+            name: sql for name, sql in template.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type='table' AND sql IS NOT NULL"
+            )
+        }
+    finally:
+        template.close()
+
+    for table in missing:
+        if table not in ddl:
+            raise ValueError(f"템플릿 DB 에 '{table}' 테이블 정의가 없습니다: {template_path}")
+        conn.execute(ddl[table])
+    return missing
+
+
+def table_columns(conn, table):
+    """테이블 컬럼 정보를 {소문자 이름: (이름, 자동 증가 PK 여부)} 로 반환하는 함수"""
+    columns = {}
+    for _, name, declared, _, _, pk in conn.execute(f"PRAGMA table_info({_quote(table)})"):
+        auto_key = bool(pk) and (declared or '').upper() == 'INTEGER'
+        columns[name.lower()] = (name, auto_key)
+    return columns
+
+
+# ==============================
+# CSV 청크 읽기
+# ==============================
+def locate_ingest_header(file_content, station=None):
+    """
+    헤더 위치와 인코딩, 문자열 정리 방식을 찾는 함수.
+    station 을 지정하지 않으면 파일 앞부분에서 헤더 키워드가 모두 있는 스테이션을 찾고,
+    어느 스테이션에도 맞지 않으면 SNumber 컬럼이 있는 첫 행을 헤더로 사용합니다.
+
+    반환값: (스테이션 또는 None, 헤더 위치, 인코딩, cleaner). 헤더를 찾지 못하면 위치와 인코딩이 None.
+    """
+    head = file_content[:DETECT_BYTES]
+    candidates = [station] if station else list(STATION_SPECS)
+    found = None
+    for candidate in candidates:
+        offset, _ = locate_station_header(head, candidate)
+        if offset is not None:
+            found = (candidate, offset, STATION_SPECS[candidate]['cleaner'])
+            break
+    if found is None:
+        spec = GENERIC_HEADER
+        offset, _ = locate_header(
+            file_content, spec['keywords'], spec['case_sensitive'], spec['partial'], spec['max_lines']
+        )
+        if offset is None:
+            return None, None, None, spec['cleaner']
+        found = (None, offset, spec['cleaner'])
+
+    station, offset, cleaner = found
+    return station, offset, _prefix_encoding(file_content, offset), cleaner
+
+
+def _prefix_encoding(file_content, offset):
+    """
+    헤더 이후 DETECT_BYTES 까지의 앞부분만 디코딩해 보고 인코딩을 정하는 함수.
+    멀티바이트 문자가 잘리지 않도록 마지막 줄바꿈까지만 사용합니다 (그 뒤의 오류는 iter_ingest_chunks 가 알립니다).
+    """
+    prefix = file_content[:offset + DETECT_BYTES]
+    if len(prefix) < len(file_content):
+        cut = prefix.rfind(b'\n')
+        if cut > offset:
+            prefix = prefix[:cut + 1]
+    return detect_encoding(prefix)
+
+
+def read_ingest_preview(file_content, rows=PREVIEW_ROWS):
+    """
+    적재와 같은 방법(locate_ingest_header)으로 헤더와 인코딩을 찾아 앞부분 rows 행만 스키마 dtype 으로 읽는 함수.
+
+    반환값: (스테이션 또는 None, DataFrame). 헤더를 찾지 못하면 ValueError.
+    """
+    station, offset, encoding, cleaner = locate_ingest_header(file_content)
+    if offset is None or encoding is None:
+        raise ValueError("SNumber 컬럼이 있는 헤더 행을 찾을 수 없습니다.")
+    return station, read_typed_csv(file_content, offset, encoding, cleaner, nrows=rows)
+
+
+def iter_ingest_chunks(file_content, offset, encoding, cleaner='excel', chunksize=INGEST_CHUNK_ROWS):
+    """
+    헤더 위치부터 모든 컬럼을 문자열 그대로 청크 단위로 읽는 제너레이터.
+    'null', 'NA' 같은 값도 원본 문자열로 두고 빈 칸만 결측으로 읽으며, '="..."' 로 감싸진 값은 벗겨 냅니다.
+    인코딩은 파일 앞부분에서만 판별하므로, 뒤쪽에 그 인코딩으로 읽을 수 없는 바이트가 있으면 해당 청크에서 ValueError 를 발생시킵니다.
+    """
+    buffer = io.BytesIO(file_content)
+    buffer.seek(offset)
+    rows = 0
+    reader = None
+    while True:
+        try:
+            # 파서가 첫 블록을 생성 시점에 디코딩하므로 read_csv 호출도 같은 오류 처리 안에 둡니다.
+            if reader is None:
+                reader = pd.read_csv(
+                    buffer, header=0, encoding=encoding, dtype=str, keep_default_na=False, na_values=[''],
+                    skipinitialspace=True, chunksize=chunksize,
+                )
+            chunk = next(reader)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as exc:
+            raise ValueError(
+                f"{rows:,}행 이후에 '{encoding}' 인코딩으로 읽을 수 없는 데이터가 있습니다: {exc.reason}"
+            ) from exc
+        rows += len(chunk)
+        chunk.columns = [str(col).strip() for col in chunk.columns]
+        clean_escaped_columns(chunk, cleaner)
+        yield chunk
+
+
+# ==============================
+# 적재
+# ==============================
+def _map_columns(csv_columns, table_info):
+    """
+    CSV 컬럼을 테이블 컬럼에 대소문자 무시로 대응시키는 함수.
+    자동 증가 PK(historyinspection.Id)와 같은 이름이 두 번 나오는 컬럼은 뒤쪽을 무시합니다.
+
+    반환값: ([(CSV 컬럼, 테이블 컬럼)], 무시한 CSV 컬럼 목록)
+    """
+    mapping, ignored, used = [], [], set()
+    for col in csv_columns:
+        entry = table_info.get(col.lower())
+        if entry is None or entry[1] or entry[0] in used:
+            ignored.append(col)
+            continue
+        mapping.append((col, entry[0]))
+        used.add(entry[0])
+    return mapping, ignored
+
+
+def _history_statement(columns):
+    return f"INSERT INTO {_quote(HISTORY_TABLE)} ({', '.join(map(_quote, columns))}) VALUES ({', '.join('?' * len(columns))})"
+
+
+def _upsert_statement(columns):
+    """
+    inspection upsert 문. 이미 있는 SNumber 는 CSV 에 값이 있는 컬럼만 갱신하고,
+    빈 값은 다른 스테이션이 앞서 기록한 값을 지우지 않도록 기존 값을 유지합니다.
+    """
+    updates = [
+        f"{_quote(col)} = COALESCE(excluded.{_quote(col)}, {_quote(LATEST_TABLE)}.{_quote(col)})"
+        for col in columns if col != KEY_COLUMN
+    ]
+    statement = f"INSERT INTO {_quote(LATEST_TABLE)} ({', '.join(map(_quote, columns))}) VALUES ({', '.join('?' * len(columns))})"
+    if updates:
+        statement += f" ON CONFLICT({_quote(KEY_COLUMN)}) DO UPDATE SET {', '.join(updates)}"
+    else:
+        statement += f" ON CONFLICT({_quote(KEY_COLUMN)}) DO NOTHING"
+    return statement
+
+
+def _chunk_rows(chunk, csv_columns, stamp):
+    """청크를 executemany 에 넘길 튜플 목록으로 바꾸는 함수 (결측 → None, stamp 가 있으면 마지막 값으로 추가)"""
+    arrays = [chunk[col].to_numpy(dtype=object, na_value=None) for col in csv_columns]
+    if stamp is not None:
+        arrays.append([stamp] * len(chunk))
+    return list(zip(*arrays))
+
+
+def _upsert_rows(conn, statement, rows):
+    """
+    inspection upsert 를 실행하는 함수. 다른 SNumber 가 같은 FwWrMAC(UNIQUE) 를 가지는 등 제약 위반이 있으면
+    청크를 되돌리고 행 단위로 다시 실행해 위반한 행만 건너뜁니다.
+
+    반환값: (적재한 행 수, 건너뛴 행 목록 [(SNumber, 오류 메시지)])
+    """
+    conn.execute("SAVEPOINT upsert_chunk")
+    try:
+        conn.executemany(statement, rows)
+        conn.execute("RELEASE upsert_chunk")
+        return len(rows), []
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO upsert_chunk")
+        conn.execute("RELEASE upsert_chunk")
+
+    rejected = []
+    for row in rows:
+        try:
+            conn.execute(statement, row)
+        except sqlite3.IntegrityError as e:
+            rejected.append((row[0], str(e)))
+    return len(rows) - len(rejected), rejected
+
+
+def ingest_csv(db_path, file_content, station=None, chunksize=INGEST_CHUNK_ROWS, upsert_latest=True, progress=None,
+               conn=None):
+    """
+    CSV 원본 바이트를 historyinspection 에 추가하고 inspection 에 SNumber 기준으로 upsert 하는 함수.
+    청크마다 BEGIN IMMEDIATE ~ COMMIT 한 번으로 적재하므로 중간에 실패해도 이미 커밋된 청크는 남습니다.
+    progress 를 넘기면 청크를 커밋할 때마다 progress(적재한 행 수, 예상 전체 행 수) 를 호출합니다.
+    conn 에 자동 트랜잭션을 끈(isolation_level=None) 연결(db_pool 등)을 넘기면 새로 열지 않고 그 연결을 사용하며 닫지 않습니다.
+    이때 적재용 PRAGMA(cache_size 등)는 끝난 뒤 원래 값으로 되돌리므로 풀로 돌아간 연결의 조회 설정은 바뀌지 않습니다.
+
+    반환값: 적재 보고 dict
+        {'station', 'encoding', 'rows', 'history_rows', 'upserted', 'skipped_no_sn', 'rejected',
+         'rejected_samples', 'ignored_columns', 'created_tables', 'elapsed'}
+    """
+    start = time.perf_counter()
+    station, offset, encoding, cleaner = locate_ingest_header(file_content, station)
+    if offset is None or encoding is None:
+        raise ValueError("SNumber 컬럼이 있는 헤더 행을 찾을 수 없습니다.")
+
+    # 헤더 행을 뺀 줄 수로 진행률용 전체 행 수를 어림합니다.
+    estimated_rows = max(file_content.count(b'\n', offset) - 1, 0)
+    report = {
+        'station': station, 'encoding': encoding, 'rows': 0, 'history_rows': 0, 'upserted': 0,
+        'skipped_no_sn': 0, 'rejected': 0, 'rejected_samples': [], 'ignored_columns': [], 'created_tables': [],
+    }
+
+    owns_connection = conn is None
+    if owns_connection:
+        conn = connect_for_ingest(db_path)
+    else:
+        previous_pragmas = configure_for_ingest(conn)
+    try:
+        report['created_tables'] = ensure_tables(conn)
+        ensure_indexes(conn, HISTORY_TABLE)
+        history_info = table_columns(conn, HISTORY_TABLE)
+        latest_info = table_columns(conn, LATEST_TABLE)
+        prepared = None
+
+        for chunk in iter_ingest_chunks(file_content, offset, encoding, cleaner, chunksize):
+            if prepared is None:
+                history_map, ignored = _map_columns(chunk.columns, history_info)
+                latest_map, _ = _map_columns(chunk.columns, latest_info)
+                sn_col = next((col for col, name in history_map if name == KEY_COLUMN), None)
+                if sn_col is None:
+                    raise ValueError("SNumber 컬럼을 찾을 수 없습니다.")
+                report['ignored_columns'] = [col for col in ignored if not col.startswith('Unnamed:')]
+
+                history_cols = [col for col, _ in history_map]
+                history_names = [name for _, name in history_map]
+                # SNumber 를 맨 앞에 두어 건너뛴 행 보고에 바로 쓸 수 있게 합니다.
+                latest_cols = [sn_col] + [col for col, name in latest_map if name != KEY_COLUMN]
+                latest_names = [KEY_COLUMN] + [name for _, name in latest_map if name != KEY_COLUMN]
+                add_stamp = STAMP_COLUMN not in history_names
+                if add_stamp:
+                    history_names.append(STAMP_COLUMN)
+                    latest_names.append(STAMP_COLUMN)
+                prepared = (_history_statement(history_names), _upsert_statement(latest_names))
+
+            history_sql, upsert_sql = prepared
+            report['rows'] += len(chunk)
+
+            sn = chunk[sn_col].str.strip()
+            has_sn = sn.notna() & (sn != '')
+            report['skipped_no_sn'] += int((~has_sn).sum())
+            chunk = chunk[has_sn]
+            chunk[sn_col] = sn[has_sn]
+            if chunk.empty:
+                continue
+
+            stamp = datetime.now().strftime(STAMP_FORMAT) if add_stamp else None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(history_sql, _chunk_rows(chunk, history_cols, stamp))
+                if upsert_latest:
+                    upserted, rejected = _upsert_rows(conn, upsert_sql, _chunk_rows(chunk, latest_cols, stamp))
+                    report['upserted'] += upserted
+                    report['rejected'] += len(rejected)
+                    report['rejected_samples'].extend(rejected[:10 - len(report['rejected_samples'])])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            report['history_rows'] += len(chunk)
+
+            if progress is not None:
+                progress(report['rows'], max(estimated_rows, report['rows']))
+
+        conn.execute("PRAGMA optimize")
+    finally:
+        if owns_connection:
+            conn.close()
+        else:
+            restore_pragmas(conn, previous_pragmas)
+
+    report['elapsed'] = time.perf_counter() - start
+    return report
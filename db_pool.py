@@ -0,0 +1,240 @@
+#
+# db_pool.py
+# SQLite / MySQL 연결을 세션 사이에서 재사용하는 연결 풀 모듈입니다.
+# 풀은 st.cache_resource 로 DB(접속 정보)마다 프로세스에 하나만 만들고, 최대 연결 수(max_size)를 넘지 않게 빌려줍니다.
+# 조회/저장 지연 시간에 연결 생성 비용이 들어가지 않도록 돌려받은 연결은 닫지 않고 다음 요청에 다시 빌려줍니다.
+#
+# 드라이버별 스레드 규칙
+#   - sqlite3: 연결을 만든 스레드에서만 쓸 수 있다는 검사를 끄고(check_same_thread=False) 풀이 한 번에 한 스레드에만 빌려줍니다.
+#     준비된 문장은 연결마다 cached_statements 개까지 캐시되므로 같은 SQL 은 다시 컴파일하지 않습니다.
+#   - pymysql: 연결을 스레드 사이에 공유할 수 없으므로(threadsafety=1) 역시 빌린 스레드만 사용합니다.
+#     서버 측 준비된 문장이 없어 문장 캐시는 없고, 오래 쉬던 연결은 ping(reconnect=True) 로 확인한 뒤 빌려줍니다.
+# 연결을 만드는 함수(connect)를 인자로 받으므로 로컬 대체 서버나 가짜 연결로 MySQL 경로를 시험할 수 있습니다.
+#
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+# 백엔드별 기본 최대 연결 수
+DEFAULT_POOL_SIZES = {
+    'sqlite': 4,
+    'mysql': 4,
+}
+
+# 연결을 기다리는 최대 시간(초). 넘으면 PoolTimeout 을 발생시킵니다.
+DEFAULT_ACQUIRE_TIMEOUT = 30.0
+
+# 이 시간(초) 이상 쉬었던 연결은 빌려주기 전에 상태를 확인합니다.
+HEALTH_CHECK_IDLE = 30.0
+
+# sqlite3 연결마다 캐시할 준비된 문장 수 (기본값 128)
+SQLITE_CACHED_STATEMENTS = 256
+
+# 풀 sqlite3 연결에 적용하는 PRAGMA. 적재(db_ingest)와 조회가 함께 쓰므로 WAL 과 잠금 대기 시간을 맞춥니다.
+SQLITE_CONNECTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 30_000,
+}
+
+
+class PoolTimeout(Exception):
+    """정해진 시간 안에 빌릴 수 있는 연결이 없을 때 발생하는 예외"""
+
+
+class ConnectionPool:
+    """
+    최대 max_size 개의 연결을 빌려주고 돌려받는 풀 (여러 세션의 스크립트 스레드가 공유하므로 잠금 사용).
+    connect() 로 연결을 만들고, check(conn) 가 예외를 내거나 False 를 반환하면 그 연결을 버리고 새로 만듭니다.
+    """
+
+    def __init__(self, name, connect, max_size, check=None, health_check_idle=HEALTH_CHECK_IDLE):
+        self.name = name
+        self.max_size = max_size
+        self._connect = connect
+        self._check = check
+        self._health_check_idle = health_check_idle
+        self._idle = deque()         # (연결, 돌려받은 시각)
+        self._size = 0               # 만들어서 아직 닫지 않은 연결 수 (빌려준 연결 포함)
+        self._condition = threading.Condition()
+        self._closed = False
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0, 'waits': 0}
+
+    def _healthy(self, conn, idle_since):
+        if self._check is None or time.monotonic() - idle_since < self._health_check_idle:
+            return True
+        try:
+            return self._check(conn) is not False
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self.stats['discarded'] += 1
+            self._condition.notify()
+
+    def acquire(self, timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        """연결을 빌리는 함수. 쉬는 연결이 없고 최대 개수만큼 빌려준 상태이면 돌려받을 때까지 기다립니다."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError(f"닫힌 연결 풀입니다: {self.name}")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    conn, idle_since = None, None
+                else:
+                    self.stats['waits'] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise PoolTimeout(f"{timeout:g}초 안에 '{self.name}' 연결을 빌리지 못했습니다.")
+                    continue
+
+            # 연결 생성과 상태 확인은 잠금 밖에서 합니다 (느린 네트워크 연결이 다른 세션을 막지 않도록).
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self.stats['created'] += 1
+                return conn
+
+            if self._healthy(conn, idle_since):
+                with self._condition:
+                    self.stats['reused'] += 1
+                return conn
+            self._discard(conn)
+
+    def release(self, conn, broken=False):
+        """연결을 돌려주는 함수. broken 이면 닫고 버립니다."""
+        if broken or self._closed:
+            self._discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        """
+        with pool.connection() as conn: 형태로 연결을 빌리는 함수.
+        블록이 끝나면 커밋하지 않은 트랜잭션을 되돌린 뒤 돌려받습니다. 다음 사용자가 이전 트랜잭션(MySQL 의 읽기 스냅샷 포함)을
+        이어받지 않도록 하기 위해서이며, 되돌리기가 실패하면(연결 끊김 등) 연결을 버립니다. 저장하는 쪽은 블록 안에서 커밋해야 합니다.
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            broken = False
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            self.release(conn, broken=broken)
+
+    def close(self):
+        """쉬는 연결을 모두 닫고 더 이상 빌려주지 않는 함수 (빌려준 연결은 돌려받을 때 닫습니다)"""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def describe(self):
+        """상태 표시용 문장 (예: 'sqlite:db/x.sqlite3 · 연결 2/4 (쉬는 연결 1) · 생성 2 · 재사용 15')"""
+        with self._condition:
+            size, idle = self._size, len(self._idle)
+            stats = dict(self.stats)
+        return (
+            f"{self.name} · 연결 {size}/{self.max_size} (쉬는 연결 {idle}) · "
+            f"생성 {stats['created']} · 재사용 {stats['reused']} · 대기 {stats['waits']} · 폐기 {stats['discarded']}"
+        )
+
+
+# ==============================
+# SQLite
+# ==============================
+def connect_sqlite(db_path):
+    """
+    풀에서 쓰는 sqlite3 연결을 만드는 함수.
+    자동 트랜잭션을 끄므로(isolation_level=None) 여러 문장을 묶을 때는 BEGIN / COMMIT 을 직접 실행합니다 (db_ingest 참고).
+    """
+    conn = sqlite3.connect(
+        db_path, check_same_thread=False, cached_statements=SQLITE_CACHED_STATEMENTS, isolation_level=None,
+    )
+    for name, value in SQLITE_CONNECTION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def _check_sqlite(conn):
+    conn.execute("SELECT 1").fetchone()
+
+
+def sqlite_pool(db_path, max_size=None, connect=None):
+    """SQLite 파일 하나의 연결 풀을 만드는 함수. connect 를 넘기면 connect_sqlite 대신 사용합니다."""
+    factory = connect or (lambda: connect_sqlite(db_path))
+    return ConnectionPool(f"sqlite:{db_path}", factory, max_size or DEFAULT_POOL_SIZES['sqlite'], _check_sqlite)
+
+
+# ==============================
+# MySQL (pymysql)
+# ==============================
+def connect_mysql(**params):
+    """pymysql 연결을 만드는 함수 (pymysql 은 MySQL 을 쓰는 화면에서만 필요하므로 여기서 불러옵니다)"""
+    import pymysql
+
+    params.setdefault('cursorclass', pymysql.cursors.DictCursor)
+    params.setdefault('autocommit', False)
+    return pymysql.connect(**params)
+
+
+def _check_mysql(conn):
+    # 서버가 연결을 끊었으면(wait_timeout 등) 같은 연결 객체로 다시 연결합니다.
+    conn.ping(reconnect=True)
+
+
+def mysql_pool(host, port, user, password, database=None, max_size=None, connect=None, **params):
+    """
+    MySQL 서버 하나의 연결 풀을 만드는 함수.
+    connect 를 넘기면 connect_mysql 대신 connect(host=..., port=..., ...) 로 연결을 만듭니다 (로컬 대체 서버 시험 등).
+    """
+    params.update(host=host, port=int(port), user=user, password=password)
+    if database:
+        params['database'] = database
+    factory = connect or connect_mysql
+    return ConnectionPool(
+        f"mysql:{user}@{host}:{port}", lambda: factory(**params), max_size or DEFAULT_POOL_SIZES['mysql'], _check_mysql
+    )
+
+
+# ==============================
+# 세션 공유 풀
+# ==============================
+@st.cache_resource
+def get_sqlite_pool(db_path):
+    """모든 세션이 공유하는 SQLite 연결 풀을 반환하는 함수"""
+    return sqlite_pool(db_path)
+
+
+@st.cache_resource
+def get_mysql_pool(host, port, user, password, database=None):
+    """모든 세션이 공유하는 MySQL 연결 풀을 반환하는 함수 (접속 정보마다 하나)"""
+    return mysql_pool(host, port, user, password, database)
@@ -0,0 +1,263 @@
+#
+# db_query.py
+# historyinspection 테이블의 관리 인덱스와, analyze_* 함수가 계산하는 Jig × 날짜 집계를 SQL 로 실행하는 모듈입니다.
+# 집계(total/pass/가성불량/진성불량/fail, 고유 SN 건수)를 DB 안에서 GROUP BY 로 끝내므로
+# 수백만 행의 이력도 원본 행을 Python 으로 읽지 않고 (Jig, 날짜) 행 수만큼의 결과만 가져옵니다.
+#
+# 판정 규칙은 csv_engine.aggregate_station 과 같습니다.
+#   - 판정 값은 공백 제거 + 대문자로 비교 ('O' = PASS, 'X' = FAIL)
+#   - 가성불량 = FAIL 이지만 같은 Jig(Semi 는 같은 Jig + 같은 날짜)에서 한 번이라도 PASS 한 SNumber
+#   - Jig 는 스테이션 설정의 jig_cols 중 값이 있는 첫 컬럼, 없으면 default_jig
+#   - 날짜는 스테이션 설정의 timestamp_formats 형식에 맞는 값만 인정 (형식별 모양을 GLOB 으로 판별)
+#
+
+import sqlite3
+
+import pandas as pd
+
+from csv_engine import CATEGORIES, STATION_SPECS, SUMMARY_FIELDS
+
+HISTORY_TABLE = 'historyinspection'
+
+# 유닉스 타임스탬프 유효 범위 (csv_timestamp 와 같이 1980년 이후 ~ 2100년 이전, 초 단위)
+_EPOCH_MIN = 347155200      # 1981-01-01
+_EPOCH_MAX = 4102444800     # 2100-01-01
+
+_DIGIT = '[0-9]'
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _digits(count):
+    return _DIGIT * count
+
+
+# ==============================
+# 관리 인덱스
+# ==============================
+def station_rows_condition(station):
+    """historyinspection 에서 해당 스테이션이 기록한 행의 조건 (타임스탬프나 판정 값이 있는 행)"""
+    spec = STATION_SPECS[station]
+    return f"({_quote(spec['timestamp_col'])} IS NOT NULL OR {_quote(spec['pass_col'])} IS NOT NULL)"
+
+
+def managed_indexes(table=HISTORY_TABLE):
+    """
+    테이블에 유지할 인덱스 목록 [(인덱스 이름, [컬럼], 부분 인덱스 조건 또는 None)] 을 스테이션 설정에서 만드는 함수.
+      - SNumber
+      - 스테이션별 (타임스탬프, Jig, 판정, SNumber): 기간 조회와 SQL 집계가 넓은 테이블 대신 이 인덱스만 읽도록 하는 커버링 인덱스
+      - 스테이션별 (Jig(PC), 타임스탬프): Jig 별 조회
+    이력 행은 한 스테이션의 컬럼만 채워져 있으므로 스테이션 인덱스는 그 스테이션 행만 담는 부분 인덱스로 만들어
+    적재할 때 갱신하는 인덱스 항목 수를 줄입니다.
+    """
+    indexes = [(f'ix_{table}_snumber', ['SNumber'], None)]
+    for station, spec in STATION_SPECS.items():
+        timestamp_col, jig_col = spec['timestamp_col'], spec['jig_cols'][0]
+        indexes.append((
+            f'ix_{table}_{station.lower()}_time',
+            [timestamp_col, jig_col, spec['pass_col'], 'SNumber'],
+            station_rows_condition(station),
+        ))
+        indexes.append((f'ix_{table}_{station.lower()}_jig', [jig_col, timestamp_col], f"{_quote(jig_col)} IS NOT NULL"))
+    return indexes
+
+
+def ensure_indexes(conn, table=HISTORY_TABLE):
+    """
+    관리 인덱스 중 없는 것을 만드는 함수. 테이블에 없는 컬럼이 들어간 인덱스는 건너뜁니다.
+    새로 만든 인덱스가 있으면 ANALYZE 로 통계(sqlite_stat1)를 갱신해 쿼리 계획이 인덱스를 고르도록 합니다.
+
+    반환값: 새로 만든 인덱스 이름 목록
+    """
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")}
+    if not columns:
+        return []
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+
+    created = []
+    for name, index_columns, condition in managed_indexes(table):
+        if name in existing or not all(col in columns for col in index_columns):
+            continue
+        statement = f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table)} ({', '.join(map(_quote, index_columns))})"
+        if condition:
+            statement += f" WHERE {condition}"
+        conn.execute(statement)
+        created.append(name)
+
+    if created:
+        conn.execute(f"ANALYZE {_quote(table)}")
+        if conn.in_transaction:
+            conn.commit()
+    return created
+
+
+# ==============================
+# SQL 식 생성
+# ==============================
+def _date_cases(ts, formats):
+    """타임스탬프 형식 이름 목록 → 'YYYY-MM-DD' 날짜를 만드는 CASE 분기 목록"""
+    compact = f"date(substr({ts}, 1, 4) || '-' || substr({ts}, 5, 2) || '-' || substr({ts}, 7, 2))"
+    dashed = f"date(substr({ts}, 1, 10))"
+    slashed = f"date(replace(substr({ts}, 1, 10), '/', '-'))"
+    time_part = f"{_digits(2)}:{_digits(2)}:{_digits(2)}"
+    iso_date = f"{_digits(4)}-{_digits(2)}-{_digits(2)}"
+    slash_date = f"{_digits(4)}/{_digits(2)}/{_digits(2)}"
+
+    def epoch(divisor, low_digits, high_digits):
+        value = f"CAST({ts} AS INTEGER)" if divisor == 1 else f"(CAST({ts} AS INTEGER) / {divisor})"
+        shape = f"{ts} NOT GLOB '*[^0-9]*' AND length({ts}) BETWEEN {low_digits} AND {high_digits}"
+        return f"{shape} AND {value} >= {_EPOCH_MIN} AND {value} < {_EPOCH_MAX}", f"date({value}, 'unixepoch')"
+
+    cases = {
+        'compact': (f"{ts} GLOB '{_digits(14)}'", compact),
+        'iso': (f"{ts} GLOB '{iso_date} {time_part}'", dashed),
+        'slash': (f"{ts} GLOB '{slash_date} {time_part}'", slashed),
+        'epoch_s': epoch(1, 9, 10),
+        'epoch_ms': epoch(1000, 12, 13),
+        # 'mixed' 는 날짜가 앞에 오는 값만 지원합니다 (시각 부분 형식은 따지지 않음).
+        'mixed': (f"({ts} GLOB '{iso_date}*' OR {ts} GLOB '{slash_date}*')", f"date(replace(substr({ts}, 1, 10), '/', '-'))"),
+    }
+    return [cases[name] for name in formats]
+
+
+def date_expression(column, formats):
+    """
+    타임스탬프 컬럼의 원본 문자열에서 'YYYY-MM-DD' 날짜를 꺼내는 SQL 식.
+    formats 순서대로 모양이 맞는 첫 형식으로 변환하며, 어느 형식에도 맞지 않으면 NULL 입니다.
+    """
+    ts = f"trim({_quote(column)})"
+    whens = ' '.join(f"WHEN {condition} THEN {value}" for condition, value in _date_cases(ts, formats))
+    return f"(CASE {whens} END)"
+
+
+def resolve_jig_column(conn, station, table=HISTORY_TABLE):
+    """
+    Jig 로 사용할 컬럼을 정하는 함수 (csv_engine._resolve_jig_column 과 같은 규칙).
+    jig_cols 중 해당 스테이션 행(타임스탬프가 있는 행)에 값이 하나라도 있는 첫 컬럼을 반환하고, 없으면 None.
+    """
+    spec = STATION_SPECS[station]
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")}
+    for candidate in spec['jig_cols']:
+        if candidate not in columns:
+            continue
+        found = conn.execute(
+            f"SELECT 1 FROM {_quote(table)} WHERE {_quote(spec['timestamp_col'])} IS NOT NULL "
+            f"AND {_quote(candidate)} IS NOT NULL LIMIT 1"
+        ).fetchone()
+        if found:
+            return candidate
+    return None
+
+
+def summary_sql(station, jig_col, table=HISTORY_TABLE, jigs=None, start_date=None, end_date=None):
+    """
+    Jig × 날짜 집계 SQL 과 매개변수를 만드는 함수.
+    jig_col 이 None 이면 모든 행을 기본 Jig(default_jig)로 집계합니다.
+    jigs 는 base 단계에서 걸러 인덱스를 사용하고, 기간은 PASS 이력(가성불량 판정)을 모두 본 뒤 결과에만 적용합니다.
+
+    반환값: (sql, params)
+    """
+    spec = STATION_SPECS[station]
+    pass_col = _quote(spec['pass_col'])
+    jig_expr = _quote(jig_col) if jig_col else '?'
+    params = [] if jig_col else [spec['default_jig']]
+
+    # 부분 인덱스(ix_..._time)와 같은 조건을 그대로 써야 쿼리 계획이 그 인덱스를 사용합니다.
+    where = [station_rows_condition(station)]
+    if jigs is not None and jig_col:
+        where.append(f"{jig_expr} IN ({', '.join('?' * len(jigs))})" if jigs else '0')
+        params.extend(jigs)
+
+    # 'jig' 범위는 날짜와 관계없이 Jig 안에서 한 번이라도 PASS 했는지, 'jig_day' 범위(Semi)는 같은 날짜 안에서만 봅니다.
+    per_day = spec['pass_scope'] == 'jig_day'
+    passed_keys = 'jig, day, sn' if per_day else 'jig, sn'
+    join_on = 'p.jig = b.jig AND p.sn = b.sn' + (' AND p.day = b.day' if per_day else '')
+
+    final_where = ['jig IS NOT NULL', 'day IS NOT NULL']
+    if per_day:
+        final_where.append("trim(jig) <> ''")
+    if start_date is not None:
+        final_where.append('day >= ?')
+    if end_date is not None:
+        final_where.append('day <= ?')
+
+    unique_counts = ',\n               '.join(
+        f"COUNT(DISTINCT CASE WHEN {cat} THEN sn END) AS {cat}_unique_count" for cat in CATEGORIES
+    )
+    sql = f"""
+        WITH base AS (
+            SELECT {jig_expr} AS jig,
+                   {date_expression(spec['timestamp_col'], spec['timestamp_formats'])} AS day,
+                   SNumber COLLATE BINARY AS sn,
+                   upper(trim({pass_col})) AS status
+            FROM {_quote(table)}
+            WHERE {' AND '.join(where)}
+        ),
+        passed AS (
+            SELECT DISTINCT {passed_keys} FROM base WHERE status = 'O'
+        ),
+        flagged AS (
+            SELECT b.jig, b.day, b.sn,
+                   b.status = 'O' AS pass,
+                   b.status = 'X' AND p.sn IS NOT NULL AS false_defect,
+                   b.status = 'X' AND p.sn IS NULL AS true_defect,
+                   b.status = 'X' AS fail
+            FROM base b LEFT JOIN passed p ON {join_on}
+        )
+        SELECT jig, day AS date,
+               COUNT(*) AS total_test,
+               SUM(pass) AS pass, SUM(false_defect) AS false_defect, SUM(true_defect) AS true_defect, SUM(fail) AS fail,
+               {unique_counts}
+        FROM flagged
+        WHERE {' AND '.join(final_where)}
+        GROUP BY jig, day
+        ORDER BY jig, day
+    """
+    params.extend(str(d) for d in (start_date, end_date) if d is not None)
+    return sql, params
+
+
+# ==============================
+# 집계 실행
+# ==============================
+def query_station_summary(conn, station, table=HISTORY_TABLE, jigs=None, start_date=None, end_date=None):
+    """
+    스테이션의 Jig × 날짜 집계를 DB 안에서 실행하는 함수.
+    start_date / end_date 는 'YYYY-MM-DD' 문자열이나 date 이며 양 끝을 포함합니다.
+
+    반환값: csv_engine.summary_frame 과 같은 컬럼(jig, date, 건수, 고유 SN 건수, pass_rate)의 DataFrame
+    """
+    jig_col = resolve_jig_column(conn, station, table)
+    sql, params = summary_sql(station, jig_col, table, jigs, start_date, end_date)
+    frame = pd.read_sql(sql, conn, params=params)
+
+    count_fields = SUMMARY_FIELDS + [f'{cat}_unique_count' for cat in CATEGORIES]
+    frame[count_fields] = frame[count_fields].fillna(0).astype('int64')
+    rates = (100 * frame['pass'] / frame['total_test'].where(frame['total_test'] > 0)).fillna(0)
+    frame['pass_rate'] = [f"{rate:.1f}%" for rate in rates]
+    return frame
+
+
+def summary_data_from_frame(frame):
+    """
+    query_station_summary 결과를 리포트 화면의 summary_data / all_dates 구조로 바꾸는 함수.
+    DB 집계에는 상세 행 위치(*_idx, *_sns)가 없으므로 건수 항목만 채웁니다 (build_summary_cube 등에 사용).
+    """
+    fields = SUMMARY_FIELDS + [f'{cat}_unique_count' for cat in CATEGORIES] + ['pass_rate']
+    summary_data = {}
+    # 'pass' 는 파이썬 예약어라 itertuples 속성으로 꺼낼 수 없으므로 dict 로 읽습니다.
+    for record in frame[['jig', 'date'] + fields].to_dict('records'):
+        data_point = {field: record[field] if field == 'pass_rate' else int(record[field]) for field in fields}
+        summary_data.setdefault(record['jig'], {})[record['date']] = data_point
+    all_dates = sorted(pd.to_datetime(frame['date'].unique()).date) if not frame.empty else []
+    return summary_data, all_dates
+
+
+def explain(conn, sql, params=()):
+    """쿼리 계획(EXPLAIN QUERY PLAN)의 detail 문장 목록 (인덱스 사용 여부 확인용)"""
+    try:
+        return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    except sqlite3.Error as e:
+        return [f"EXPLAIN 실패: {e}"]
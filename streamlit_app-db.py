@@ -3,6 +3,14 @@ import sqlite3
 import pandas as pd
 import os
 
+from csv_schema import apply_schema_dtypes
+from db_ingest import ingest_csv, read_ingest_preview
+from db_query import HISTORY_TABLE, ensure_indexes, query_station_summary
+from db_pool import get_sqlite_pool
+from db_browse import PAGE_SIZES, count_rows, fetch_page, max_rowid, sortable_columns, table_column_names
+from csv_engine import STATION_SPECS
+from csv_query import QueryError, compile_query
+
 # 데이터베이스 경로 설정
 DB_FOLDER = "db"
 DB_FILE = os.path.join(DB_FOLDER, "SJ_TM2360E_v2.sqlite3")
@@ -11,26 +19,42 @@ DB_FILE = os.path.join(DB_FOLDER, "SJ_TM2360E_v2.sqlite3")
 if not os.path.exists(DB_FOLDER):
     os.makedirs(DB_FOLDER)
 
-def save_csv_to_db(df, table_name):
+def save_csv_to_db(file_content, upsert_latest=True):
     """
-    Pandas DataFrame을 SQLite3 테이블에 저장하고, 커밋을 통해 안정성을 확보합니다.
+    CSV 원본을 historyinspection 에 추가하고 inspection 에 SNumber 기준으로 upsert 합니다 (db_ingest 참고).
+    청크마다 커밋하며 진행률을 표시합니다. 실패하면 None 을 반환합니다.
     """
-    conn = None  # 초기화
+    progress_bar = st.progress(0.0, text="적재 준비 중...")
+
+    def show_progress(rows, total):
+        progress_bar.progress(min(rows / total, 1.0) if total else 1.0, text=f"{rows:,} / 약 {total:,}행 적재")
+
     try:
-        conn = sqlite3.connect(DB_FILE)
-        # to_sql 메서드가 자동으로 commit을 수행하지만, 
-        # 명시적으로 commit을 추가하여 작업의 완료를 보장합니다.
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
-        conn.commit()  # ⭐ 변경 사항을 데이터베이스에 최종 반영
-        return True
-    except sqlite3.Error as e:
+        with get_sqlite_pool(DB_FILE).connection() as conn:
+            return ingest_csv(DB_FILE, file_content, upsert_latest=upsert_latest, progress=show_progress, conn=conn)
+    except (sqlite3.Error, ValueError) as e:
         st.error(f"데이터베이스 저장 중 오류 발생: {e}")
-        if conn:
-            conn.rollback()  # 오류 발생 시 변경 사항을 되돌립니다.
-        return False
+        return None
     finally:
-        if conn:
-            conn.close()
+        progress_bar.empty()
+
+
+def show_ingest_report(report):
+    """적재 결과 요약을 표시합니다."""
+    station = report['station'] or '알 수 없음'
+    st.success(
+        f"'{DB_FILE}' 에 {report['history_rows']:,}행을 적재했습니다 "
+        f"(스테이션: {station}, inspection upsert {report['upserted']:,}행, {report['elapsed']:.1f}초)."
+    )
+    if report['created_tables']:
+        st.info(f"템플릿 DDL 로 테이블을 만들었습니다: {', '.join(report['created_tables'])}")
+    if report['skipped_no_sn']:
+        st.warning(f"SNumber 가 비어 있는 {report['skipped_no_sn']:,}행은 적재하지 않았습니다.")
+    if report['rejected']:
+        samples = ', '.join(f"{sn} ({message})" for sn, message in report['rejected_samples'])
+        st.warning(f"제약 조건 위반으로 inspection 에 반영하지 못한 행 {report['rejected']:,}건: {samples}")
+    if report['ignored_columns']:
+        st.info(f"테이블에 없는 컬럼은 적재하지 않았습니다: {', '.join(report['ignored_columns'])}")
 
 # ---
 # Streamlit 앱 시작
@@ -40,50 +64,171 @@ st.title("CSV 파일 업로드 및 SQLite3 등록")
 uploaded_file = st.file_uploader("CSV 파일을 선택해주세요.", type="csv")
 
 if uploaded_file is not None:
+    file_content = uploaded_file.getvalue()
+    # 미리보기는 적재와 같은 방법으로 헤더/인코딩을 찾아 앞부분 몇 행만 읽습니다 (스키마 dtype: 측정값 float32, PC/Pass category 등).
+    # 미리보기가 실패해도 적재는 따로 시도할 수 있도록 저장 버튼은 항상 표시합니다.
     try:
-        # CSV 파일을 DataFrame으로 읽기
-        df = pd.read_csv(uploaded_file, encoding='utf-8')
-        st.success("파일이 성공적으로 업로드되었습니다.")
+        station, df = read_ingest_preview(file_content)
+        st.success(f"파일이 성공적으로 업로드되었습니다 (스테이션: {station or '알 수 없음'}).")
         st.write("업로드된 데이터 미리보기:")
-        st.dataframe(df.head())
+        st.dataframe(df)
+    except Exception as e:
+        st.warning(f"미리보기를 표시하지 못했습니다: {e}")
+
+    upsert_latest = st.checkbox(
+        "inspection 테이블도 SNumber 기준으로 갱신 (upsert)", value=True,
+        help="historyinspection 에는 항상 모든 행을 추가합니다."
+    )
+
+    if st.button("데이터베이스에 저장"):
+        # 데이터베이스에 데이터 적재 (기존 데이터는 유지)
+        report = save_csv_to_db(file_content, upsert_latest)
+        if report is not None:
+            show_ingest_report(report)
+
+# ---
+# 이력 집계 (SQL): Jig × 날짜 집계를 DB 안에서 실행하여 원본 행을 읽지 않습니다.
+def show_history_summary():
+    st.markdown("---")
+    st.header("이력 집계 (historyinspection)")
+
+    pool = get_sqlite_pool(DB_FILE)
+    conn = None
+    try:
+        conn = pool.acquire()
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        if HISTORY_TABLE not in tables:
+            st.info(f"'{HISTORY_TABLE}' 테이블이 없습니다. CSV 를 먼저 적재해주세요.")
+            return
+        created = ensure_indexes(conn)
+        if created:
+            st.info(f"인덱스를 만들었습니다: {', '.join(created)}")
 
-        # 테이블명 입력
-        table_name = st.text_input("데이터를 저장할 테이블명을 입력하세요.", value="my_csv_data")
+        col1, col2, col3 = st.columns(3)
+        station = col1.selectbox("스테이션", list(STATION_SPECS), key="history_station")
+        start_date = col2.date_input("시작일", value=None, key="history_start")
+        end_date = col3.date_input("종료일", value=None, key="history_end")
 
-        if st.button("데이터베이스에 저장"):
-            if table_name:
-                # 데이터베이스에 데이터 저장
-                if save_csv_to_db(df, table_name):
-                    st.success(f"CSV 데이터가 '{DB_FILE}'의 '{table_name}' 테이블에 성공적으로 저장되었습니다.")
+        if st.button("집계 실행", key="history_run"):
+            summary = query_station_summary(conn, station, start_date=start_date, end_date=end_date)
+            if summary.empty:
+                st.info("집계할 데이터가 없습니다.")
             else:
-                st.warning("테이블명을 입력해주세요.")
+                totals = summary[['total_test', 'pass', 'false_defect', 'true_defect', 'fail']].sum()
+                st.write(
+                    f"총 {int(totals['total_test']):,}건 · PASS {int(totals['pass']):,} · "
+                    f"가성불량 {int(totals['false_defect']):,} · 진성불량 {int(totals['true_defect']):,}"
+                )
+                st.dataframe(summary, hide_index=True)
     except Exception as e:
-        st.error(f"파일을 처리하는 중 오류가 발생했습니다: {e}")
+        st.error(f"이력 집계 중 오류 발생: {e}")
+    finally:
+        if conn:
+            pool.release(conn)
+
+
+if os.path.exists(DB_FILE):
+    show_history_summary()
 
 # ---
 # 저장된 데이터 확인 (선택 사항)
-if os.path.exists(DB_FILE):
+# 테이블 전체를 읽지 않고 키셋 페이지네이션으로 한 페이지씩 읽습니다 (db_browse 참고).
+@st.cache_data(show_spinner=False)
+def cached_row_count(_conn, db_file, table, signature):
+    """
+    테이블 행 수. signature(최대 rowid)가 바뀔 때만 COUNT(*) 를 다시 실행합니다.
+    _conn 은 화면이 이미 빌린 연결이며 캐시 키에서 빠집니다 (풀에서 두 번째 연결을 빌리지 않도록).
+    """
+    return count_rows(_conn, table)
+
+
+def reset_browse_pages():
+    st.session_state['browse_pages'] = [None]
+    st.session_state['browse_next'] = None
+
+
+def next_browse_page():
+    if st.session_state.get('browse_next') is not None:
+        st.session_state['browse_pages'].append(st.session_state['browse_next'])
+
+
+def previous_browse_page():
+    if len(st.session_state['browse_pages']) > 1:
+        st.session_state['browse_pages'].pop()
+
+
+def show_table_browser():
     st.markdown("---")
     st.header("저장된 데이터베이스 확인")
-    
+
+    pool = get_sqlite_pool(DB_FILE)
     conn = None # 초기화
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        
+        conn = pool.acquire()
+
         # 테이블 목록 가져오기
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = [tbl[0] for tbl in cursor.fetchall()]
-        
-        if tables:
-            selected_table = st.selectbox("확인할 테이블을 선택하세요.", tables)
-            if selected_table:
-                df_db = pd.read_sql(f"SELECT * FROM {selected_table}", conn)
-                st.dataframe(df_db)
-        else:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+        if not tables:
             st.info("데이터베이스에 테이블이 없습니다.")
+            return
+
+        selected_table = st.selectbox("확인할 테이블을 선택하세요.", tables, key="browse_table", on_change=reset_browse_pages)
+        all_columns = table_column_names(conn, selected_table)
+        sortable = sortable_columns(conn, selected_table)
+
+        col1, col2, col3 = st.columns([2, 1, 1])
+        sort_column = col1.selectbox(
+            "정렬 컬럼 (rowid / 인덱스 컬럼)", list(sortable), key="browse_sort", on_change=reset_browse_pages,
+            help="인덱스가 있는 컬럼만 정렬할 수 있습니다. 컬럼으로 정렬하면 값이 비어 있는 행은 제외됩니다."
+        )
+        descending = col2.toggle("내림차순", key="browse_desc", on_change=reset_browse_pages)
+        page_size = col3.selectbox("페이지 크기", PAGE_SIZES, index=1, key="browse_page_size", on_change=reset_browse_pages)
+
+        columns = st.multiselect(
+            "표시할 컬럼 (비워 두면 전체)", all_columns, key="browse_columns", on_change=reset_browse_pages
+        )
+        filter_expression = st.text_input(
+            "필터 식 (선택)",
+            placeholder="예: PcbPass == X and PcbIrCurr > 12.5",
+            help="식은 SQL WHERE 절로 바뀌어 DB 에서 걸러진 행만 읽어 옵니다.",
+            key="browse_filter", on_change=reset_browse_pages
+        )
+
+        where, params = None, []
+        if filter_expression.strip():
+            try:
+                where, params = compile_query(filter_expression).to_sql(all_columns)
+            except QueryError as e:
+                st.error(f"필터 식 오류: {e}")
+                return
+
+        if 'browse_pages' not in st.session_state:
+            reset_browse_pages()
+        pages = st.session_state['browse_pages']
+
+        df_db, next_after = fetch_page(
+            conn, selected_table, columns, sort_column, descending, where, params,
+            sortable[sort_column], pages[-1], page_size
+        )
+        st.session_state['browse_next'] = next_after
+
+        total = cached_row_count(conn, DB_FILE, selected_table, max_rowid(conn, selected_table))
+        summary = f"{len(pages)} 페이지 · {len(df_db):,}행 표시 · 테이블 전체 {total:,}행"
+        if where:
+            summary += " (필터 적용)"
+        st.caption(summary)
+        st.dataframe(apply_schema_dtypes(df_db), hide_index=True)
+
+        nav1, nav2, nav3 = st.columns(3)
+        nav1.button("처음", on_click=reset_browse_pages, disabled=len(pages) == 1, key="browse_first")
+        nav2.button("이전", on_click=previous_browse_page, disabled=len(pages) == 1, key="browse_prev")
+        nav3.button("다음", on_click=next_browse_page, disabled=next_after is None, key="browse_next_button")
     except Exception as e:
         st.error(f"데이터베이스 조회 중 오류 발생: {e}")
     finally:
         if conn:
-            conn.close()
+            pool.release(conn)
+
+
+if os.path.exists(DB_FILE):
+    show_table_browser()
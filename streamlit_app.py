@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import altair as alt
 
@@ -9,7 +10,53 @@ from csv_Fw import read_csv_with_dynamic_header_for_Fw, analyze_Fw_data
 from csv_RfTx import read_csv_with_dynamic_header_for_RfTx, analyze_RfTx_data
 from csv_Semi import read_csv_with_dynamic_header_for_Semi, analyze_Semi_data
 from csv_Batadc import read_csv_with_dynamic_header_for_Batadc, analyze_Batadc_data
-
+from csv_stream import analyze_station_stream, analyze_station_incremental
+from csv_engine import get_detail_positions, build_summary_cube, slice_summary_cube
+from csv_search import SEARCH_MODES, build_snumber_index
+from csv_query import QueryError, compile_query
+from csv_qc import summarize_detail_groups
+from csv_cache import get_analysis_cache, make_cache_key, make_batch_cache_key
+from csv_jobs import get_job_manager
+from csv_batch import read_station_files
+from csv_snapshot import load_snapshot, save_snapshot
+
+# 상세 내역 표 한 쪽에 표시할 행 수 (화면 렌더링 비용은 이 값에 비례합니다)
+DETAIL_PAGE_SIZE = 100
+
+# 상세 내역 필터 결과를 조건(필터 모드, QC 컬럼, 기간, Jig)별로 보관할 최대 개수 (스테이션별)
+DETAIL_CACHE_ENTRIES = 8
+
+# 분석 리포트(display_analysis_result) 위젯 key 의 접두사 (뒤에 스테이션 key 가 붙습니다)
+REPORT_WIDGET_PREFIXES = (
+    'select_', 'start_date_', 'end_date_', 'detail_fields_select_', 'detail_expander_', 'detail_page_',
+    'snumber_search_', 'snumber_mode_', 'col_select_', 'filter_expression_',
+)
+
+def style_qc_cells(detail_rows):
+    """상세 내역 표에서 _QC 컬럼의 '미달'/'초과' 셀만 빨간색으로 표시하는 Styler 를 만드는 함수"""
+    qc_cols = [col for col in detail_rows.columns if col.endswith('_QC')]
+    if not qc_cols:
+        return detail_rows
+    return detail_rows.style.map(lambda value: 'color: red' if value in ('미달', '초과') else '', subset=qc_cols)
+
+def uploaded_display_name(uploaded):
+    """업로드 파일(또는 일괄 모드의 파일 목록)을 리포트 제목용 이름으로 바꾸는 함수"""
+    if isinstance(uploaded, list):
+        return uploaded[0].name if len(uploaded) == 1 else f"{uploaded[0].name} 외 {len(uploaded) - 1}개"
+    return uploaded.name
+
+def keep_report_widget_state(analysis_key):
+    """
+    닫힌 탭에서 그리지 않은 리포트 위젯의 선택 값을 유지하는 함수.
+    Streamlit 은 한 번의 실행에서 그려지지 않은 위젯의 값을 지우므로, 값을 세션 상태에 다시 써 두어 탭을 다시 열면 그대로 보이게 합니다.
+    """
+    prefixes = tuple(prefix + analysis_key for prefix in REPORT_WIDGET_PREFIXES)
+    for state_key in list(st.session_state.keys()):
+        if isinstance(state_key, str) and state_key.startswith(prefixes):
+            st.session_state[state_key] = st.session_state[state_key]
+
+# 리포트는 스테이션별 fragment 로 그려, 리포트 안의 버튼/필터 조작은 해당 리포트만 다시 실행합니다.
+@st.fragment
 def display_analysis_result(analysis_key, file_name, props):
     """ session_state에 저장된 분석 결과를 Streamlit에 표시하는 함수 """
     if st.session_state.analysis_results[analysis_key] is None:
@@ -23,6 +70,8 @@ def display_analysis_result(analysis_key, file_name, props):
         
     summary_data, all_dates = st.session_state.analysis_data[analysis_key]
     df_raw = st.session_state.analysis_results[analysis_key]
+    # (Jig, 날짜, 항목) 요약 큐브: 분석 직후 한 번 만들어 두고 필터 변경 시에는 슬라이스/합계만 수행합니다.
+    summary_cube = st.session_state.analysis_cube.get(analysis_key)
     
     # all_dates가 None일 경우 처리
     if all_dates is None:
@@ -32,8 +81,14 @@ def display_analysis_result(analysis_key, file_name, props):
     
     st.markdown(f"### '{file_name}' 분석 리포트")
 
+    # 스트리밍/증분 모드 결과는 집계만 보관하고 df_raw에는 앞부분 미리보기 행만 담겨 있습니다.
+    is_stream_mode = st.session_state.analysis_mode.get(analysis_key) in ('stream', 'incremental')
+    if is_stream_mode:
+        mode_label = "증분" if st.session_state.analysis_mode.get(analysis_key) == 'incremental' else "대용량 스트리밍"
+        st.info(f"{mode_label} 모드로 분석된 결과입니다. 상세 내역은 제공되지 않으며, DF 조회에는 앞부분 {len(df_raw)}행만 표시됩니다.")
+
     # === 필수 컬럼 존재 여부 확인 ===
-    required_columns = [props['jig_col'], props['timestamp_col']]
+    required_columns = [props['timestamp_col']] if is_stream_mode else [props['jig_col'], props['timestamp_col']]
     missing_columns = [col for col in required_columns if col not in df_raw.columns]
     
     if missing_columns:
@@ -46,7 +101,7 @@ def display_analysis_result(analysis_key, file_name, props):
     filter_col1, filter_col2, filter_col3 = st.columns(3)
     
     with filter_col1:
-        jig_list = sorted(df_raw[props['jig_col']].dropna().unique().tolist()) if props['jig_col'] in df_raw.columns else []
+        jig_list = summary_cube['jigs']
         selected_jig = st.selectbox("PC(Jig) 선택", ["전체"] + jig_list, key=f"select_{analysis_key}")
     
     if not all_dates:
@@ -63,7 +118,10 @@ def display_analysis_result(analysis_key, file_name, props):
         st.error("시작 날짜는 종료 날짜보다 이전이어야 합니다.")
         return
 
-    filtered_dates = [d for d in all_dates if start_date <= d <= end_date]
+    jigs_to_display = jig_list if selected_jig == "전체" else [selected_jig]
+    filtered_dates, daily_totals = slice_summary_cube(
+        summary_cube, None if selected_jig == "전체" else jigs_to_display, start_date, end_date
+    )
     if not filtered_dates:
         st.warning("선택된 날짜 범위에 해당하는 데이터가 없습니다.")
         return
@@ -71,35 +129,16 @@ def display_analysis_result(analysis_key, file_name, props):
     st.write(f"**분석 시간**: {st.session_state.analysis_time[analysis_key]}")
     st.markdown("---")
 
-    # --- 데이터 집계 ---
-    jigs_to_display = jig_list if selected_jig == "전체" else [selected_jig]
-    
-    daily_aggregated_data = {}
-    for date_obj in all_dates:
-        daily_totals = {key: 0 for key in ['total_test', 'pass', 'false_defect', 'true_defect', 'fail']}
-        for jig in jigs_to_display:
-            data_point = summary_data.get(jig, {}).get(date_obj.strftime('%Y-%m-%d'))
-            if data_point:
-                for key in daily_totals:
-                    daily_totals[key] += data_point.get(key, 0)
-        daily_aggregated_data[date_obj] = daily_totals
-
     # --- 요약 (날짜 범위 요약 테이블) ---
     st.subheader("기간 요약")
     
-    if filtered_dates:
-        summary_df_data = {
-            '날짜': [d.strftime('%m-%d') for d in filtered_dates],
-            '총 테스트 수': [daily_aggregated_data.get(d, {}).get('total_test', 0) for d in filtered_dates],
-            'PASS': [daily_aggregated_data.get(d, {}).get('pass', 0) for d in filtered_dates],
-            '가성불량': [daily_aggregated_data.get(d, {}).get('false_defect', 0) for d in filtered_dates],
-            '진성불량': [daily_aggregated_data.get(d, {}).get('true_defect', 0) for d in filtered_dates],
-            'FAIL': [daily_aggregated_data.get(d, {}).get('fail', 0) for d in filtered_dates]
-        }
-        summary_df = pd.DataFrame(summary_df_data).set_index('날짜')
-        st.dataframe(summary_df.transpose())
-    else:
-        st.info("선택된 조건에 해당하는 요약 데이터가 없습니다.")
+    # daily_totals 의 열 순서는 summary_cube['fields'] (total_test, pass, false_defect, true_defect, fail) 입니다.
+    summary_df = pd.DataFrame(
+        daily_totals,
+        index=pd.Index([d.strftime('%m-%d') for d in filtered_dates], name='날짜'),
+        columns=['총 테스트 수', 'PASS', '가성불량', '진성불량', 'FAIL'],
+    )
+    st.dataframe(summary_df.transpose())
 
     st.markdown("---")
     
@@ -165,6 +204,63 @@ def display_analysis_result(analysis_key, file_name, props):
         
         current_mode = st.session_state[f'detail_mode_{analysis_key}']
         qc_filter_mode = st.session_state[f'qc_filter_mode_{analysis_key}'] #추가
+
+        # if current_mode == 'defects':
+        #     categories = ['false_defect', 'true_defect']
+        #     labels = ['가성불량', '진성불량']
+        # elif current_mode == 'pass':
+        #     categories = ['pass']
+        #     labels = ['PASS']
+        # else: 
+        #     categories = ['pass', 'false_defect', 'true_defect', 'fail']
+        #     labels = ['PASS', '가성불량', '진성불량', 'FAIL']
+        
+        # === 1. 카테고리 결정 로직 수정 (필터 모드에 따라 카테고리 강제) ===
+        
+        # QC 필터 모드가 활성화된 경우, 카테고리를 명시적으로 설정합니다.
+        if qc_filter_mode == 'FailOnly':
+            # categories = ['pass', 'false_defect', 'true_defect', 'fail'] # 모든 데이터를 가져와서 QC 미달/초과만 필터링
+            # labels = ['PASS', '가성불량', '진성불량', 'FAIL']
+            categories = ['false_defect', 'true_defect'] # 모든 데이터를 가져와서 QC 미달/초과만 필터링
+            labels = ['가성불량', '진성불량']
+        elif qc_filter_mode == 'PassOnly':
+            categories = ['pass'] # PASS 카테고리 데이터만 가져옵니다.
+            labels = ['PASS']
+        elif current_mode == 'defects':
+            categories = ['false_defect', 'true_defect']
+            labels = ['가성불량', '진성불량']
+        elif current_mode == 'pass':
+            categories = ['pass']
+            labels = ['PASS']
+        else: 
+            categories = ['pass', 'false_defect', 'true_defect', 'fail']
+            labels = ['PASS', '가성불량', '진성불량', 'FAIL']
+
+        # ============================================================
+
+        # === 2. QC 필터링 및 QC 건수 집계 (조건별로 한 번만 계산하여 세션에 보관) ===
+        # 조건 1: '불량(초과,미달만)' 버튼 → 선택된 QC 컬럼 중 하나라도 미달/초과
+        # 조건 2: 'PASS(초과,미달만)' 버튼 → PASS 카테고리 AND QC 미달/초과
+        selected_qc_cols = [col for col in selected_detail_fields if col.endswith('_QC') and col in df_raw.columns]
+        detail_cache = st.session_state.detail_view_cache.setdefault(analysis_key, {})
+        detail_cache_key = (qc_filter_mode, current_mode, tuple(selected_qc_cols), start_date, end_date, selected_jig)
+        detail_groups = detail_cache.get(detail_cache_key)
+        if detail_groups is None:
+            groups = []
+            for date_obj in filtered_dates:
+                date_str = date_obj.strftime('%Y-%m-%d')
+                for jig in jigs_to_display:
+                    data_point = summary_data.get(jig, {}).get(date_str)
+                    if not data_point or data_point.get('total_test', 0) == 0:
+                        continue
+                    # 상세 행은 dict 복사본 없이 df_raw 의 행 위치(int32 배열)로만 보관되어 있습니다.
+                    for cat in categories:
+                        groups.append(((date_str, jig, cat), cat, get_detail_positions(data_point, cat)))
+            detail_groups = summarize_detail_groups(df_raw, groups, selected_qc_cols, qc_filter_mode)
+            if len(detail_cache) >= DETAIL_CACHE_ENTRIES:
+                detail_cache.pop(next(iter(detail_cache)))
+            detail_cache[detail_cache_key] = detail_groups
+        # ======================================================
         
         for date_obj in filtered_dates:
             st.markdown(f"**{date_obj.strftime('%Y-%m-%d')}**")
@@ -175,127 +271,24 @@ def display_analysis_result(analysis_key, file_name, props):
                     continue
 
                 st.markdown(f"**PC(Jig): {jig}**")
-                
-                # if current_mode == 'defects':
-                #     categories = ['false_defect', 'true_defect']
-                #     labels = ['가성불량', '진성불량']
-                # elif current_mode == 'pass':
-                #     categories = ['pass']
-                #     labels = ['PASS']
-                # else: 
-                #     categories = ['pass', 'false_defect', 'true_defect', 'fail']
-                #     labels = ['PASS', '가성불량', '진성불량', 'FAIL']
-                
-                # === 1. 카테고리 결정 로직 수정 (필터 모드에 따라 카테고리 강제) ===
-                
-                # QC 필터 모드가 활성화된 경우, 카테고리를 명시적으로 설정합니다.
-                if qc_filter_mode == 'FailOnly':
-                    # categories = ['pass', 'false_defect', 'true_defect', 'fail'] # 모든 데이터를 가져와서 QC 미달/초과만 필터링
-                    # labels = ['PASS', '가성불량', '진성불량', 'FAIL']
-                    categories = ['false_defect', 'true_defect'] # 모든 데이터를 가져와서 QC 미달/초과만 필터링
-                    labels = ['가성불량', '진성불량']
-                elif qc_filter_mode == 'PassOnly':
-                    categories = ['pass'] # PASS 카테고리 데이터만 가져옵니다.
-                    labels = ['PASS']
-                elif current_mode == 'defects':
-                    categories = ['false_defect', 'true_defect']
-                    labels = ['가성불량', '진성불량']
-                elif current_mode == 'pass':
-                    categories = ['pass']
-                    labels = ['PASS']
-                else: 
-                    categories = ['pass', 'false_defect', 'true_defect', 'fail']
-                    labels = ['PASS', '가성불량', '진성불량', 'FAIL']
-
-                # ============================================================
 
                 for cat, label in zip(categories, labels):
-                    full_data_list = data_point.get(f'{cat}_data', [])
-                    
-                    if not full_data_list:
-                        continue
-                    
-                    # # === 핵심 수정: QC 필터링 로직 적용 ===
-                    # if qc_filter_mode != 'None':
-                    #     # 필터링할 QC 컬럼을 찾습니다. (selected_detail_fields를 사용하면 안전합니다.)
-                    #     selected_qc_cols_for_filter = [col for col in selected_detail_fields if col.endswith('_QC')]
-                        
-                    #     if selected_qc_cols_for_filter:
-                    #         filtered_list = []
-                    #         target_statuses = ['미달', '초과']
-                            
-                    #         for record in full_data_list:
-                    #             is_target_status = False
-                    #             for qc_col in selected_qc_cols_for_filter:
-                    #                 qc_value = record.get(qc_col)
-                                    
-                    #                 if qc_filter_mode == 'FailOnly' and qc_value in target_statuses:
-                    #                     is_target_status = True
-                    #                     break
-                    #                 elif qc_filter_mode == 'PassOnly' and qc_value == 'Pass':
-                    #                     is_target_status = True
-                    #                     break
-                                
-                    #             if is_target_status:
-                    #                 filtered_list.append(record)
-                            
-                    #         full_data_list = filtered_list # 필터링된 리스트로 교체
-
-                    # if not full_data_list:
-                    #     # 필터링 후 데이터가 없으면 다음 카테고리로 넘어갑니다.
-                    #     continue
-                    # # ======================================
-                    
-                    # === 2. QC 필터링 로직 수정 (각 카테고리별로 필터링) ===
-                    is_qc_filtering_active = qc_filter_mode in ['FailOnly', 'PassOnly']
-
-                    if is_qc_filtering_active:
-                        selected_qc_cols_for_filter = [col for col in selected_detail_fields if col.endswith('_QC')]
-                        
-                        if selected_qc_cols_for_filter:
-                            filtered_list = []
-                            target_statuses = ['미달', '초과']
-                            
-                            for record in full_data_list:
-                                qc_value_found = False
-                                for qc_col in selected_qc_cols_for_filter:
-                                    qc_value = record.get(qc_col)
-                                    
-                                    # 조건 1: '불량(초과,미달만)' 버튼을 눌렀을 경우
-                                    if qc_filter_mode == 'FailOnly' and qc_value in target_statuses:
-                                        qc_value_found = True
-                                        break
-                                    # 조건 2: 'PASS(초과,미달만)' 버튼을 눌렀을 경우
-                                    elif qc_filter_mode == 'PassOnly' and cat == 'pass' and qc_value in target_statuses:
-                                        # PASS 카테고리 AND QC 미달/초과인 경우만 필터링
-                                        qc_value_found = True
-                                        break
-                                
-                                if qc_value_found:
-                                    filtered_list.append(record)
-                            
-                            full_data_list = filtered_list # 필터링된 리스트로 교체
-
-                    if not full_data_list:
+                    group = detail_groups.get((date_obj.strftime('%Y-%m-%d'), jig, cat))
+                    if group is None:
                         continue
-                    # ======================================================
 
-                    count = len(full_data_list)
-                    unique_count = len(set(d.get('SNumber', 'N/A') for d in full_data_list))
+                    positions = group['positions']
+                    count = group['count']
+                    unique_count = group['unique_count']
 
-                    qc_cols_found = [col for col in df_raw.columns if col.endswith('_QC')]
                     qc_summary_parts_html = []  # HTML 포함 (제목 아래 출력용)
                     qc_summary_parts_plain = [] # HTML 미포함 (제목 출력용)
-                    fields_to_check = selected_detail_fields
-                    selected_qc_cols = [col for col in fields_to_check if col.endswith('_QC')]
                     
                     for qc_col in selected_qc_cols:
-                        qc_statuses = [record.get(qc_col) for record in full_data_list if record.get(qc_col) is not None]
+                        qc_counts = group['qc_counts'][qc_col]
                         
-                        if not qc_statuses:
+                        if not qc_counts:
                             continue
-                            
-                        qc_counts = pd.Series(qc_statuses).value_counts().to_dict()
                         
                         parts_html = []
                         parts_plain = []
@@ -333,7 +326,12 @@ def display_analysis_result(analysis_key, file_name, props):
                     # 2. Expander 제목 구성 (순수 텍스트)
                     expander_title_base = f"{label} - {count}건 (중복값제거 SN: {unique_count}건){qc_summary_plain_text}"
                     
-                    with st.expander(expander_title_base, expanded=False):
+                    # 펼침 상태를 추적하여 펼쳐진 Expander 에서만 행을 잘라 옵니다.
+                    detail_expander = st.expander(
+                        expander_title_base, expanded=False,
+                        key=f"detail_expander_{analysis_key}_{date_obj}_{jig}_{cat}", on_change="rerun"
+                    )
+                    with detail_expander:
                         
                         # 3. 제목 아래에 색상이 적용된 QC 요약 정보 출력 (HTML)
                         if qc_summary_parts_html:
@@ -349,22 +347,22 @@ def display_analysis_result(analysis_key, file_name, props):
                             st.info("표시할 필드가 선택되지 않았습니다.")
                             continue
 
-                        # 4. 상세 내역 개별 항목 출력 (미달/초과 빨간색 적용)
-                        for item in full_data_list:
-                            formatted_fields = []
-                            for field in fields_to_display:
-                                value = item.get(field, 'N/A')
-                                
-                                # === 개별 항목 빨간색 적용 로직 ===
-                                if field.endswith('_QC') and value in ['미달', '초과']:
-                                    # QC 결과가 '미달' 또는 '초과'일 때 빨간색으로 감쌉니다.
-                                    formatted_fields.append(f"{field}: <span style='color:red;'>{value}</span>")
-                                else:
-                                    formatted_fields.append(f"{field}: {value}")
-                                # ===================================
-                            
-                            # st.markdown을 사용하여 HTML이 렌더링되도록 합니다.
-                            st.markdown(", ".join(formatted_fields), unsafe_allow_html=True)
+                        if not detail_expander.open:
+                            continue
+
+                        # 4. 상세 내역 표 출력 (페이지 단위로 잘라 한 번에 표시, 미달/초과 셀은 빨간색)
+                        existing_fields = [field for field in fields_to_display if field in df_raw.columns]
+                        page_count = -(-count // DETAIL_PAGE_SIZE)
+                        page = 1
+                        if page_count > 1:
+                            page = st.number_input(
+                                f"페이지 (전체 {page_count}쪽, 쪽당 {DETAIL_PAGE_SIZE}건)", min_value=1, max_value=page_count, value=1,
+                                key=f"detail_page_{analysis_key}_{date_obj}_{jig}_{cat}"
+                            )
+                        page_positions = positions[(page - 1) * DETAIL_PAGE_SIZE:page * DETAIL_PAGE_SIZE]
+                        detail_rows = df_raw[existing_fields].iloc[page_positions]
+                        st.dataframe(style_qc_cells(detail_rows), hide_index=True)
+                        st.caption(f"{(page - 1) * DETAIL_PAGE_SIZE + 1}–{(page - 1) * DETAIL_PAGE_SIZE + len(page_positions)} / {count}건")
 
             st.markdown("---")
 
@@ -374,6 +372,9 @@ def display_analysis_result(analysis_key, file_name, props):
     
     with search_col1:
         snumber_query = st.text_input("SNumber 검색", key=f"snumber_search_{analysis_key}")
+        snumber_mode = st.radio(
+            "검색 방식", list(SEARCH_MODES), format_func=SEARCH_MODES.get, horizontal=True, key=f"snumber_mode_{analysis_key}"
+        )
     with search_col2:
         all_columns = df_raw.columns.tolist()
         qc_cols_default = [col for col in all_columns if col.endswith('_QC')]
@@ -385,6 +386,15 @@ def display_analysis_result(analysis_key, file_name, props):
             key=f"col_select_{analysis_key}",
             default=[col for col in all_columns if col in default_cols_for_search]
         )
+        filter_expression = st.text_input(
+            "필터 식",
+            key=f"filter_expression_{analysis_key}",
+            placeholder=(
+                f"예: {qc_cols_default[0]} in (미달, 초과) and PassStatusNorm == X" if qc_cols_default
+                else "예: PassStatusNorm == X and SNumber contains ABC"
+            ),
+            help="컬럼 비교(==, !=, >, >=, <, <=), in (...), not in (...), contains, between ... and ... 를 and / or / not 과 괄호로 묶어 사용할 수 있습니다."
+        )
     with search_col3:
         st.write("") 
         st.write("") 
@@ -394,43 +404,227 @@ def display_analysis_result(analysis_key, file_name, props):
     if apply_button:
         st.session_state[filter_state_key] = {
             'snumber': snumber_query,
+            'snumber_mode': snumber_mode,
+            'expression': filter_expression.strip(),
             'columns': selected_columns
         }
     
-    applied_filters = st.session_state.get(filter_state_key, {'snumber': '', 'columns': []})
+    applied_filters = st.session_state.get(filter_state_key, {'snumber': '', 'snumber_mode': 'contains', 'expression': '', 'columns': []})
 
     with st.expander("DF 조회"):
-        df_display = df_raw.copy()
+        # 분석된 df 는 캐시에서 공유되므로 복사하지 않고, 열을 고른 뒤 검색된 행 위치만 잘라 옵니다.
+        df_display = df_raw
+        
+        if applied_filters['columns']:
+            existing_cols = [col for col in applied_filters['columns'] if col in df_display.columns]
+            df_display = df_display[existing_cols]
         
         has_snumber_query = False
+        # 조건에 맞는 행 위치 (None 이면 모든 행)
+        row_positions = None
         
         if applied_filters['snumber']:
             query = applied_filters['snumber']
             has_snumber_query = True
             
-            if 'SNumber' in df_display.columns and pd.api.types.is_string_dtype(df_display['SNumber']):
-                df_display = df_display[df_display['SNumber'].str.contains(query, na=False, case=False)]
+            # 분석 시점에 만든 SNumber 인덱스로 일치하는 행 위치만 찾습니다.
+            search_index = st.session_state.search_index.get(analysis_key)
+            if search_index is not None and search_index.row_count == len(df_raw):
+                row_positions = search_index.search(query, applied_filters.get('snumber_mode', 'contains'))
             else:
                 try:
-                    df_display = df_display[df_display.apply(lambda row: query.lower() in str(row.values).lower(), axis=1)]
+                    row_positions = np.flatnonzero(df_raw.apply(lambda row: query.lower() in str(row.values).lower(), axis=1).to_numpy())
                 except Exception:
                     st.warning("SNumber 검색을 지원하지 않는 데이터 형식입니다.")
                     pass 
 
-        if applied_filters['columns']:
-            existing_cols = [col for col in applied_filters['columns'] if col in df_display.columns]
-            df_display = df_display[existing_cols]
-        
+        # 필터 식은 한 번 해석해 두고(compile_query 캐시), 전체 컬럼에 대한 벡터 연산 마스크로 적용합니다.
+        if applied_filters.get('expression'):
+            has_snumber_query = True
+            try:
+                expression_positions = compile_query(applied_filters['expression']).positions(df_raw)
+                if row_positions is None:
+                    row_positions = expression_positions
+                else:
+                    row_positions = np.intersect1d(row_positions, expression_positions, assume_unique=True)
+            except QueryError as e:
+                st.error(f"필터 식 오류: {e}")
+
+        if row_positions is not None:
+            df_display = df_display.take(row_positions)
+
         # 결과 출력 및 디버깅 메시지
         if df_display.empty:
             if has_snumber_query:
-                st.info(f"선택된 필터 조건 ('{applied_filters['snumber']}')에 해당하는 결과가 없습니다. 검색어를 확인하거나 필터를 해제해 주세요.")
+                conditions = [text for text in (applied_filters['snumber'], applied_filters.get('expression')) if text]
+                st.info(f"선택된 필터 조건 ({', '.join(repr(text) for text in conditions)})에 해당하는 결과가 없습니다. 검색어를 확인하거나 필터를 해제해 주세요.")
             else:
                 st.info("데이터프레임에 표시할 행이 없습니다. 분석 데이터(df_raw)를 확인해주세요.")
         else:
             st.dataframe(df_display)
 
 
+# ==============================
+# 분석 작업 (csv_jobs 작업 스레드에서 실행)
+# ==============================
+# 작업 함수는 st 를 호출하지 않고 결과 dict 만 만듭니다. 화면 메시지는 (수준, 문장) 목록으로 돌려주고,
+# 세션 상태 반영은 작업이 끝난 뒤 스크립트 쪽(apply_analysis_job)에서 합니다.
+def make_analysis_result(mode, summary_data, all_dates, df, messages):
+    """분석 결과와 리포트용 요약 큐브/SNumber 인덱스를 묶은 결과 dict 를 만드는 함수"""
+    return {
+        'mode': mode,
+        'summary_data': summary_data,
+        'all_dates': all_dates,
+        'df': df,
+        'cube': build_summary_cube(summary_data, all_dates) if summary_data is not None else None,
+        'search_index': build_snumber_index(df),
+        'messages': messages,
+    }
+
+def failed_analysis_result(mode, message):
+    return {'mode': mode, 'df': None, 'messages': [('error', message)]}
+
+def run_full_analysis(job, key, props, uploaded, batch_mode, analysis_cache, cache_key):
+    """전체(일괄) 분석 작업: 파일 읽기 → 분석 → 캐시/스냅샷 저장"""
+    file_hash, _, analysis_mode, _ = cache_key
+    # 리더/분석 함수의 경고와 오류는 (수준, 문장) 목록으로 받아 결과 메시지 앞에 붙입니다.
+    diagnostics = []
+    job.report('read')
+    batch = None
+    if batch_mode:
+        df, batch_report, duplicate_rows = read_station_files(uploaded, key)
+        batch = (batch_report, duplicate_rows)
+    else:
+        df = props['reader'](uploaded, diagnostics)
+
+    if df is None or df.empty:
+        result = failed_analysis_result('full', f"{key.upper()} 데이터 파일을 읽을 수 없거나 내용이 비어 있습니다. 파일 형식을 확인해주세요.")
+    # 필수 컬럼 존재 여부 확인
+    elif props['jig_col'] not in df.columns or props['timestamp_col'] not in df.columns:
+        result = failed_analysis_result('full', f"데이터에 필수 컬럼 ('{props['jig_col']}', '{props['timestamp_col']}')이 없습니다. 파일을 다시 확인해주세요.")
+    else:
+        # 분석 함수 실행: df에 QC 컬럼이 추가됨 (in-place 수정)
+        summary_data, all_dates = props['analyzer'](df, progress=job.report, diagnostics=diagnostics)
+
+        # 분석에 성공한 결과만 캐시합니다. 캐시된 df 는 여러 세션이 공유하므로 이후에는 수정하지 않습니다.
+        if summary_data is not None:
+            analysis_cache.put(cache_key, (summary_data, all_dates, df))
+            save_snapshot(file_hash, key, summary_data, all_dates, df, analysis_mode, uploaded_display_name(uploaded))
+        result = make_analysis_result('full', summary_data, all_dates, df, [('success', "분석 완료! 결과가 저장되었습니다.")])
+
+    result['messages'] = diagnostics + result['messages']
+    result['batch'] = batch
+    return result
+
+def run_stream_analysis(job, key, uploaded, analysis_cache, cache_key):
+    """대용량 스트리밍 분석 작업: 청크 단위 집계 → 캐시/스냅샷 저장"""
+    file_hash, _, analysis_mode, _ = cache_key
+    job.report('read')
+    summary_data, all_dates, preview_df = analyze_station_stream(uploaded, key, progress=job.report)
+    if summary_data is None:
+        return failed_analysis_result('stream', f"{key.upper()} 데이터 파일을 읽을 수 없거나 필수 컬럼이 없습니다. 파일 형식을 확인해주세요.")
+
+    analysis_cache.put(cache_key, (summary_data, all_dates, preview_df))
+    save_snapshot(file_hash, key, summary_data, all_dates, preview_df, analysis_mode, uploaded_display_name(uploaded))
+    return make_analysis_result('stream', summary_data, all_dates, preview_df, [('success', "분석 완료! 결과가 저장되었습니다.")])
+
+def run_incremental_analysis(job, key, uploaded, previous_state):
+    """증분 분석 작업: 이전 상태 이후에 추가된 행만 집계 (앞부분이 바뀌었으면 처음부터)"""
+    job.report('read')
+    summary_data, all_dates, preview_df, incremental_state, new_rows = analyze_station_incremental(
+        uploaded, key, previous_state, progress=job.report
+    )
+    if summary_data is None:
+        result = failed_analysis_result('incremental', f"{key.upper()} 데이터 파일을 읽을 수 없거나 필수 컬럼이 없습니다. 파일 형식을 확인해주세요.")
+        result['incremental_state'] = None
+        return result
+
+    messages = []
+    if incremental_state is previous_state:
+        messages.append(('info', f"이전 분석 이후 추가된 {new_rows}행을 반영했습니다. (누적 {incremental_state.rows}행)"))
+    elif previous_state is not None:
+        messages.append(('info', f"이전에 분석한 파일과 앞부분이 달라 처음부터 다시 분석했습니다. ({new_rows}행)"))
+    pending_bytes = len(uploaded.getvalue()) - incremental_state.offset
+    if pending_bytes > 0:
+        messages.append(('info', f"줄바꿈으로 끝나지 않은 마지막 행({pending_bytes} bytes)은 다음 업로드 때 반영됩니다."))
+    messages.append(('success', "분석 완료! 결과가 저장되었습니다."))
+
+    result = make_analysis_result('incremental', summary_data, all_dates, preview_df, messages)
+    result['incremental_state'] = incremental_state
+    return result
+
+def store_analysis_result(key, result):
+    """분석 결과 dict(작업 결과 또는 캐시 적중)를 세션 상태에 저장하는 함수"""
+    st.session_state.analysis_messages[key] = result['messages']
+    df = result['df']
+    if df is None:
+        st.session_state.analysis_results[key] = None
+        return
+
+    st.session_state.analysis_data[key] = (result['summary_data'], result['all_dates'])
+    st.session_state.analysis_cube[key] = result['cube']
+    st.session_state.detail_view_cache[key] = {}
+    st.session_state.search_index[key] = result['search_index']
+
+    # QC 컬럼이 추가된 최종 df(스트리밍/증분 모드는 미리보기 df)를 세션 상태에 저장
+    # 분석 함수가 df를 직접 수정하므로 별도 복사본 없이 그대로 보관합니다.
+    st.session_state.analysis_results[key] = df
+    st.session_state.analysis_mode[key] = result['mode']
+    st.session_state.analysis_time[key] = datetime.now().strftime('%Y-%m-%d')
+
+    # 사이드바/상세 내역을 위한 최종 컬럼 목록 업데이트
+    final_cols = df.columns.tolist()
+    st.session_state.sidebar_columns[key] = final_cols
+    st.session_state.field_mapping[key] = final_cols
+
+def submit_analysis_job(key, kind, func, *args):
+    """분석 작업을 작업 스레드에 등록하고 작업 ID 를 세션에 보관하는 함수"""
+    st.session_state.analysis_jobs[key] = get_job_manager().submit(key, kind, func, *args)
+
+def apply_analysis_job(key, job):
+    """끝난 작업의 결과(또는 실패/취소)를 세션 상태에 반영하는 함수"""
+    st.session_state.analysis_jobs[key] = None
+    if job.status == 'done':
+        if job.result.get('batch') is not None:
+            st.session_state.batch_reports[key] = job.result['batch']
+        if job.kind == 'incremental':
+            st.session_state.incremental_states[key] = job.result['incremental_state']
+        store_analysis_result(key, job.result)
+        return
+
+    if job.kind == 'incremental':
+        # 중간에 멈춘 증분 작업의 누적 상태는 일부만 반영되었을 수 있으므로 버리고 다음 실행 때 처음부터 집계합니다.
+        st.session_state.incremental_states[key] = None
+    if job.status == 'failed':
+        st.session_state.analysis_messages[key] = [('error', f"분석 중 오류 발생: {job.error}")]
+        st.session_state.analysis_results[key] = None
+    else:
+        st.session_state.analysis_messages[key] = [('info', "분석을 취소했습니다. 이전 결과가 있으면 그대로 표시합니다.")]
+
+@st.fragment(run_every=1)
+def show_analysis_job(analysis_key):
+    """진행 중인 분석 작업의 단계/진행률을 1초마다 갱신하고, 끝나면 결과를 반영한 뒤 앱을 다시 실행하는 함수"""
+    job_manager = get_job_manager()
+    job = job_manager.get(st.session_state.analysis_jobs[analysis_key])
+    if job is None:
+        # 서버가 다시 시작되면 작업 목록이 비어 있습니다.
+        st.session_state.analysis_jobs[analysis_key] = None
+        st.session_state.analysis_messages[analysis_key] = [('warning', "분석 작업을 찾을 수 없습니다. 다시 실행해주세요.")]
+        st.rerun()
+
+    if not job.finished:
+        st.progress(job.progress, text=f"{analysis_key.upper()} 분석 {job.describe()}")
+        if job.cancel_requested:
+            st.caption("취소 요청됨: 진행 중인 단계가 끝나면 멈춥니다.")
+        elif st.button("분석 취소", key=f"cancel_job_{analysis_key}"):
+            job.cancel()
+        return
+
+    apply_analysis_job(analysis_key, job)
+    job_manager.discard(job.job_id)
+    st.rerun()
+
+
 # ==============================
 # 메인 실행 함수
 # ==============================
@@ -447,6 +641,22 @@ def main():
         st.session_state.analysis_data = {k: None for k in ['Pcb', 'Fw', 'RfTx', 'Semi', 'Batadc']}
     if 'analysis_time' not in st.session_state:
         st.session_state.analysis_time = {k: None for k in ['Pcb', 'Fw', 'RfTx', 'Semi', 'Batadc']}
+    if 'analysis_mode' not in st.session_state:
+        st.session_state.analysis_mode = {k: None for k in ['Pcb', 'Fw', 'RfTx', 'Semi', 'Batadc']}
+    if 'batch_reports' not in st.session_state:
+        st.session_state.batch_reports = {k: None for k in ['Pcb', 'Fw', 'RfTx', 'Semi', 'Batadc']}
+    if 'analysis_cube' not in st.session_state:
+        st.session_state.analysis_cube = {k: None for k in ['Pcb', 'Fw', 'RfTx', 'Semi', 'Batadc']}
+    if 'search_index' not in st.session_state:
+        st.session_state.search_index = {k: None for k in ['Pcb', 'Fw', 'RfTx', 'Semi', 'Batadc']}
+    if 'detail_view_cache' not in st.session_state:
+        st.session_state.detail_view_cache = {k: {} for k in ['Pcb', 'Fw', 'RfTx', 'Semi', 'Batadc']}
+    if 'incremental_states' not in st.session_state:
+        st.session_state.incremental_states = {k: None for k in ['Pcb', 'Fw', 'RfTx', 'Semi', 'Batadc']}
+    if 'analysis_jobs' not in st.session_state:
+        st.session_state.analysis_jobs = {k: None for k in ['Pcb', 'Fw', 'RfTx', 'Semi', 'Batadc']}
+    if 'analysis_messages' not in st.session_state:
+        st.session_state.analysis_messages = {}
     if 'field_mapping' not in st.session_state:
         st.session_state.field_mapping = {}
     if 'sidebar_columns' not in st.session_state:
@@ -458,7 +668,11 @@ def main():
             st.session_state[f'qc_filter_mode_{key}'] = 'None'
     # ========================================================    
 
-    tabs = st.tabs(["파일 Pcb 분석", "파일 Fw 분석", "파일 RfTx 분석", "파일 Semi 분석", "파일 Batadc 분석"])
+    # 탭을 바꾸면 앱을 다시 실행하고, 열린 탭(.open)의 리포트만 그립니다.
+    tabs = st.tabs(
+        ["파일 Pcb 분석", "파일 Fw 분석", "파일 RfTx 분석", "파일 Semi 분석", "파일 Batadc 분석"],
+        key="station_tab", on_change="rerun"
+    )
     tab_map = {
         'Pcb': {'tab': tabs[0], 'reader': read_csv_with_dynamic_header, 'analyzer': analyze_data, 'jig_col': 'PcbMaxIrPwr', 'timestamp_col': 'PcbStartTime'},
         'Fw': {'tab': tabs[1], 'reader': read_csv_with_dynamic_header_for_Fw, 'analyzer': analyze_Fw_data, 'jig_col': 'FwPC', 'timestamp_col': 'FwStamp'},
@@ -478,50 +692,82 @@ def main():
     for key, props in tab_map.items():
         with props['tab']:
             st.header(f"{key.upper()} 데이터 분석")
-            st.session_state.uploaded_files[key] = st.file_uploader(f"{key.upper()} 파일을 선택하세요", type=["csv"], key=f"uploader_{key}")
+            batch_mode = st.checkbox(
+                "여러 파일 일괄 분석 (Jig PC별/일자별 파일을 병렬로 읽어 하나로 합쳐 분석)", key=f"batch_mode_{key}"
+            )
+            if batch_mode:
+                st.session_state.uploaded_files[key] = st.file_uploader(
+                    f"{key.upper()} 파일들을 선택하세요", type=["csv"], accept_multiple_files=True, key=f"uploader_multi_{key}"
+                )
+            else:
+                st.session_state.uploaded_files[key] = st.file_uploader(f"{key.upper()} 파일을 선택하세요", type=["csv"], key=f"uploader_{key}")
             
             if st.session_state.uploaded_files[key]:
-                if st.button(f"{key.upper()} 분석 실행", key=f"analyze_{key}"):
-                    try:
-                        df = props['reader'](st.session_state.uploaded_files[key])
-                        
-                        if df is None or df.empty:
-                            st.error(f"{key.upper()} 데이터 파일을 읽을 수 없거나 내용이 비어 있습니다. 파일 형식을 확인해주세요.")
-                            st.session_state.analysis_results[key] = None
-                            continue
-                        
-                        # 필수 컬럼 존재 여부 확인
-                        if props['jig_col'] not in df.columns or props['timestamp_col'] not in df.columns:
-                            st.error(f"데이터에 필수 컬럼 ('{props['jig_col']}', '{props['timestamp_col']}')이 없습니다. 파일을 다시 확인해주세요.")
-                            st.session_state.analysis_results[key] = None
-                            continue
-
-                        with st.spinner("데이터 분석 및 저장 중..."):
-                            
-                            # 1. 분석 함수 실행: df에 QC 컬럼이 추가됨 (in-place 수정)
-                            summary_data, all_dates = props['analyzer'](df)
-                            st.session_state.analysis_data[key] = (summary_data, all_dates)
-                            
-                            # 2. QC 컬럼이 추가된 최종 df를 세션 상태에 저장 (순서 변경!)
-                            st.session_state.analysis_results[key] = df.copy() 
-                            
-                            st.session_state.analysis_time[key] = datetime.now().strftime('%Y-%m-%d')
-                            
-                            # 3. 사이드바/상세 내역을 위한 최종 컬럼 목록 업데이트
-                            if st.session_state.analysis_results[key] is not None:
-                                final_df = st.session_state.analysis_results[key]
-                                final_cols = final_df.columns.tolist()
-                                st.session_state.sidebar_columns[key] = final_cols
-                                st.session_state.field_mapping[key] = final_cols
-
-                        st.success("분석 완료! 결과가 저장되었습니다.")
-                        
-                    except Exception as e:
-                        st.error(f"분석 중 오류 발생: {e}")
-                        st.session_state.analysis_results[key] = None
-
+                uploaded = st.session_state.uploaded_files[key]
+                # 일괄 모드는 전체 분석(full)만 지원합니다.
+                stream_mode = False if batch_mode else st.checkbox(
+                    "대용량 스트리밍 모드 (청크 단위로 집계만 수행, 상세 내역 제외)", key=f"stream_mode_{key}"
+                )
+                incremental_mode = False if batch_mode or stream_mode else st.checkbox(
+                    "증분 분석 (같은 로그 파일을 다시 올리면 추가된 행만 읽어 집계 갱신, 상세 내역 제외)", key=f"incremental_mode_{key}"
+                )
+                # 작업이 끝나기 전에는 다시 실행하지 않습니다 (증분 상태를 두 작업이 함께 갱신하지 않도록).
+                job_running = st.session_state.analysis_jobs[key] is not None
+                run_analysis = st.button(f"{key.upper()} 분석 실행", key=f"analyze_{key}", disabled=job_running)
+                if run_analysis and not incremental_mode:
+                    # 같은 파일(내용 해시)/스테이션/모드/분석기 버전의 결과는 모든 세션이 공유하는 캐시에서 가져옵니다.
+                    analysis_cache = get_analysis_cache()
+                    if batch_mode:
+                        cache_key = make_batch_cache_key([f.getvalue() for f in uploaded], key)
+                    else:
+                        cache_key = make_cache_key(uploaded.getvalue(), key, 'stream' if stream_mode else 'full')
+                    file_hash, _, analysis_mode, _ = cache_key
+                    cached_result = analysis_cache.get(cache_key)
+                    if cached_result is None:
+                        # 재시작 등으로 메모리 캐시에 없으면 디스크 스냅샷(메모리 맵 읽기)을 확인합니다.
+                        cached_result = load_snapshot(file_hash, key, analysis_mode)
+                        if cached_result is not None:
+                            analysis_cache.put(cache_key, cached_result)
+
+                if run_analysis:
+                    if incremental_mode:
+                        # 증분 모드는 파일 내용이 매번 달라지므로 캐시 대신 세션에 보관한 누적 상태를 이어서 사용합니다.
+                        submit_analysis_job(
+                            key, 'incremental', run_incremental_analysis, key, uploaded, st.session_state.incremental_states[key]
+                        )
+                    elif cached_result is not None:
+                        summary_data, all_dates, df = cached_result
+                        store_analysis_result(key, make_analysis_result(
+                            'stream' if stream_mode else 'full', summary_data, all_dates, df,
+                            [('info', "같은 파일의 이전 분석 결과를 캐시(스냅샷)에서 불러왔습니다."), ('success', "분석 완료! 결과가 저장되었습니다.")]
+                        ))
+                    elif stream_mode:
+                        submit_analysis_job(
+                            key, 'stream', run_stream_analysis, key, uploaded, analysis_cache, cache_key
+                        )
+                    else:
+                        submit_analysis_job(
+                            key, 'full', run_full_analysis, key, props, uploaded, batch_mode, analysis_cache, cache_key
+                        )
+
+                # 진행 중인 작업은 1초마다 진행 상황을 갱신하고, 끝나면 결과를 세션에 반영합니다.
+                if st.session_state.analysis_jobs[key] is not None:
+                    show_analysis_job(key)
+
+                for level, message in st.session_state.analysis_messages.pop(key, []):
+                    getattr(st, level)(message)
+
+                if batch_mode and st.session_state.batch_reports[key] is not None:
+                    batch_report, duplicate_rows = st.session_state.batch_reports[key]
+                    with st.expander(f"파일별 로드 결과 ({len(batch_report)}개 파일, 중복 행 {duplicate_rows}건 제거)"):
+                        st.dataframe(batch_report)
+
+                # 업로드/분석 위젯은 값이 지워지지 않도록 모든 탭에서 그리고, 비용이 큰 리포트는 열린 탭에서만 그립니다.
                 if st.session_state.analysis_results[key] is not None:
-                    display_analysis_result(key, st.session_state.uploaded_files[key].name, props)
+                    if props['tab'].open:
+                        display_analysis_result(key, uploaded_display_name(uploaded), props)
+                    else:
+                        keep_report_widget_state(key)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
-import pymysql # 또는 사용하는 데이터베이스에 맞는 라이브러리 (psycopg2, sqlalchemy 등)
+
+from db_pool import get_mysql_pool
 
 # secrets.toml에 저장된 정보 불러오기
 DB_HOST = st.secrets["db_credentials"]["DB_HOST"]
@@ -9,29 +10,22 @@ DB_PASSWORD = st.secrets["db_credentials"]["DB_PASSWORD"]
 
 st.write("데이터베이스 연결 정보 불러오기 완료!")
 
+# 연결 풀은 st.cache_resource 로 모든 세션이 공유하므로 스크립트가 다시 실행될 때마다 새로 연결하지 않습니다 (db_pool 참고).
+pool = get_mysql_pool(DB_HOST, DB_PORT, DB_USER, DB_PASSWORD)
+
 try:
-    # 데이터베이스 연결
-    connection = pymysql.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        cursorclass=pymysql.cursors.DictCursor
-    )
-
-    st.success("데이터베이스에 성공적으로 연결되었습니다.")
-
-    # 연결 테스트 (예시: 쿼리 실행)
-    # with connection.cursor() as cursor:
-    #    sql = "SELECT 'Hello, World!' as message"
-    #    cursor.execute(sql)
-    #    result = cursor.fetchone()
-    #    st.write(result['message'])
+    # 데이터베이스 연결 (풀에서 빌리고, 블록이 끝나면 닫지 않고 풀에 돌려줍니다)
+    with pool.connection() as connection:
+        st.success("데이터베이스에 성공적으로 연결되었습니다.")
+
+        # 연결 테스트 (예시: 쿼리 실행)
+        # with connection.cursor() as cursor:
+        #    sql = "SELECT 'Hello, World!' as message"
+        #    cursor.execute(sql)
+        #    result = cursor.fetchone()
+        #    st.write(result['message'])
 
 except Exception as e:
     st.error(f"데이터베이스 연결에 실패했습니다: {e}")
 
-finally:
-    if 'connection' in locals() and connection.open:
-        connection.close()
-        st.info("데이터베이스 연결이 종료되었습니다.")
+st.caption(pool.describe())
@@ -3,6 +3,11 @@ import sqlite3
 import pandas as pd
 import os
 
+from csv_schema import apply_schema_dtypes
+from db_browse import PAGE_SIZES, fetch_page
+from db_ingest import ingest_csv, read_ingest_preview
+from db_pool import get_sqlite_pool
+
 # 데이터베이스 경로 설정
 DB_FOLDER = "db"
 DB_FILE = os.path.join(DB_FOLDER, "SJ_TM2360E_v2.sqlite3")
@@ -12,18 +17,42 @@ if not os.path.exists(DB_FOLDER):
     os.makedirs(DB_FOLDER)
 
 # SQLite3에 CSV 데이터 저장 함수
-def save_csv_to_db(df, table_name):
+def save_csv_to_db(file_content, upsert_latest=True):
     """
-    Pandas DataFrame을 SQLite3 테이블에 저장합니다.
+    CSV 원본을 historyinspection 에 추가하고 inspection 에 SNumber 기준으로 upsert 합니다 (db_ingest 참고).
+    청크마다 커밋하며 진행률을 표시합니다. 실패하면 None 을 반환합니다.
     """
+    progress_bar = st.progress(0.0, text="적재 준비 중...")
+
+    def show_progress(rows, total):
+        progress_bar.progress(min(rows / total, 1.0) if total else 1.0, text=f"{rows:,} / 약 {total:,}행 적재")
+
     try:
-        conn = sqlite3.connect(DB_FILE)
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
-        conn.close()
-        return True
-    except Exception as e:
+        with get_sqlite_pool(DB_FILE).connection() as conn:
+            return ingest_csv(DB_FILE, file_content, upsert_latest=upsert_latest, progress=show_progress, conn=conn)
+    except (sqlite3.Error, ValueError) as e:
         st.error(f"데이터베이스 저장 중 오류 발생: {e}")
-        return False
+        return None
+    finally:
+        progress_bar.empty()
+
+
+def show_ingest_report(report):
+    """적재 결과 요약을 표시합니다."""
+    station = report['station'] or '알 수 없음'
+    st.success(
+        f"'{DB_FILE}' 에 {report['history_rows']:,}행을 적재했습니다 "
+        f"(스테이션: {station}, inspection upsert {report['upserted']:,}행, {report['elapsed']:.1f}초)."
+    )
+    if report['created_tables']:
+        st.info(f"템플릿 DDL 로 테이블을 만들었습니다: {', '.join(report['created_tables'])}")
+    if report['skipped_no_sn']:
+        st.warning(f"SNumber 가 비어 있는 {report['skipped_no_sn']:,}행은 적재하지 않았습니다.")
+    if report['rejected']:
+        samples = ', '.join(f"{sn} ({message})" for sn, message in report['rejected_samples'])
+        st.warning(f"제약 조건 위반으로 inspection 에 반영하지 못한 행 {report['rejected']:,}건: {samples}")
+    if report['ignored_columns']:
+        st.info(f"테이블에 없는 컬럼은 적재하지 않았습니다: {', '.join(report['ignored_columns'])}")
 
 # Streamlit 앱 시작
 st.title("CSV 파일 업로드 및 SQLite3 등록")
@@ -32,44 +61,74 @@ st.title("CSV 파일 업로드 및 SQLite3 등록")
 uploaded_file = st.file_uploader("CSV 파일을 선택해주세요.", type="csv")
 
 if uploaded_file is not None:
+    file_content = uploaded_file.getvalue()
+    # 미리보기는 적재와 같은 방법으로 헤더/인코딩을 찾아 앞부분 몇 행만 읽습니다 (스키마 dtype: 측정값 float32, PC/Pass category 등).
+    # 미리보기가 실패해도 적재는 따로 시도할 수 있도록 저장 버튼은 항상 표시합니다.
     try:
-        # CSV 파일을 DataFrame으로 읽기
-        df = pd.read_csv(uploaded_file, encoding='utf-8')
-        st.success("파일이 성공적으로 업로드되었습니다.")
+        station, df = read_ingest_preview(file_content)
+        st.success(f"파일이 성공적으로 업로드되었습니다 (스테이션: {station or '알 수 없음'}).")
         st.write("업로드된 데이터 미리보기:")
-        st.dataframe(df.head())
-
-        # 테이블명 입력
-        table_name = st.text_input("데이터를 저장할 테이블명을 입력하세요.", value="historyinspection")
-
-        if st.button("데이터베이스에 저장"):
-            if table_name:
-                # 데이터베이스에 데이터 저장
-                if save_csv_to_db(df, table_name):
-                    st.success(f"CSV 데이터가 '{DB_FILE}'의 '{table_name}' 테이블에 성공적으로 저장되었습니다.")
-            else:
-                st.warning("테이블명을 입력해주세요.")
+        st.dataframe(df)
     except Exception as e:
-        st.error(f"파일을 처리하는 중 오류가 발생했습니다: {e}")
+        st.warning(f"미리보기를 표시하지 못했습니다: {e}")
+
+    upsert_latest = st.checkbox(
+        "inspection 테이블도 SNumber 기준으로 갱신 (upsert)", value=True,
+        help="historyinspection 에는 항상 모든 행을 추가합니다."
+    )
+
+    if st.button("데이터베이스에 저장"):
+        # 데이터베이스에 데이터 적재 (기존 데이터는 유지)
+        report = save_csv_to_db(file_content, upsert_latest)
+        if report is not None:
+            show_ingest_report(report)
 
 # 저장된 데이터 확인 (선택 사항)
+# 테이블 전체를 읽지 않고 rowid 키셋 페이지네이션으로 한 페이지씩 읽습니다 (db_browse 참고).
+def reset_view_pages():
+    st.session_state['view_pages'] = [None]
+    st.session_state['view_next'] = None
+
+
+def next_view_page():
+    if st.session_state.get('view_next') is not None:
+        st.session_state['view_pages'].append(st.session_state['view_next'])
+
+
+def previous_view_page():
+    if len(st.session_state['view_pages']) > 1:
+        st.session_state['view_pages'].pop()
+
+
 if os.path.exists(DB_FILE):
     st.markdown("---")
     st.header("저장된 데이터베이스 확인")
     
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # 테이블 목록 가져오기
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = [tbl[0] for tbl in cursor.fetchall()]
-    
-    if tables:
-        selected_table = st.selectbox("확인할 테이블을 선택하세요.", tables)
-        if selected_table:
-            df_db = pd.read_sql(f"SELECT * FROM {selected_table}", conn)
-            st.dataframe(df_db)
-    else:
-        st.info("데이터베이스에 테이블이 없습니다.")
-    
-    conn.close()
+    pool = get_sqlite_pool(DB_FILE)
+    conn = pool.acquire()
+    try:
+        # 테이블 목록 가져오기
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+
+        if tables:
+            col1, col2 = st.columns([3, 1])
+            selected_table = col1.selectbox("확인할 테이블을 선택하세요.", tables, key="view_table", on_change=reset_view_pages)
+            page_size = col2.selectbox("페이지 크기", PAGE_SIZES, index=1, key="view_page_size", on_change=reset_view_pages)
+            if selected_table:
+                if 'view_pages' not in st.session_state:
+                    reset_view_pages()
+                pages = st.session_state['view_pages']
+
+                df_db, next_after = fetch_page(conn, selected_table, None, after=pages[-1], limit=page_size)
+                st.session_state['view_next'] = next_after
+                st.caption(f"{len(pages)} 페이지 · {len(df_db):,}행 표시")
+                st.dataframe(apply_schema_dtypes(df_db), hide_index=True)
+
+                nav1, nav2, nav3 = st.columns(3)
+                nav1.button("처음", on_click=reset_view_pages, disabled=len(pages) == 1, key="view_first")
+                nav2.button("이전", on_click=previous_view_page, disabled=len(pages) == 1, key="view_prev")
+                nav3.button("다음", on_click=next_view_page, disabled=next_after is None, key="view_next_button")
+        else:
+            st.info("데이터베이스에 테이블이 없습니다.")
+    finally:
+        pool.release(conn)
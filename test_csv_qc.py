@@ -0,0 +1,56 @@
+#
+# test_csv_qc.py
+# QC 판정의 경계값 회귀 검사입니다 (python -m pytest -q).
+# 측정값(float32)과 Jig 로 쓰는 제한값(category 문자열)이 섞인 묶음에서 제한값과 같은 측정값은 'Pass' 여야 합니다.
+#
+
+import pandas as pd
+
+from csv_qc import apply_qc_matrix
+from csv_schema import read_typed_csv
+
+
+def _read(columns, rows):
+    text = '\n'.join([','.join(columns)] + [','.join(row) for row in rows]) + '\n'
+    return read_typed_csv(text.encode('utf-8'), 0, 'utf-8')
+
+
+def test_pcb_value_equal_to_limits_is_pass():
+    columns = ['SNumber', 'PcbStartTime', 'PcbIrPwr', 'PcbMaxIrPwr', 'PcbMinIrPwr', 'PcbPass']
+    df = _read(columns, [
+        ['A', '20240101000000', '12.3', '12.3', '10.1', 'O'],   # = Max
+        ['B', '20240101000000', '10.1', '12.3', '10.1', 'O'],   # = Min
+        ['C', '20240101000000', '12.31', '12.3', '10.1', 'O'],
+        ['D', '20240101000000', '10.09', '12.3', '10.1', 'O'],
+    ])
+    # 전제: PcbMaxIrPwr 는 Jig 로 쓰이므로 category, 나머지는 float32
+    assert isinstance(df['PcbMaxIrPwr'].dtype, pd.CategoricalDtype)
+    assert df['PcbIrPwr'].dtype == 'float32'
+
+    apply_qc_matrix(df, ['PcbIrPwr'], 'Pcb')
+    assert df['PcbIrPwr_QC'].tolist() == ['Pass', 'Pass', '초과', '미달']
+
+
+def test_semi_value_equal_to_limits_is_pass():
+    columns = ['SNumber', 'SemiAssyStartTime', 'SemiAssySolarVolt', 'SemiAssyMaxSolarVolt', 'SemiAssyMinSolarVolt', 'SemiAssyPass']
+    df = _read(columns, [
+        ['A', '20240101000000', '3.7', '3.7', '2.7', 'O'],     # = Max
+        ['B', '20240101000000', '2.7', '3.7', '2.7', 'O'],     # = Min
+        ['C', '20240101000000', '3.71', '3.7', '2.7', 'O'],
+        ['D', '20240101000000', '2.69', '3.7', '2.7', 'O'],
+    ])
+    assert isinstance(df['SemiAssyMaxSolarVolt'].dtype, pd.CategoricalDtype)
+
+    apply_qc_matrix(df, ['SemiAssySolarVolt'], 'SemiAssy')
+    assert df['SemiAssySolarVolt_QC'].tolist() == ['Pass', 'Pass', '초과', '미달']
+
+
+def test_text_only_triplet_keeps_float64_precision():
+    # 세 컬럼이 모두 문자열이면 float64 로 비교합니다 (float32 로 반올림하지 않음).
+    df = pd.DataFrame({
+        'PcbLed': ['1.00000001', '1.0'],
+        'PcbMaxLed': ['1.0', '1.0'],
+        'PcbMinLed': ['0.5', '0.5'],
+    }, dtype=object)
+    apply_qc_matrix(df, ['PcbLed'], 'Pcb')
+    assert df['PcbLed_QC'].tolist() == ['초과', 'Pass']
@@ -0,0 +1,71 @@
+#
+# test_csv_query.py
+# 같은 필터 식이 DataFrame 마스크(DF 조회)와 SQLite WHERE 절(DB 브라우저)에서 같은 행을 고르는지 검사합니다.
+#
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from csv_query import compile_query
+
+VALUES = [
+    '12.30', '12.3', '12abc', '10', '1e', '1e1', '+5', '.5', '5.', 'abc', '', None,
+    ' 7 ', '1-2', '1.2.3', '-1.5E+2', 'e5', '12.3e', '0x10',
+]
+
+EXPRESSIONS = [
+    'Value > 10', 'Value >= 5', 'Value < 0', 'Value <= 7',
+    'Value == 12.3', 'Value != 12.3', 'not Value == 12.3',
+    'Value == abc', 'Value != abc',
+    'Value in (12.3, abc)', 'Value not in (12.3, abc)', 'Value in (abc, 10)',
+    'Value between 5 and 12.3',
+]
+
+
+def _sql_rows(values, expression):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE t (Value TEXT)')
+    conn.executemany('INSERT INTO t VALUES (?)', [(value,) for value in values])
+    where, params = compile_query(expression).to_sql(['Value'])
+    return [row[0] - 1 for row in conn.execute(f'SELECT rowid FROM t WHERE {where} ORDER BY rowid', params)]
+
+
+@pytest.mark.parametrize('expression', EXPRESSIONS)
+def test_mask_and_sql_select_same_rows(expression):
+    df = pd.DataFrame({'Value': pd.Series(VALUES, dtype=object)})
+    mask_rows = np.flatnonzero(compile_query(expression).mask(df)).tolist()
+    assert mask_rows == _sql_rows(VALUES, expression)
+
+
+def test_numeric_equality_on_float32_column_matches_sql_text():
+    # DataFrame 에서는 float32 측정값, DB 에서는 원본 문자열('12.30')입니다.
+    texts = ['12.30', '12.3', '10', None]
+    df = pd.DataFrame({'Value': pd.Series([12.3, 12.3, 10, np.nan], dtype='float32')})
+    for expression in ('Value == 12.3', 'Value != 12.3'):
+        mask_rows = np.flatnonzero(compile_query(expression).mask(df)).tolist()
+        assert mask_rows == _sql_rows(texts, expression)
+
+
+STAMPS = ['2023-12-31 23:59:59', '2024-01-01 00:00:00', '2024-01-05 00:00:00', '2024-01-05 10:00:00',
+          '2024-01-05 23:59:59', '2024-01-06 00:00:00', None]
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('Stamp between 2024-01-01 and 2024-01-05', [1, 2, 3, 4]),
+    ('Stamp <= 2024-01-05', [0, 1, 2, 3, 4]),
+    ('Stamp > 2024-01-05', [5]),
+    ('Stamp between 2024-01-01 and "2024-01-05 10:00:00"', [1, 2, 3]),
+])
+def test_date_only_upper_bound_includes_whole_day(expression, expected):
+    # DataFrame 에서는 datetime64 로 변환된 컬럼, DB 에서는 'YYYY-MM-DD HH:MM:SS' 문자열입니다.
+    df = pd.DataFrame({'Stamp': pd.to_datetime(pd.Series(STAMPS))})
+    assert np.flatnonzero(compile_query(expression).mask(df)).tolist() == expected
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE t (Stamp TEXT)')
+    conn.executemany('INSERT INTO t VALUES (?)', [(stamp,) for stamp in STAMPS])
+    where, params = compile_query(expression).to_sql(['Stamp'])
+    assert [row[0] - 1 for row in conn.execute(f'SELECT rowid FROM t WHERE {where} ORDER BY rowid', params)] == expected
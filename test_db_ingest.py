@@ -0,0 +1,38 @@
+#
+# test_db_ingest.py
+# 적재 경로의 헤더/인코딩 판별과 업로드 미리보기 검사입니다 (python -m pytest -q).
+# 미리보기는 적재와 같은 방법으로 헤더 위치와 인코딩을 찾아야 하므로 cp949 파일도 읽을 수 있어야 합니다.
+#
+
+from db_ingest import DETECT_BYTES, locate_ingest_header, read_ingest_preview
+
+HEADER = 'SNumber,FwStamp,FwPC,FwPass\n'
+
+
+def _rows(count, first_sn='SN0000'):
+    rows = [f'{first_sn},2024-01-01 00:00:00,PC1,O']
+    rows += [f'SN{i:04d},2024-01-01 00:00:00,PC1,O' for i in range(1, count)]
+    return '\n'.join(rows) + '\n'
+
+
+def test_preview_reads_cp949_file():
+    content = ('로그,시작\n' + HEADER + _rows(50, first_sn='한글SN')).encode('cp949')
+    station, offset, encoding, _ = locate_ingest_header(content)
+    assert offset == len('로그,시작\n'.encode('cp949'))
+    assert encoding == 'cp949'
+
+    preview_station, df = read_ingest_preview(content, rows=3)
+    assert preview_station == station
+    assert len(df) == 3
+    assert df['SNumber'].iloc[0] == '한글SN'
+
+
+def test_encoding_is_detected_from_body_prefix():
+    # 헤더는 ASCII 이고 한글은 데이터 행에만 있어도 cp949 로 판별해야 합니다.
+    content = (HEADER + _rows(10, first_sn='한글SN')).encode('cp949')
+    assert locate_ingest_header(content)[2] == 'cp949'
+
+    # 앞부분(DETECT_BYTES)을 넘어서는 파일은 줄 경계에서 잘라 판별하므로 utf-8 멀티바이트 문자가 잘려도 utf-8 입니다.
+    body = _rows(DETECT_BYTES // 66)
+    utf8 = (HEADER + body.replace('PC1', '지그', 1) + '한글' * (DETECT_BYTES // 6)).encode('utf-8')
+    assert locate_ingest_header(utf8)[2] == 'utf-8'
@@ -0,0 +1,78 @@
+#
+# test_db_query.py
+# SQL 집계(db_query.query_station_summary)와 DataFrame 분석(csv_engine.analyze_station)이 같은 결과를 내는지 검사합니다.
+# 스테이션마다 설정된 타임스탬프 형식으로 CSV 를 만들어 DB 에 적재한 뒤 두 경로의 Jig × 날짜 집계를 비교합니다.
+#
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from csv_engine import STATION_SPECS, analyze_station, summary_frame
+from csv_schema import read_station_csv
+from db_ingest import ingest_csv
+from db_query import query_station_summary
+
+# 스테이션별 헤더 (헤더 키워드를 모두 포함)
+STATION_COLUMNS = {
+    'Pcb': ['SNumber', 'PcbStartTime', 'PcbSleepCurr', 'PcbMaxIrPwr', 'PcbPass'],
+    'Fw': ['SNumber', 'FwStamp', 'FwPC', 'FwPass'],
+    'RfTx': ['SNumber', 'RfTxStamp', 'RfTxPC', 'RfTxPass'],
+    'Semi': ['SNumber', 'SemiAssyStartTime', 'SemiAssySolarVolt', 'SemiAssyMaxSolarVolt', 'SemiAssyPass'],
+    'Batadc': ['SNumber', 'BatadcStamp', 'BatadcPC', 'BatadcRssiRx', 'BatadcPass'],
+}
+
+# 스테이션별 타임스탬프 표기 (Pcb 는 14자리 compact 와 10자리 유닉스 초를 섞습니다)
+STATION_STAMPS = {
+    'Pcb': [lambda t: t.strftime('%Y%m%d%H%M%S'), lambda t: str(int(t.timestamp()))],
+    'Fw': [lambda t: t.strftime('%Y-%m-%d %H:%M:%S')],
+    'RfTx': [lambda t: str(int(t.timestamp() * 1000))],
+    'Semi': [lambda t: t.strftime('%Y%m%d%H%M%S')],
+    'Batadc': [lambda t: t.strftime('%Y/%m/%d %H:%M:%S')],
+}
+
+JIGS = ['12.3', '12.5', 'PC01']
+
+
+def _station_csv(station, rows=600, seed=7):
+    rng = random.Random(seed)
+    spec = STATION_SPECS[station]
+    columns = STATION_COLUMNS[station]
+    start = datetime(2024, 1, 1)
+    lines = [','.join(columns)]
+    for _ in range(rows):
+        stamp = start + timedelta(days=rng.randint(0, 3), seconds=rng.randint(0, 86399))
+        values = {
+            'SNumber': f'SN{rng.randint(0, rows // 4):05d}',
+            spec['timestamp_col']: rng.choice(STATION_STAMPS[station])(stamp),
+            spec['pass_col']: rng.choice(['O', 'O', 'X']),
+        }
+        values[spec['jig_cols'][0]] = rng.choice(JIGS)
+        lines.append(','.join(values.get(col, str(rng.randint(1, 9))) for col in columns))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _comparable(frame):
+    frame = frame.assign(jig=frame['jig'].astype(str), date=frame['date'].astype(str))
+    frame = frame.drop(columns=['pass_rate']).sort_values(['jig', 'date']).reset_index(drop=True)
+    return frame.astype({col: 'int64' for col in frame.columns if col not in ('jig', 'date')})
+
+
+@pytest.mark.parametrize('station', list(STATION_COLUMNS))
+def test_sql_summary_matches_engine(station, tmp_path):
+    content = _station_csv(station)
+    db_path = str(tmp_path / 'history.sqlite3')
+    ingest_csv(db_path, content, station=station)
+
+    with sqlite3.connect(db_path) as conn:
+        sql_frame = query_station_summary(conn, station)
+
+    df, _ = read_station_csv(content, STATION_SPECS[station])
+    summary_data, _ = analyze_station(df, station)
+    engine_frame = summary_frame(summary_data)
+
+    assert not engine_frame.empty
+    pd.testing.assert_frame_equal(_comparable(sql_frame), _comparable(engine_frame), check_like=True)